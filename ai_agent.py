@@ -1,16 +1,78 @@
+import asyncio
 import httpx
 import json
 import os
-from typing import List, Optional, Dict, Any
+import time
+from typing import AsyncIterator, List, Optional, Dict, Any
 from dotenv import load_dotenv
+from llm_cache import create_llm_cache_from_env, to_tool_calls, tools_version
+from metrics import REGISTRY
+from mcp_transport import create_transport_from_env
 
 load_dotenv()
 
+# AI代理的LLM调用和工具调用统计；mode为request（普通调用）或stream（SSE流式调用）
+LLM_SECONDS = REGISTRY.histogram("todo_agent_llm_duration_seconds", "LLM调用耗时（秒），流式调用计到最后一个chunk", ["mode"])
+LLM_ERRORS = REGISTRY.counter("todo_agent_llm_errors_total", "LLM调用失败次数", ["mode"])
+LLM_TOKENS = REGISTRY.counter("todo_agent_llm_tokens_total", "LLM响应usage字段中的token数", ["type"])
+TOOL_CALLS = REGISTRY.counter("todo_agent_tool_calls_total", "AI代理执行的工具调用次数", ["tool"])
+
+def record_llm_usage(usage: Optional[Dict[str, Any]]):
+    """累加响应usage字段中的prompt/completion token数"""
+    if not usage:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.inc(tokens, type=kind)
+
+class LLMError(Exception):
+    """LLM服务返回的错误"""
+
+async def _no_chunks():
+    """命中工具选择缓存时代替LLM流"""
+    return
+    yield
+
+def _http2_available() -> bool:
+    """HTTP/2需要安装 httpx[http2]（h2包）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def http_limits_from_env() -> httpx.Limits:
+    """HTTP客户端连接池上限，可通过环境变量调整"""
+    return httpx.Limits(
+        max_connections=int(os.getenv("AGENT_HTTP_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(os.getenv("AGENT_HTTP_MAX_KEEPALIVE", 10)),
+        keepalive_expiry=float(os.getenv("AGENT_HTTP_KEEPALIVE_EXPIRY", 60)),
+    )
+
 class AIAgent:
+    """
+    待办事项AI代理
+
+    MCP调用经由可配置的传输层（MCP_TRANSPORT，见mcp_transport.py）：
+    http传输和LLM各使用一个长连接的httpx.AsyncClient（首次调用时创建），
+    多次调用之间复用TCP/TLS连接；LLM端点在安装了h2时使用HTTP/2。
+    推荐用 `async with AIAgent() as agent:` 管理生命周期，或在结束时调用 aclose()
+    """
+
     def __init__(self):
         self.azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
         self.api_key = os.getenv("AZURE_OPENAI_API_KEY")
         self.mcp_server_url = f"http://localhost:{os.getenv('MCP_SERVER_PORT', 8000)}/mcp"
+        self.llm_http2 = os.getenv("AGENT_LLM_HTTP2", "true").lower() in ("1", "true", "yes") and _http2_available()
+        # 流式调用时请求在最后一个chunk中返回usage（stream_options.include_usage），不支持该参数的旧API版本可关闭
+        self.stream_usage = os.getenv("AGENT_STREAM_USAGE", "true").lower() in ("1", "true", "yes")
+        # 单次用户输入中最多调用工具的轮数
+        self.max_tool_steps = int(os.getenv("AGENT_MAX_TOOL_STEPS", 5))
+        self.transport = create_transport_from_env(self.mcp_server_url, http_limits_from_env())
+        # 工具选择（第一轮LLM调用）结果缓存，LLM_CACHE_ENABLED=false 时为None
+        self.llm_cache = create_llm_cache_from_env()
+        self._llm_client: Optional[httpx.AsyncClient] = None
         
         self.tools = [
             {
@@ -88,6 +150,49 @@ class AIAgent:
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_todos_due",
+                    "description": "按截止日期查询未完成的待办事项，例如今天到期、本周到期或某个日期范围内到期的任务",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "period": {
+                                "type": "string",
+                                "enum": ["today", "tomorrow", "this_week", "next_7_days"],
+                                "description": "时间段：今天、明天、本周（周一到周日）、今天起的7天"
+                            },
+                            "start_date": {"type": "string", "format": "date", "description": "截止日期范围的开始日期（不指定period时使用）"},
+                            "end_date": {"type": "string", "format": "date", "description": "截止日期范围的结束日期（不指定period时使用）"}
+                        }
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_overdue_todos",
+                    "description": "获取已经过了截止日期但还没有完成的待办事项",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {}
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "todo_stats",
+                    "description": "获取待办事项的统计数量：总数、已完成、未完成、逾期、今天到期、无截止日期，以及未来几周每周到期的数量。只需要数量时使用，不要为了计数获取完整列表",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "weeks": {"type": "integer", "description": "按周统计到期数量的周数，默认4"}
+                        }
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
@@ -104,17 +209,38 @@ class AIAgent:
             }
         ]
     
+    @property
+    def llm_client(self) -> httpx.AsyncClient:
+        """访问LLM端点的长连接客户端"""
+        if self._llm_client is None or self._llm_client.is_closed:
+            self._llm_client = httpx.AsyncClient(
+                http2=self.llm_http2,
+                limits=http_limits_from_env(),
+                timeout=60.0,
+            )
+        return self._llm_client
+    
+    async def aclose(self):
+        """关闭MCP传输层、LLM客户端和工具选择缓存"""
+        await self.transport.aclose()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+        if self._llm_client is not None:
+            await self._llm_client.aclose()
+            self._llm_client = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
     async def call_mcp_server(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """调用MCP服务器"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.mcp_server_url,
-                json={"method": method, "params": params}
-            )
-            return response.json()
+        return await self.transport.call(method, params)
     
-    async def call_azure_openai(self, messages: List[Dict[str, str]], tools: Optional[List] = None) -> Dict[str, Any]:
-        """调用Azure OpenAI服务"""
+    def build_llm_request(self, messages: List[Dict[str, Any]], tools: Optional[List] = None):
+        """构造Azure OpenAI请求的headers和payload"""
         headers = {
             "Content-Type": "application/json",
             "api-key": self.api_key
@@ -130,17 +256,91 @@ class AIAgent:
             payload["tools"] = tools
             payload["tool_choice"] = "auto"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
+        return headers, payload
+    
+    async def call_azure_openai(self, messages: List[Dict[str, str]], tools: Optional[List] = None) -> Dict[str, Any]:
+        """调用Azure OpenAI服务"""
+        headers, payload = self.build_llm_request(messages, tools)
+        start = time.perf_counter()
+        try:
+            response = await self.llm_client.post(
                 self.azure_endpoint,
                 headers=headers,
-                json=payload,
-                timeout=60.0
+                json=payload
             )
-            return response.json()
+            result = response.json()
+        except Exception:
+            LLM_ERRORS.inc(mode="request")
+            raise
+        finally:
+            LLM_SECONDS.observe(time.perf_counter() - start, mode="request")
+        
+        if "error" in result:
+            LLM_ERRORS.inc(mode="request")
+        record_llm_usage(result.get("usage"))
+        return result
+    
+    def llm_cache_key(self, user_input: str) -> str:
+        return self.llm_cache.make_key(user_input, tools_version(self.tools), self.azure_endpoint)
+    
+    async def select_tools(self, user_input: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        第一轮（工具选择）LLM调用：命中工具选择缓存时直接返回缓存的tool_calls，
+        未命中时调用AI并缓存其返回的tool_calls
+        """
+        if self.llm_cache is None:
+            return await self.call_azure_openai(messages, self.tools)
+        
+        key = self.llm_cache_key(user_input)
+        decision = self.llm_cache.get(key)
+        if decision is not None:
+            message = {"role": "assistant", "content": None, "tool_calls": to_tool_calls(decision)}
+            return {"choices": [{"message": message}]}
+        
+        start = time.perf_counter()
+        response = await self.call_azure_openai(messages, self.tools)
+        message = (response.get("choices") or [{}])[0].get("message") or {}
+        if message.get("tool_calls"):
+            self.llm_cache.record_miss(time.perf_counter() - start)
+            self.llm_cache.set(key, message["tool_calls"])
+        else:
+            self.llm_cache.record_miss()
+        return response
+    
+    async def stream_azure_openai(
+        self, messages: List[Dict[str, Any]], tools: Optional[List] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """以SSE流式调用Azure OpenAI服务，逐个返回chunk（data: 行解析后的dict）"""
+        headers, payload = self.build_llm_request(messages, tools)
+        payload["stream"] = True
+        if self.stream_usage:
+            payload["stream_options"] = {"include_usage": True}
+        
+        start = time.perf_counter()
+        try:
+            async with self.llm_client.stream("POST", self.azure_endpoint, headers=headers, json=payload) as response:
+                if response.status_code >= 400:
+                    body = json.loads(await response.aread())
+                    raise LLMError(body.get("error", {}).get("message", f"HTTP {response.status_code}"))
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    record_llm_usage(chunk.get("usage"))
+                    yield chunk
+        except Exception:
+            LLM_ERRORS.inc(mode="stream")
+            raise
+        finally:
+            LLM_SECONDS.observe(time.perf_counter() - start, mode="stream")
     
     async def execute_function_call(self, function_name: str, arguments: Dict[str, Any]) -> str:
         """执行函数调用"""
+        TOOL_CALLS.inc(tool=function_name)
         try:
             result = await self.call_mcp_server(function_name, arguments)
             
@@ -152,9 +352,25 @@ class AIAgent:
         except Exception as e:
             return f"执行函数时出错: {str(e)}"
     
-    async def process_user_input(self, user_input: str) -> str:
-        """处理用户输入并返回响应"""
-        messages = [
+    async def run_tool_call(self, tool_call: Dict[str, Any]) -> Dict[str, str]:
+        """执行单个tool_call，返回发送回AI的tool消息"""
+        function_name = tool_call["function"]["name"]
+        try:
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+        except json.JSONDecodeError as e:
+            function_result = f"参数解析失败: {str(e)}"
+        else:
+            function_result = await self.execute_function_call(function_name, arguments)
+        
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "content": function_result
+        }
+    
+    def build_messages(self, user_input: str) -> List[Dict[str, Any]]:
+        """构造系统提示和用户消息"""
+        return [
             {
                 "role": "system",
                 "content": """你是一个智能的待办事项助手。你可以帮助用户管理他们的日常任务。
@@ -166,8 +382,11 @@ class AIAgent:
 4. 删除待办事项 - 移除不需要的任务
 5. 搜索待办事项 - 根据关键词查找任务
 6. 标记完成 - 将任务标记为已完成
+7. 查看到期任务 - 查找今天、本周或某个日期范围内到期的任务，以及已经逾期的任务
+8. 统计 - 回答"还剩几个任务"这类数量问题时使用todo_stats，不要获取完整列表再自己数
 
-请根据用户的需求选择合适的功能来帮助他们。回复时要友好和有帮助。
+请根据用户的需求选择合适的功能来帮助他们。一个请求涉及多个任务时（例如"把任务1、2、3标记为完成"），
+请在同一轮中同时调用多个工具。回复时要友好和有帮助。
 
 如果用户提到日期，请使用YYYY-MM-DD格式（例如：2025-06-26）。"""
             },
@@ -176,38 +395,124 @@ class AIAgent:
                 "content": user_input
             }
         ]
+    
+    async def process_user_input(self, user_input: str) -> str:
+        """
+        处理用户输入并返回响应
+
+        AI每轮返回的所有tool_calls并发执行，结果发送回AI后继续，直到AI不再调用工具
+        或达到 max_tool_steps（AGENT_MAX_TOOL_STEPS）
+        """
+        messages = self.build_messages(user_input)
         
         try:
-            # 调用Azure OpenAI
-            response = await self.call_azure_openai(messages, self.tools)
-            
-            if "error" in response:
-                return f"AI服务错误: {response['error']['message']}"
-            
-            message = response["choices"][0]["message"]
-            
-            # 检查是否有工具调用
-            if message.get("tool_calls"):
-                tool_call = message["tool_calls"][0]
-                function_name = tool_call["function"]["name"]
-                arguments = json.loads(tool_call["function"]["arguments"])
+            for step in range(self.max_tool_steps):
+                # 调用Azure OpenAI，第一轮的工具选择可能命中缓存
+                if step == 0:
+                    response = await self.select_tools(user_input, messages)
+                else:
+                    response = await self.call_azure_openai(messages, self.tools)
                 
-                # 执行函数调用
-                function_result = await self.execute_function_call(function_name, arguments)
+                if "error" in response:
+                    return f"AI服务错误: {response['error']['message']}"
                 
-                # 将函数结果发送回AI获取最终响应
+                message = response["choices"][0]["message"]
+                
+                # 没有工具调用时模型已给出最终回复
+                if not message.get("tool_calls"):
+                    return message["content"]
+                
+                # 并发执行本轮的所有工具调用，结果按原顺序发送回AI
                 messages.append(message)
+                messages.extend(await asyncio.gather(
+                    *(self.run_tool_call(tool_call) for tool_call in message["tool_calls"])
+                ))
+            
+            # 达到步数上限：不再提供工具，让AI根据已有结果给出回复
+            final_response = await self.call_azure_openai(messages)
+            return final_response["choices"][0]["message"]["content"]
+        
+        except Exception as e:
+            return f"处理请求时出错: {str(e)}"
+    
+    async def process_user_input_stream(self, user_input: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        process_user_input的流式版本，边生成边返回事件：
+
+        - {"type": "token", "text": ...}: AI回复的文本片段
+        - {"type": "tool_call", "name": ..., "arguments": ..., "cached": ...}: 开始调用工具，
+          cached表示工具选择来自缓存
+        - {"type": "tool_result", "name": ..., "content": ...}: 工具调用完成
+        - {"type": "error", "text": ...}: 出错，之后不再有事件
+        """
+        messages = self.build_messages(user_input)
+        
+        try:
+            # 前 max_tool_steps 轮提供工具，达到上限后不再提供工具，让AI根据已有结果给出回复
+            for step in range(self.max_tool_steps + 1):
+                tools = self.tools if step < self.max_tool_steps else None
+                content_parts = []
+                # 按index合并流式返回的tool_calls片段
+                tool_calls = {}
+                
+                # 第一轮的工具选择可能命中缓存，命中时不调用AI
+                cache_key = self.llm_cache_key(user_input) if step == 0 and self.llm_cache is not None else None
+                decision = self.llm_cache.get(cache_key) if cache_key else None
+                if decision is not None:
+                    tool_calls = dict(enumerate(to_tool_calls(decision)))
+                
+                start = time.perf_counter()
+                async for chunk in (self.stream_azure_openai(messages, tools) if decision is None else _no_chunks()):
+                    if not chunk.get("choices"):
+                        continue
+                    delta = chunk["choices"][0].get("delta") or {}
+                    
+                    if delta.get("content"):
+                        content_parts.append(delta["content"])
+                        yield {"type": "token", "text": delta["content"]}
+                    
+                    for fragment in delta.get("tool_calls") or []:
+                        tool_call = tool_calls.setdefault(fragment["index"], {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+                        if fragment.get("id"):
+                            tool_call["id"] = fragment["id"]
+                        function = fragment.get("function") or {}
+                        tool_call["function"]["name"] += function.get("name") or ""
+                        tool_call["function"]["arguments"] += function.get("arguments") or ""
+                
+                calls = [tool_calls[index] for index in sorted(tool_calls)]
+                if cache_key and decision is None:
+                    if calls:
+                        self.llm_cache.record_miss(time.perf_counter() - start)
+                        self.llm_cache.set(cache_key, calls)
+                    else:
+                        self.llm_cache.record_miss()
+                
+                if not calls:
+                    return
+                
                 messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call["id"],
-                    "content": function_result
+                    "role": "assistant",
+                    "content": "".join(content_parts) or None,
+                    "tool_calls": calls
                 })
+                for tool_call in calls:
+                    yield {
+                        "type": "tool_call",
+                        "name": tool_call["function"]["name"],
+                        "arguments": tool_call["function"]["arguments"],
+                        "cached": decision is not None
+                    }
                 
-                final_response = await self.call_azure_openai(messages)
-                return final_response["choices"][0]["message"]["content"]
-            
-            else:
-                return message["content"]
+                results = await asyncio.gather(*(self.run_tool_call(tool_call) for tool_call in calls))
+                messages.extend(results)
+                for tool_call, result in zip(calls, results):
+                    yield {"type": "tool_result", "name": tool_call["function"]["name"], "content": result["content"]}
         
+        except LLMError as e:
+            yield {"type": "error", "text": f"AI服务错误: {str(e)}"}
         except Exception as e:
-            return f"处理请求时出错: {str(e)}"
+            yield {"type": "error", "text": f"处理请求时出错: {str(e)}"}
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+AI代理HTTP连接复用基准测试
+
+在本机启动桩服务器（MCP服务器 + 兼容Chat Completions格式的LLM端点，LLM端点默认启用TLS），
+每轮对话包含 LLM调用 → MCP工具调用 → LLM调用，对比：
+- 每次调用新建 httpx.AsyncClient（旧实现，每次都要TCP/TLS握手）
+- AIAgent的长连接客户端（keep-alive，LLM端点在服务端支持时使用HTTP/2）
+
+桩服务器在本机回环地址上，省下的握手时间远小于真实网络环境（跨地域的Azure端点每次握手需要多个RTT）。
+
+用法：
+    python benchmarks/bench_agent_http.py --turns 200
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from fake_llm import free_port, make_self_signed_cert, start_server
+
+
+async def run_turns(agent, turns: int):
+    """返回每轮对话的耗时（毫秒）"""
+    latencies = []
+    async with agent:
+        for _ in range(turns):
+            start = time.perf_counter()
+            reply = await agent.process_user_input("显示我的所有任务")
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert "学习Python" in reply, reply
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI代理HTTP连接复用基准测试")
+    parser.add_argument("--turns", type=int, default=200, help="每种实现执行的对话轮数")
+    parser.add_argument("--no-tls", action="store_true", help="LLM桩端点不启用TLS")
+    args = parser.parse_args()
+
+    use_tls = not args.no_tls and shutil.which("openssl") is not None
+    tmpdir = tempfile.mkdtemp()
+
+    mcp_port = free_port()
+    llm_port = free_port()
+    start_server(mcp_port)
+    if use_tls:
+        certfile, keyfile = make_self_signed_cert(tmpdir)
+        start_server(llm_port, ssl_certfile=certfile, ssl_keyfile=keyfile)
+        # httpx在trust_env时读取SSL_CERT_FILE，信任桩服务器的自签名证书
+        os.environ["SSL_CERT_FILE"] = certfile
+    else:
+        start_server(llm_port)
+
+    os.environ["MCP_SERVER_PORT"] = str(mcp_port)
+    os.environ["AZURE_OPENAI_ENDPOINT"] = f"{'https' if use_tls else 'http'}://localhost:{llm_port}/chat"
+    os.environ["AZURE_OPENAI_API_KEY"] = "stub"
+    # 每轮输入相同，关闭工具选择缓存，保证每轮都调用LLM
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+
+    from ai_agent import AIAgent
+
+    class PerCallClientAgent(AIAgent):
+        """旧实现：每次调用都新建并关闭 httpx.AsyncClient"""
+
+        async def call_mcp_server(self, method, params):
+            async with httpx.AsyncClient() as client:
+                response = await client.post(self.mcp_server_url, json={"method": method, "params": params})
+                return response.json()
+
+        async def call_azure_openai(self, messages, tools=None):
+            payload = {"messages": messages, "max_tokens": 1500, "temperature": 0.7}
+            if tools:
+                payload["tools"] = tools
+                payload["tool_choice"] = "auto"
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    self.azure_endpoint,
+                    headers={"Content-Type": "application/json", "api-key": self.api_key},
+                    json=payload,
+                    timeout=60.0,
+                )
+                return response.json()
+
+    print(f"🔌 AI代理HTTP连接复用基准测试: {args.turns} 轮对话（每轮2次LLM调用 + 1次MCP调用）")
+    print(f"   LLM桩端点: {os.environ['AZURE_OPENAI_ENDPOINT']}（{'TLS' if use_tls else '明文HTTP'}）")
+    print("=" * 60)
+
+    results = {}
+    for label, agent_class in [("每次调用新建客户端", PerCallClientAgent), ("长连接客户端", AIAgent)]:
+        latencies = asyncio.run(run_turns(agent_class(), args.turns))
+        # 去掉第一轮（长连接客户端的第一轮包含建立连接的成本）
+        steady = latencies[1:]
+        p50 = statistics.median(steady)
+        p95 = statistics.quantiles(steady, n=20)[18]
+        results[label] = p50
+        print(f"   {label:<20} 首轮 {latencies[0]:>7.2f}ms   p50 {p50:>7.2f}ms   p95 {p95:>7.2f}ms")
+
+    before, after = results.values()
+    print("-" * 60)
+    print(f"📊 每轮延迟降低: {before - after:.2f}ms（{before / after:.1f}x）")
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
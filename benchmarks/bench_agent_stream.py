@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+AI代理流式输出基准测试
+
+本机假LLM按固定速度逐个token生成（见 fake_llm.py），每轮对话包含一次工具调用，对比用户看到第一个字的时间（TTFT）：
+- process_user_input：等整段回复生成完才能显示
+- process_user_input_stream：收到第一个token即可显示
+
+用法：
+    python benchmarks/bench_agent_stream.py --turns 10 --token-delay 0.03 --first-token-delay 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import create_stub_app, free_port, start_server
+
+
+async def measure(agent, turns: int):
+    """返回 [(TTFT, 总耗时)]（秒），非流式的TTFT等于总耗时"""
+    results = []
+    async with agent:
+        for _ in range(turns):
+            start = time.perf_counter()
+            reply = await agent.process_user_input("显示我的所有任务")
+            elapsed = time.perf_counter() - start
+            assert "学习Python" in reply, reply
+            results.append(("非流式", elapsed, elapsed))
+
+            start = time.perf_counter()
+            first_token = None
+            text = ""
+            async for event in agent.process_user_input_stream("显示我的所有任务"):
+                if event["type"] == "token":
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    text += event["text"]
+                assert event["type"] != "error", event
+            assert "学习Python" in text, text
+            results.append(("流式", first_token, time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI代理流式输出基准测试")
+    parser.add_argument("--turns", type=int, default=10, help="每种方式执行的对话轮数")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="假LLM每个token的生成间隔（秒）")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="假LLM每次调用首个token前的等待（秒）")
+    args = parser.parse_args()
+
+    mcp_port = free_port()
+    llm_port = free_port()
+    start_server(mcp_port)
+    start_server(llm_port, create_stub_app(token_delay=args.token_delay, first_token_delay=args.first_token_delay))
+
+    os.environ["MCP_SERVER_PORT"] = str(mcp_port)
+    os.environ["MCP_TRANSPORT"] = "http"
+    os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://localhost:{llm_port}/chat"
+    os.environ["AZURE_OPENAI_API_KEY"] = "stub"
+    # 每轮输入相同，关闭工具选择缓存，保证每轮都调用LLM
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+
+    from ai_agent import AIAgent
+
+    print(f"⏱️  AI代理流式输出基准测试: {args.turns} 轮对话（每轮1次工具调用）")
+    print(f"   假LLM: 首token等待 {args.first_token_delay}s，每token {args.token_delay}s")
+    print("=" * 60)
+
+    results = asyncio.run(measure(AIAgent(), args.turns))
+    summary = {}
+    for label in ("非流式", "流式"):
+        ttft = statistics.median(r[1] for r in results if r[0] == label)
+        total = statistics.median(r[2] for r in results if r[0] == label)
+        summary[label] = ttft
+        print(f"   {label:<8} TTFT p50 {ttft * 1000:>8.1f}ms   总耗时 p50 {total * 1000:>8.1f}ms")
+
+    print("-" * 60)
+    print(f"📊 TTFT降低: {(summary['非流式'] - summary['流式']) * 1000:.1f}ms（{summary['非流式'] / summary['流式']:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
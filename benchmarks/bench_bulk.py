@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+批量写入基准测试
+
+对比逐行方法（create_todo / update_todo / mark_completed / delete_todo）与
+bulk_* 方法（多行VALUES、UPDATE ... FROM (VALUES ...)、id = ANY(...)）的吞吐（rows/sec）。
+测试数据在结束时删除。
+
+用法：
+    python benchmarks/bench_bulk.py --rows 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from models import TodoBulkUpdate, TodoCreate, TodoUpdate
+
+
+def timed(label: str, rows: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<36} {rows / elapsed:>12.0f} rows/s   耗时 {elapsed:.2f}s")
+    return result, rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量写入基准测试")
+    parser.add_argument("--rows", type=int, default=10000, help="每种操作处理的行数")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    todos = [TodoCreate(title=f"批量基准 {i}", content="bench_bulk") for i in range(args.rows)]
+    # 记录所有创建的id，异常退出时也能清理
+    created_ids = []
+
+    print(f"📦 批量写入基准测试: {args.rows} 行")
+    print("=" * 60)
+
+    try:
+        print("🐢 逐行方法")
+        created, create_row = timed("create_todo", args.rows, lambda: [db.create_todo(t) for t in todos])
+        ids = [t.id for t in created]
+        created_ids.extend(ids)
+        _, update_row = timed("update_todo", args.rows, lambda: [db.update_todo(i, TodoUpdate(content="updated")) for i in ids])
+        _, mark_row = timed("mark_completed (update_todo)", args.rows, lambda: [db.update_todo(i, TodoUpdate(completed=True)) for i in ids])
+        _, delete_row = timed("delete_todo", args.rows, lambda: [db.delete_todo(i) for i in ids])
+
+        print("\n🚀 批量方法")
+        created, create_bulk = timed("bulk_create_todos", args.rows, lambda: db.bulk_create_todos(todos))
+        ids = [t.id for t in created]
+        created_ids.extend(ids)
+        updates = [TodoBulkUpdate(id=i, content="updated") for i in ids]
+        _, update_bulk = timed("bulk_update_todos", args.rows, lambda: db.bulk_update_todos(updates))
+        _, mark_bulk = timed("bulk_mark_completed", args.rows, lambda: db.bulk_mark_completed(ids))
+        _, delete_bulk = timed("bulk_delete_todos", args.rows, lambda: db.bulk_delete_todos(ids))
+
+        print("\n📊 提升倍数")
+        for label, before, after in [
+            ("创建", create_row, create_bulk),
+            ("更新", update_row, update_bulk),
+            ("标记完成", mark_row, mark_bulk),
+            ("删除", delete_row, delete_bulk),
+        ]:
+            print(f"   {label:<10} {after / before:>8.1f}x")
+    finally:
+        db.bulk_delete_todos(created_ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
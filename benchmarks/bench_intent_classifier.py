@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+本地意图分类器评估
+
+在 data/intent_eval.jsonl（与训练语料不同的说法、标题和关键词）上对比：
+- 正则意图分析（IntentMatcher）：无法确定意图时视为 chat，交给AI模型
+- 本地分类器（IntentClassifier）：输出校准后的置信度
+
+报告两者的准确率、可以跳过AI模型直接执行的比例及其准确率，以及单次分类的延迟（微秒）。无需数据库和API Key。
+
+用法：
+    python benchmarks/bench_intent_classifier.py --threshold 0.9
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enhanced_ai_agent import EnhancedAIAgent
+from intent_classifier import CHAT_LABEL, DATA_DIR, load_corpus
+
+
+class RegexAgent(EnhancedAIAgent):
+    """旧流程：正则命中意图且必需参数齐全时直接执行"""
+
+    def local_decision(self, user_input):
+        intent = self.analyze_user_intent(user_input)
+        if intent is None:
+            return None
+        params = self.extract_parameters(user_input, intent)
+        tool = next(t for t in self.tools if t["function"]["name"] == intent)
+        if any(p not in params for p in tool["function"]["parameters"].get("required", [])):
+            return None
+        return intent, params, 1.0
+
+
+def latency_us(function, examples, repeat: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, _ in examples:
+            function(text)
+    return (time.perf_counter() - start) / (repeat * len(examples)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地意图分类器评估")
+    parser.add_argument("--eval", default=os.path.join(DATA_DIR, "intent_eval.jsonl"), help="评估语料")
+    parser.add_argument("--threshold", type=float, default=None, help="置信度阈值，默认取INTENT_CONFIDENCE_THRESHOLD")
+    args = parser.parse_args()
+
+    examples = load_corpus(args.eval)
+    agent = EnhancedAIAgent()
+    if args.threshold is not None:
+        agent.confidence_threshold = args.threshold
+    regex_agent = RegexAgent()
+
+    print(f"🧭 本地意图分类器评估: {len(examples)} 条评估语料，置信度阈值 {agent.confidence_threshold}")
+    print("=" * 72)
+
+    regex_predictions = [agent.analyze_user_intent(text) or CHAT_LABEL for text, _ in examples]
+    classifier_predictions = [agent.classify_user_intent(text)[0] for text, _ in examples]
+
+    for label, predictions, runner, classify in [
+        ("正则意图分析", regex_predictions, regex_agent, agent.analyze_user_intent),
+        ("本地分类器", classifier_predictions, agent, agent.classify_user_intent),
+    ]:
+        accuracy = sum(p == intent for p, (_, intent) in zip(predictions, examples)) / len(examples)
+        decisions = [runner.local_decision(text) for text, _ in examples]
+        direct = [(d, intent) for d, (_, intent) in zip(decisions, examples) if d]
+        direct_accuracy = sum(d[0] == intent for d, intent in direct) / len(direct) if direct else 0.0
+        print(f"   {label:<10} 准确率 {accuracy:>6.1%}   跳过AI模型 {len(direct) / len(examples):>6.1%}"
+              f"（其中正确 {direct_accuracy:>6.1%}）   每次分类 {latency_us(classify, examples):>6.1f}µs")
+
+    print("-" * 72)
+    print("直接执行只在工具属于 fast_path_tools 且必需参数能从输入中提取时发生，其余输入交给AI模型")
+
+
+if __name__ == "__main__":
+    main()
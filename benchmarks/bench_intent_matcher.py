@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+意图匹配基准测试
+
+把 test_function_selection.py 中的测试用例（加上编号、标点、大小写变化）扩充到指定条数，
+对每条输入执行 意图分析 + 参数提取，对比：
+- 旧实现：逐个 re.search 意图模式，再逐个检查关键词，参数提取时逐个 re.search
+- IntentMatcher：预编译的合并正则扫描一遍，同时得到意图和参数
+
+两种实现的结果逐条比较，必须完全一致。无需数据库和API Key。
+
+用法：
+    python benchmarks/bench_intent_matcher.py --inputs 100000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enhanced_ai_agent import EnhancedAIAgent
+from test_function_selection import TEST_CASES
+
+# 扩充语料用的变体
+VARIANTS = [
+    "{}",
+    "{}。",
+    "请{}",
+    "{}，谢谢",
+    "帮我{}!",
+    "{} ID{}",
+    "{}，编号{}",
+    "{}\n第{}个",
+    "Hi, {} DONE",
+    "{} 2025-{:02d}-15",
+]
+
+
+def build_corpus(size: int):
+    corpus = []
+    i = 0
+    while len(corpus) < size:
+        case = TEST_CASES[i % len(TEST_CASES)]
+        variant = VARIANTS[(i // len(TEST_CASES)) % len(VARIANTS)]
+        corpus.append(variant.format(case, i % 12 + 1))
+        i += 1
+    return corpus
+
+
+class LegacyMatcher:
+    """旧实现：analyze_user_intent / extract_parameters 每次调用都遍历未编译的正则"""
+
+    def __init__(self, intent_patterns, tools):
+        self.intent_patterns = intent_patterns
+        self.tools = tools
+
+    def analyze_user_intent(self, user_input):
+        user_input_lower = user_input.lower()
+        for intent, patterns in self.intent_patterns.items():
+            for pattern in patterns:
+                if re.search(pattern, user_input, re.IGNORECASE):
+                    return intent
+        intent_scores = {}
+        for tool in self.tools:
+            function_name = tool["function"]["name"]
+            score = 0
+            for keyword in tool["function"].get("keywords", []):
+                if keyword in user_input_lower:
+                    score += 1
+            if score > 0:
+                intent_scores[function_name] = score
+        if intent_scores:
+            return max(intent_scores, key=intent_scores.get)
+        return None
+
+    def extract_parameters(self, user_input, function_name):
+        params = {}
+        if function_name == "create_todo":
+            for pattern in [r"创建.*?[：:\"'](.*?)[\"']", r"添加.*?[：:\"'](.*?)[\"']",
+                            r"任务[：:\"'](.*?)[\"']", r"做.*?[：:\"'](.*?)[\"']"]:
+                match = re.search(pattern, user_input)
+                if match:
+                    params["title"] = match.group(1).strip()
+                    break
+            if "title" not in params and "创建" in user_input:
+                title = user_input[user_input.find("创建") + 2:].strip()
+                if title:
+                    params["title"] = title
+            date_match = re.search(r"(\d{4}-\d{2}-\d{2})", user_input)
+            if date_match:
+                params["due_date"] = date_match.group(1)
+        elif function_name == "get_todos":
+            if "未完成" in user_input:
+                params["completed"] = False
+            elif "已完成" in user_input:
+                params["completed"] = True
+        elif function_name == "search_todos":
+            for pattern in [r"搜索[：:\"\']?(.*?)[\"\']*", r"查找[：:\"\']?(.*?)[\"\']*",
+                            r"包含[：:\"\']?(.*?)[\"\']*的"]:
+                match = re.search(pattern, user_input)
+                if match:
+                    query = match.group(1).strip()
+                    if query:
+                        params["query"] = query
+                        break
+        elif function_name in ["update_todo", "delete_todo", "mark_completed"]:
+            for pattern in [r"任务(\d+)", r"ID(\d+)", r"编号(\d+)", r"第(\d+)个"]:
+                match = re.search(pattern, user_input)
+                if match:
+                    params["id"] = int(match.group(1))
+                    break
+        return params
+
+    def match(self, user_input):
+        intent = self.analyze_user_intent(user_input)
+        if intent is None:
+            return None, {}
+        return intent, self.extract_parameters(user_input, intent)
+
+
+def run(matcher, corpus):
+    start = time.perf_counter()
+    results = [matcher.match(text) for text in corpus]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="意图匹配基准测试")
+    parser.add_argument("--inputs", type=int, default=100000, help="扩充后的输入条数")
+    args = parser.parse_args()
+
+    agent = EnhancedAIAgent()
+    corpus = build_corpus(args.inputs)
+
+    print(f"🎯 意图匹配基准测试: {len(corpus)} 条输入（{len(TEST_CASES)} 个测试用例 × {len(VARIANTS)} 种变体）")
+    print("=" * 60)
+
+    legacy_seconds, legacy_results = run(LegacyMatcher(agent.intent_patterns, agent.tools), corpus)
+    compiled_seconds, compiled_results = run(agent.intent_matcher, corpus)
+
+    for text, expected, actual in zip(corpus, legacy_results, compiled_results):
+        assert expected == actual, f"{text!r}: {expected} != {actual}"
+
+    for label, seconds in [("旧实现", legacy_seconds), ("IntentMatcher", compiled_seconds)]:
+        print(f"   {label:<14} 总耗时 {seconds:>7.3f}s   每条 {seconds / len(corpus) * 1e6:>6.2f}µs   "
+              f"{len(corpus) / seconds:>10,.0f} 条/秒")
+
+    print("-" * 60)
+    print(f"✅ 两种实现的 {len(corpus)} 条结果完全一致")
+    print(f"📊 提速: {legacy_seconds / compiled_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+LLM工具选择缓存基准测试
+
+本机假LLM每次调用固定等待 first_token_delay（见 fake_llm.py），按一组常见说法（含标点、全角、大小写差异）
+循环发起对话，对比关闭和开启工具选择缓存时每轮对话的耗时，并输出缓存命中率和估算节省的LLM调用时间。
+
+用法：
+    python benchmarks/bench_llm_cache.py --turns 50 --first-token-delay 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import create_stub_app, free_port, start_server
+
+# 归一化后只有3种不同的输入
+INPUTS = [
+    "显示我的所有任务",
+    "显示我的所有任务。",
+    "  显示我的所有任务！",
+    "我有哪些待办事项？",
+    "我有哪些待办事项",
+    "Show my TODOS",
+    "show my todos!",
+]
+
+
+async def run_turns(agent, turns: int):
+    """返回每轮对话的耗时（毫秒）和缓存统计"""
+    latencies = []
+    async with agent:
+        for i in range(turns):
+            start = time.perf_counter()
+            reply = await agent.process_user_input(INPUTS[i % len(INPUTS)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert "学习Python" in reply, reply
+        stats = agent.llm_cache.stats() if agent.llm_cache else None
+    return latencies, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM工具选择缓存基准测试")
+    parser.add_argument("--turns", type=int, default=50, help="每种配置执行的对话轮数")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="假LLM每次调用的等待（秒）")
+    args = parser.parse_args()
+
+    mcp_port = free_port()
+    llm_port = free_port()
+    start_server(mcp_port)
+    start_server(llm_port, create_stub_app(first_token_delay=args.first_token_delay))
+
+    os.environ["MCP_SERVER_PORT"] = str(mcp_port)
+    os.environ["MCP_TRANSPORT"] = "http"
+    os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://localhost:{llm_port}/chat"
+    os.environ["AZURE_OPENAI_API_KEY"] = "stub"
+
+    from ai_agent import AIAgent
+
+    print(f"🧠 LLM工具选择缓存基准测试: {args.turns} 轮对话（{len(INPUTS)} 种说法轮流）")
+    print(f"   假LLM: 每次调用等待 {args.first_token_delay}s")
+    print("=" * 60)
+
+    tmpdir = tempfile.mkdtemp()
+    results = {}
+    for label, env in [
+        ("关闭缓存", {"LLM_CACHE_ENABLED": "false"}),
+        ("内存缓存", {"LLM_CACHE_ENABLED": "true", "LLM_CACHE_SQLITE_PATH": ""}),
+        ("内存+SQLite", {"LLM_CACHE_ENABLED": "true", "LLM_CACHE_SQLITE_PATH": os.path.join(tmpdir, "llm_cache.db")}),
+    ]:
+        os.environ.update(env)
+        latencies, stats = asyncio.run(run_turns(AIAgent(), args.turns))
+        p50 = statistics.median(latencies)
+        results[label] = statistics.mean(latencies)
+        line = f"   {label:<12} p50 {p50:>8.1f}ms   平均 {results[label]:>8.1f}ms"
+        if stats:
+            line += f"   命中率 {stats['hit_rate']:.0%}   节省 {stats['saved_seconds']:.2f}s"
+        print(line)
+
+    print("-" * 60)
+    before, after = results["关闭缓存"], results["内存缓存"]
+    print(f"📊 每轮平均延迟降低: {before - after:.1f}ms（{before / after:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
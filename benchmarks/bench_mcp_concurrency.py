@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+MCP服务器并发吞吐基准测试
+
+对比同步DatabaseManager（在事件循环中直接阻塞调用，旧实现）与
+AsyncDatabaseManager（异步驱动+异步连接池）在100个并发客户端下的requests/sec。
+
+用法：
+    python benchmarks/bench_mcp_concurrency.py --clients 100 --requests 2000
+需要 .env 中的 DATABASE_URL 指向已初始化的数据库。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_server
+from database import AsyncDatabaseManager, DatabaseManager
+from models import TodoCreate
+
+
+class BlockingDatabaseManager:
+    """
+    旧实现的等价物：在async处理函数中直接调用同步psycopg2方法，
+    每次查询都会阻塞整个事件循环
+    """
+
+    def __init__(self):
+        self.sync_db = DatabaseManager()
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        self.sync_db.close()
+
+    def __getattr__(self, name):
+        method = getattr(self.sync_db, name)
+
+        async def blocking_call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return blocking_call
+
+
+def seed_rows(rows: int) -> int:
+    """确保表中至少有rows条数据，让查询有可测量的耗时，返回一个存在的todo ID"""
+    db = DatabaseManager()
+    todos = db.get_todos()
+    for i in range(len(todos), rows):
+        todos.append(db.create_todo(TodoCreate(title=f"基准测试任务 {i}", content=f"benchmark 内容 {i}")))
+    db.close()
+    return todos[0].id
+
+
+async def run_clients(clients: int, total_requests: int, methods):
+    """clients个并发客户端共发送total_requests个请求，返回(耗时, 错误数)"""
+    transport = httpx.ASGITransport(app=mcp_server.app)
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                method, params = methods[i % len(methods)]
+                response = await client.post("/mcp", json={"method": method, "params": params})
+                if response.status_code != 200 or response.json().get("error"):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return elapsed, errors
+
+
+async def bench(label: str, db, clients: int, total_requests: int, methods):
+    mcp_server.db = db
+    await db.open()
+    try:
+        # 预热连接池
+        await run_clients(min(clients, 10), min(total_requests, 50), methods)
+        elapsed, errors = await run_clients(clients, total_requests, methods)
+    finally:
+        await db.close()
+
+    rps = total_requests / elapsed
+    print(f"   {label:<28} {rps:>10.1f} req/s   耗时 {elapsed:.2f}s   错误 {errors}")
+    return rps
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="MCP服务器并发吞吐基准测试")
+    parser.add_argument("--clients", type=int, default=100, help="并发客户端数量")
+    parser.add_argument("--requests", type=int, default=2000, help="请求总数")
+    parser.add_argument("--rows", type=int, default=5000, help="预置数据行数")
+    args = parser.parse_args()
+
+    todo_id = seed_rows(args.rows)
+
+    # 只返回少量数据的查询，让耗时集中在数据库I/O而不是序列化上
+    methods = [
+        ("search_todos", {"query": "基准测试任务 42"}),
+        ("get_todos", {"completed": True}),
+        ("get_todo", {"id": todo_id}),
+    ]
+
+    print(f"🚀 MCP并发基准测试: {args.clients} 个并发客户端, {args.requests} 个请求")
+    print("=" * 60)
+    before = await bench("同步psycopg2（阻塞事件循环）", BlockingDatabaseManager(), args.clients, args.requests, methods)
+    after = await bench("AsyncDatabaseManager", AsyncDatabaseManager(), args.clients, args.requests, methods)
+    print("-" * 60)
+    print(f"📊 提升: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
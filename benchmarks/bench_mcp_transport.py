@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+MCP传输层基准测试
+
+对比AIAgent.call_mcp_server在两种传输方式下的单次工具调用延迟：
+- http：访问子进程中运行的 mcp_server.py（JSON编码 → HTTP → FastAPI校验 → JSON解码）
+- inprocess：在当前进程内直接调用MCP方法处理函数
+
+两种方式都关闭读缓存（TODO_CACHE_BACKEND=none），保证每次调用都访问数据库。
+
+用法：
+    python benchmarks/bench_mcp_transport.py --calls 2000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+# 添加项目路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import httpx
+
+os.environ["TODO_CACHE_BACKEND"] = "none"
+
+# 每种传输方式依次执行的工具调用
+CALLS = [
+    ("get_todos", {"completed": False, "limit": 20}),
+    ("get_todo", {"id": None}),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_http_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, MCP_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, "mcp_server.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://localhost:{port}/health").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("MCP服务器启动超时")
+
+
+async def measure(agent, calls: int):
+    """返回每次工具调用的耗时（毫秒）"""
+    latencies = []
+    async with agent:
+        created = await agent.call_mcp_server("create_todo", {"title": "传输基准测试"})
+        todo_id = created["result"]["todo"]["id"]
+        try:
+            for i in range(calls):
+                method, params = CALLS[i % len(CALLS)]
+                if "id" in params:
+                    params = {"id": todo_id}
+                start = time.perf_counter()
+                result = await agent.call_mcp_server(method, params)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert not result.get("error"), result
+        finally:
+            await agent.call_mcp_server("delete_todo", {"id": todo_id})
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP传输层基准测试")
+    parser.add_argument("--calls", type=int, default=2000, help="每种传输方式执行的工具调用次数")
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ["MCP_SERVER_PORT"] = str(port)
+    server = start_http_server(port)
+
+    print(f"🚚 MCP传输层基准测试: 每种方式 {args.calls} 次工具调用（{', '.join(m for m, _ in CALLS)} 轮流）")
+    print("=" * 60)
+
+    results = {}
+    try:
+        for transport in ("http", "inprocess"):
+            os.environ["MCP_TRANSPORT"] = transport
+            from ai_agent import AIAgent
+            latencies = asyncio.run(measure(AIAgent(), args.calls))
+            p50 = statistics.median(latencies)
+            p95 = statistics.quantiles(latencies, n=20)[18]
+            results[transport] = p50
+            print(f"   {transport:<12} p50 {p50:>7.3f}ms   p95 {p95:>7.3f}ms   平均 {statistics.mean(latencies):>7.3f}ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+    print("-" * 60)
+    print(f"📊 每次工具调用节省: {results['http'] - results['inprocess']:.3f}ms（{results['http'] / results['inprocess']:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
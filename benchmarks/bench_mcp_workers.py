@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+MCP服务器多进程吞吐基准测试
+
+依次以 1/2/4/8 个工作进程运行 `python main.py server --prod`，用多个压测进程（每个进程内若干并发客户端）
+发送 get_todos / get_todo 请求，报告每种工作进程数的 requests/sec、延迟和相对单进程的扩展倍数。
+默认关闭读缓存（TODO_CACHE_BACKEND=none），每个请求都访问数据库。
+
+压测进程和服务器运行在同一台机器上，工作进程数超过空闲CPU核心数后吞吐不会继续增长。
+
+用法：
+    python benchmarks/bench_mcp_workers.py --workers 1 2 4 8 --duration 10
+需要 .env 中的 DATABASE_URL 指向已初始化的数据库。
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, loop: str, http: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "server", "--prod", "--workers", str(workers), "--port", str(port),
+         "--loop", loop, "--http", http],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://localhost:{port}/health", timeout=5).status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("MCP服务器启动超时")
+
+
+def stop_server(process: subprocess.Popen):
+    """发送SIGTERM，等待工作进程处理完请求后退出"""
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=60)
+
+
+async def client_loop(url: str, clients: int, duration: float, todo_id: int):
+    """clients个并发客户端持续发送请求duration秒，返回每个请求的延迟（毫秒）和错误数"""
+    calls = [
+        ("get_todos", {"completed": False, "limit": 20}),
+        ("get_todo", {"id": todo_id}),
+    ]
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                method, params = calls[i % len(calls)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json={"method": method, "params": params})
+                    if response.status_code != 200 or response.json().get("error"):
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+    return latencies, errors
+
+
+def load_process(url: str, clients: int, duration: float, todo_id: int, results):
+    results.put(asyncio.run(client_loop(url, clients, duration, todo_id)))
+
+
+def run_load(url: str, processes: int, clients: int, duration: float, todo_id: int):
+    """processes个压测进程同时发压，汇总延迟和错误数"""
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=load_process, args=(url, clients, duration, todo_id, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    latencies, errors = [], 0
+    for _ in workers:
+        part, part_errors = results.get()
+        latencies.extend(part)
+        errors += part_errors
+    for worker in workers:
+        worker.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP服务器多进程吞吐基准测试")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="要测试的工作进程数")
+    parser.add_argument("--duration", type=float, default=10, help="每种配置的压测秒数")
+    parser.add_argument("--load-processes", type=int, default=4, help="压测进程数")
+    parser.add_argument("--clients", type=int, default=32, help="每个压测进程的并发客户端数")
+    parser.add_argument("--loop", default="auto", help="事件循环：auto、asyncio或uvloop")
+    parser.add_argument("--http", default="auto", help="HTTP解析器：auto、h11或httptools")
+    parser.add_argument("--cache", default="none", help="TODO_CACHE_BACKEND，默认关闭读缓存")
+    args = parser.parse_args()
+
+    os.environ["TODO_CACHE_BACKEND"] = args.cache
+
+    print(f"🏭 MCP服务器多进程吞吐基准测试: {args.load_processes} 个压测进程 × {args.clients} 个并发客户端，"
+          f"每种配置 {args.duration:.0f}s")
+    print(f"   CPU核心数 {os.cpu_count()}，事件循环 {args.loop}，HTTP {args.http}，读缓存 {args.cache}")
+    print("=" * 72)
+
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        url = f"http://localhost:{port}/mcp"
+        server = start_server(workers, port, args.loop, args.http)
+        try:
+            created = httpx.post(url, json={"method": "create_todo", "params": {"title": "多进程基准测试"}}).json()
+            todo_id = created["result"]["todo"]["id"]
+            # 预热：让每个工作进程都建立数据库连接
+            run_load(url, 1, workers * 4, 1.0, todo_id)
+            latencies, errors = run_load(url, args.load_processes, args.clients, args.duration, todo_id)
+            httpx.post(url, json={"method": "delete_todo", "params": {"id": todo_id}})
+        finally:
+            stop_server(server)
+
+        rps = len(latencies) / args.duration
+        baseline = baseline or rps
+        p50 = statistics.median(latencies)
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(f"   {workers:>2} 个工作进程 {rps:>9.1f} req/s   p50 {p50:>7.2f}ms   p99 {p99:>7.2f}ms   "
+              f"错误 {errors:<4} {rps / baseline:>5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
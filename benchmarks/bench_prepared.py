@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+预备语句基准测试
+
+1. 规划耗时：对每条热点查询分别用 EXPLAIN (ANALYZE, SUMMARY) 测量直接执行和预备后 EXECUTE 的 Planning Time
+2. 吞吐：多个并发客户端持续调用 get_todo_by_id / get_todos / update_todo / delete_todo，
+   对比关闭和开启预备语句时的 queries/sec 和延迟，差值即每次查询节省的解析和规划时间
+
+同步 DatabaseManager（PREPARE / EXECUTE）和异步 AsyncDatabaseManager（psycopg的 prepare=True）各测一次。
+测试数据在结束时删除。
+
+用法：
+    python benchmarks/bench_prepared.py --duration 10 --clients 8
+需要 .env 中的 DATABASE_URL 指向已初始化的数据库。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import (
+    DELETE_TODO_SQL,
+    GET_TODO_SQL,
+    UPDATE_COLUMNS,
+    AsyncDatabaseManager,
+    DatabaseManager,
+    PreparedStatements,
+    _build_list_query,
+    _numbered_placeholders,
+    _statement_name,
+    _update_statement,
+    encode_cursor,
+)
+from models import TodoCreate, TodoUpdate
+
+UPDATE_VALUES = {"title": "预备语句基准", "content": "bench_prepared", "due_date": date(2030, 1, 1), "completed": False}
+
+
+def explain_queries(cursor_todo):
+    """(名称, SQL, 参数) 列表；更新和删除使用不存在的id，不修改数据"""
+    list_sql, list_values = _build_list_query(limit=20)
+    page_sql, page_values = _build_list_query(completed=False, limit=20, cursor=encode_cursor(cursor_todo))
+    update_columns = ("title", "due_date")
+    return [
+        ("get_todo_by_id", GET_TODO_SQL, [cursor_todo.id]),
+        ("get_todos limit", list_sql, list_values),
+        ("get_todos completed+cursor", page_sql, page_values),
+        ("update_todo title,due_date", _update_statement(update_columns), [UPDATE_VALUES[c] for c in update_columns] + [-1]),
+        ("delete_todo", DELETE_TODO_SQL, [-1]),
+    ]
+
+
+def planning_time(cursor, sql: str, values) -> float:
+    cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}", values)
+    plan = cursor.fetchone()[0]
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    return plan[0]["Planning Time"]
+
+
+def measure_planning(db: DatabaseManager, cursor_todo, repeat: int):
+    print("🧮 规划耗时（EXPLAIN ANALYZE 的 Planning Time，毫秒，取中位数）")
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            for label, sql, values in explain_queries(cursor_todo):
+                direct = statistics.median(planning_time(cursor, sql, values) for _ in range(repeat))
+                name = _statement_name(sql) + "_explain"
+                cursor.execute(f"PREPARE {name} AS {_numbered_placeholders(sql)}")
+                execute = f"EXECUTE {name} (" + ", ".join(["%s"] * len(values)) + ")"
+                # 前5次执行使用custom plan，之后改用缓存的generic plan
+                for _ in range(6):
+                    cursor.execute(execute, values)
+                prepared = statistics.median(planning_time(cursor, execute, values) for _ in range(repeat))
+                cursor.execute(f"DEALLOCATE {name}")
+                print(f"   {label:<28} 直接执行 {direct:>7.3f}ms   预备语句 {prepared:>7.3f}ms")
+            conn.rollback()
+
+
+def workload(ids, cursor_todo):
+    """每次调用返回一个 (方法名, 调用) 对，覆盖全部16种update列组合"""
+    cursor = encode_cursor(cursor_todo)
+    rng = random.Random(42)
+    combos = [tuple(c for i, c in enumerate(UPDATE_COLUMNS) if mask & (1 << i)) for mask in range(2 ** len(UPDATE_COLUMNS))]
+
+    def next_call():
+        kind = rng.randrange(5)
+        if kind == 0:
+            return "get_todo_by_id", ("get_todo_by_id", (rng.choice(ids),), {})
+        if kind == 1:
+            return "get_todos", ("get_todos", (), {"limit": 20})
+        if kind == 2:
+            return "get_todos", ("get_todos", (), {"completed": False, "limit": 20, "cursor": cursor})
+        if kind == 3:
+            update = TodoUpdate(**{column: UPDATE_VALUES[column] for column in rng.choice(combos)})
+            return "update_todo", ("update_todo", (rng.choice(ids), update), {})
+        return "delete_todo", ("delete_todo", (-1,), {})
+    return next_call
+
+
+def run_sync(db: DatabaseManager, next_call, clients: int, duration: float):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local = []
+        while time.perf_counter() < deadline:
+            with lock:
+                _, (method, args, kwargs) = next_call()
+            start = time.perf_counter()
+            getattr(db, method)(*args, **kwargs)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+async def run_async(db: AsyncDatabaseManager, next_call, clients: int, duration: float):
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            _, (method, args, kwargs) = next_call()
+            start = time.perf_counter()
+            await getattr(db, method)(*args, **kwargs)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies
+
+
+def report(label: str, latencies, duration: float, baseline=None):
+    qps = len(latencies) / duration
+    mean_us = statistics.mean(latencies) * 1e6
+    p50 = statistics.median(latencies) * 1000
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+    line = f"   {label:<22} {qps:>9.1f} q/s   平均 {mean_us:>7.0f}µs   p50 {p50:>6.2f}ms   p99 {p99:>6.2f}ms"
+    if baseline is not None:
+        line += f"   {qps / baseline[0]:>5.2f}x，每次查询节省 {baseline[1] - mean_us:>5.0f}µs"
+    print(line)
+    return qps, mean_us
+
+
+def make_async_db(prepared: bool) -> AsyncDatabaseManager:
+    db = AsyncDatabaseManager()
+    db.prepare = prepared
+    if not prepared:
+        db.pool.kwargs = {**(db.pool.kwargs or {}), "prepare_threshold": None}
+    return db
+
+
+async def bench_async(next_call, clients: int, duration: float):
+    results = {}
+    for prepared in (False, True):
+        db = make_async_db(prepared)
+        await db.open()
+        try:
+            await run_async(db, next_call, clients, 1.0)
+            results[prepared] = await run_async(db, next_call, clients, duration)
+        finally:
+            await db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预备语句基准测试")
+    parser.add_argument("--duration", type=float, default=10, help="每种配置的压测秒数")
+    parser.add_argument("--clients", type=int, default=8, help="并发客户端数（线程或协程）")
+    parser.add_argument("--rows", type=int, default=200, help="压测使用的待办事项数")
+    parser.add_argument("--explain-repeat", type=int, default=20, help="每条查询测量规划耗时的次数")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    created = db.bulk_create_todos([TodoCreate(title=f"预备语句基准 {i}", content="bench_prepared") for i in range(args.rows)])
+    ids = [todo.id for todo in created]
+    # 游标指向最新的数据之前，让keyset分页走真实的索引范围扫描
+    cursor_todo = created[0].model_copy(update={"created_at": datetime.now()})
+
+    print(f"📐 预备语句基准测试: {args.clients} 个并发客户端，每种配置 {args.duration:.0f}s")
+    print("=" * 96)
+    try:
+        measure_planning(db, cursor_todo, args.explain_repeat)
+
+        next_call = workload(ids, cursor_todo)
+        print("\n🔁 同步 DatabaseManager（PREPARE / EXECUTE）")
+        db.statements = None
+        run_sync(db, next_call, args.clients, 1.0)
+        baseline = report("直接执行", run_sync(db, next_call, args.clients, args.duration), args.duration)
+        db.statements = PreparedStatements()
+        run_sync(db, next_call, args.clients, 1.0)
+        report("预备语句", run_sync(db, next_call, args.clients, args.duration), args.duration, baseline)
+        print(f"   每个连接的PREPARE次数合计 {db.statements.prepares}，EXECUTE {db.statements.executes}")
+
+        print("\n🔁 异步 AsyncDatabaseManager（psycopg prepare=True）")
+        results = asyncio.run(bench_async(next_call, args.clients, args.duration))
+        baseline = report("直接执行", results[False], args.duration)
+        report("预备语句", results[True], args.duration, baseline)
+    finally:
+        db.bulk_delete_todos(ids)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+search_todos 搜索基准测试
+
+在独立的 bench_search schema 中分别构造 10k / 100k / 1M 行数据，
+对比全文检索+三元组索引（fulltext）与 ILIKE 全表扫描（ilike）两种搜索路径的延迟。
+
+用法：
+    python benchmarks/bench_search.py --sizes 10000 100000 1000000
+需要先执行 python main.py migrate 应用 migrations/ 中的迁移。
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager, SEARCH_MODE_FULLTEXT, SEARCH_MODE_ILIKE
+
+SCHEMA = "bench_search"
+
+# 高频词，命中行数随表大小线性增长
+COMMON_QUERIES = ["学习", "项目进度", "python"]
+
+# 每行标题末尾带一个由TAG_CHARS随机组成的4字标签，用于构造选择性高的查询
+TAG_CHARS = "春夏秋冬东南西北山川河海风云雷电金木水火土日月星辰天地人和花鸟鱼虫琴棋书画诗酒"
+
+WORDS = [
+    "学习", "项目", "进度", "会议", "买菜", "编程", "设计", "评审", "报告", "整理",
+    "文档", "客户", "电话", "邮件", "健身", "跑步", "读书", "复习", "考试", "旅行",
+    "机票", "酒店", "预算", "发票", "报销", "周报", "月报", "计划", "需求", "测试",
+    "部署", "上线", "修复", "优化", "重构", "培训", "面试", "招聘", "会议室", "预订",
+    "python", "docker", "review", "deploy", "meeting", "report", "budget", "travel",
+]
+
+
+def bench_dsn(dsn: str) -> str:
+    """在连接串中设置search_path，让未限定schema的todos指向基准测试表"""
+    parts = urlparse(dsn)
+    query = dict(parse_qsl(parts.query))
+    query["options"] = f"-csearch_path={SCHEMA},public"
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def setup_schema(db: DatabaseManager):
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+            cursor.execute(f"CREATE TABLE {SCHEMA}.todos (LIKE public.todos INCLUDING ALL)")
+            cursor.execute(
+                f"""
+                CREATE TRIGGER update_todos_search_vector
+                    BEFORE INSERT OR UPDATE OF title, content ON {SCHEMA}.todos
+                    FOR EACH ROW
+                    EXECUTE FUNCTION public.update_todos_search_vector()
+                """
+            )
+
+
+def grow_to(db: DatabaseManager, rows: int):
+    """用随机组合的中英文词语把表扩充到rows行"""
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM todos")
+            existing = cursor.fetchone()[0]
+            if existing >= rows:
+                return
+            cursor.execute(
+                """
+                INSERT INTO todos (title, content, completed)
+                SELECT
+                    w[1 + floor(random() * n)::int] || w[1 + floor(random() * n)::int] || ' ' ||
+                        (SELECT string_agg(substr(%s, 1 + floor(random() * char_length(%s))::int, 1), '')
+                         FROM generate_series(1, 4) AS k WHERE k + g > 0),
+                    w[1 + floor(random() * n)::int] || ' ' || w[1 + floor(random() * n)::int] || w[1 + floor(random() * n)::int],
+                    random() < 0.3
+                FROM generate_series(%s, %s) AS g,
+                     (SELECT %s::text[] AS w, cardinality(%s::text[]) AS n) AS vocab
+                """,
+                (TAG_CHARS, TAG_CHARS, existing + 1, rows, WORDS, WORDS)
+            )
+        conn.commit()
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE todos")
+
+
+def sample_tags(db: DatabaseManager, count: int = 5):
+    """从已有数据中随机抽取标签作为高选择性查询"""
+    with db.get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT right(title, 4) FROM todos ORDER BY random() LIMIT %s", (count,))
+            return [row[0] for row in cursor.fetchall()]
+
+
+def measure(db: DatabaseManager, mode: str, queries, repeat: int, limit: int):
+    db.search_mode = mode
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            db.search_todos(query, limit=limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search_todos 搜索基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="数据规模")
+    parser.add_argument("--repeat", type=int, default=10, help="每个查询重复次数")
+    parser.add_argument("--limit", type=int, default=50, help="每次搜索返回的条数")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    db.connection_string = bench_dsn(db.connection_string)
+    setup_schema(db)
+
+    print("🔍 search_todos 搜索基准测试")
+    print("=" * 60)
+    print(f"{'行数':>10}  {'查询':<8} {'模式':<10} {'p50(ms)':>10} {'p95(ms)':>10}")
+    print("-" * 60)
+
+    try:
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            grow_to(db, size)
+            print(f"   (构造 {size} 行数据耗时 {time.perf_counter() - start:.1f}s)")
+            query_sets = [("高选择性", sample_tags(db)), ("高频词", COMMON_QUERIES)]
+            for label, queries in query_sets:
+                for mode in (SEARCH_MODE_ILIKE, SEARCH_MODE_FULLTEXT):
+                    p50, p95 = measure(db, mode, queries, args.repeat, args.limit)
+                    print(f"{size:>10}  {label:<8} {mode:<10} {p50:>10.2f} {p95:>10.2f}")
+    finally:
+        with db.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+MCP响应序列化基准测试
+
+不访问数据库，用构造的Todo对象对比两种序列化路径每10k条待办事项的耗时：
+- 旧路径：逐条 json.loads(json.dumps(todo.dict())) → MCPResponse →
+  FastAPI按response_model再次校验并序列化 → JSONResponse.render
+- 新路径：result中直接放Todo模型，由 encode_mcp_response 一次编码为JSON字节
+
+用法：
+    python benchmarks/bench_serialization.py --rows 50000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Union
+
+# 添加项目路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from mcp_server import encode_mcp_response
+from models import MCPResponse, Todo
+
+
+def serialize_datetime(obj):
+    """旧路径使用的JSON日期时间序列化"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+RESPONSE_FIELD = create_response_field(
+    name="response", type_=Union[MCPResponse, List[MCPResponse]]
+)
+
+
+def make_todos(rows: int) -> List[Todo]:
+    now = datetime.now()
+    return [
+        Todo(
+            id=i,
+            title=f"序列化基准 {i}",
+            content="准备季度汇报材料，整理会议纪要" if i % 2 else None,
+            due_date=(now + timedelta(days=i % 30)).date() if i % 3 else None,
+            completed=i % 5 == 0,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def old_path(todos: List[Todo]) -> bytes:
+    result = [json.loads(json.dumps(todo.model_dump(), default=serialize_datetime)) for todo in todos]
+    response = MCPResponse(result={"todos": result})
+    content = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=response))
+    return JSONResponse(content).body
+
+
+def new_path(todos: List[Todo]) -> bytes:
+    return encode_mcp_response(MCPResponse(result={"todos": todos})).body
+
+
+def measure(fn, todos: List[Todo], repeat: int) -> float:
+    """返回多次运行中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(todos)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP响应序列化基准测试")
+    parser.add_argument("--rows", type=int, default=50000, help="单个响应包含的待办事项数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每种路径运行次数（取最短耗时）")
+    args = parser.parse_args()
+
+    todos = make_todos(args.rows)
+
+    # 两种路径输出的JSON内容应当一致
+    assert json.loads(old_path(todos[:100])) == json.loads(new_path(todos[:100]))
+
+    print(f"🧾 MCP响应序列化基准测试: {args.rows} 条待办事项")
+    print("=" * 60)
+
+    results = {}
+    for label, fn in [("旧路径（JSON往返 + response_model）", old_path), ("新路径（预编码响应体）", new_path)]:
+        elapsed = measure(fn, todos, args.repeat)
+        per_10k = elapsed / args.rows * 10000 * 1000
+        results[label] = per_10k
+        print(f"   {label:<32} 总耗时 {elapsed * 1000:>9.1f}ms   每10k条 {per_10k:>7.1f}ms")
+
+    before, after = results.values()
+    print("-" * 60)
+    print(f"📊 提升: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+基准测试共用的本机桩服务器
+
+- POST /mcp：返回固定的待办事项
+- POST /chat：兼容Chat Completions格式的假LLM，最后一条消息来自用户时返回一个 get_todos 工具调用，
+  拿到工具结果后返回文本回复；请求中 stream=true 时以SSE逐个token返回。响应带有按字符数估算的 usage 字段
+
+token_delay（每个token的生成间隔）和 first_token_delay（首个token之前的等待）用于模拟模型生成速度，
+tool_call 指定返回的工具调用（默认不带参数的 get_todos）。
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+REPLY = "您有1个未完成的任务：学习Python。需要我帮您把它标记为完成，或者再添加新的任务吗？"
+TOOL_CALL = {"id": "call_1", "type": "function", "function": {"name": "get_todos", "arguments": "{}"}}
+
+
+def create_stub_app(token_delay: float = 0.0, first_token_delay: float = 0.0, tool_call: dict = TOOL_CALL) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/mcp")
+    async def mcp(request: Request):
+        await request.json()
+        return {"result": {"todos": [{"id": 1, "title": "学习Python", "completed": False}]}, "error": None}
+
+    @stub.post("/chat")
+    async def chat(request: Request):
+        payload = await request.json()
+        wants_tool = payload["messages"][-1]["role"] == "user" and payload.get("tools")
+        prompt_tokens = sum(len(message.get("content") or "") for message in payload["messages"])
+        completion_tokens = 10 if wants_tool else len(REPLY)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        if not payload.get("stream"):
+            await asyncio.sleep(first_token_delay + token_delay * (0 if wants_tool else len(REPLY)))
+            if wants_tool:
+                message = {"role": "assistant", "content": None, "tool_calls": [tool_call]}
+            else:
+                message = {"role": "assistant", "content": REPLY}
+            return {"choices": [{"message": message}], "usage": usage}
+
+        async def events():
+            def chunk(delta):
+                return f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]}, ensure_ascii=False)}\n\n"
+
+            await asyncio.sleep(first_token_delay)
+            if wants_tool:
+                function = tool_call["function"]
+                yield chunk({"tool_calls": [{"index": 0, "id": tool_call["id"], "type": "function",
+                                             "function": {"name": function["name"], "arguments": ""}}]})
+                yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": function["arguments"]}}]})
+            else:
+                for token in REPLY:
+                    yield chunk({"content": token})
+                    await asyncio.sleep(token_delay)
+            if (payload.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return stub
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, app: FastAPI = None, **ssl_options) -> uvicorn.Server:
+    """在后台线程中启动桩服务器，返回uvicorn.Server（设置 should_exit=True 停止）"""
+    config = uvicorn.Config(app or create_stub_app(), host="127.0.0.1", port=port, log_level="error", **ssl_options)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def make_self_signed_cert(directory: str):
+    """用openssl生成localhost自签名证书，返回 (证书, 私钥) 路径"""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+            "-keyout", keyfile, "-out", certfile,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certfile, keyfile
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+MCP服务器负载测试
+
+两种场景，结果以JSON输出，便于在版本之间对比：
+- mcp：按 --mix 指定的比例向 /mcp 发送 create_todo / get_todos / search_todos / update_todo / mark_completed，
+  --concurrency 为固定并发（每个客户端收到响应后立即发下一个请求），--rate 为固定到达速率（每秒请求数，
+  延迟从计划发送时刻算起，服务器变慢时排队时间也计入延迟）
+- agent：AIAgent.process_user_input 端到端对话，LLM为本机假Azure OpenAI（返回固定的tool_calls，见 fake_llm.py），
+  工具调用访问被测的MCP服务器（--agent-mcp stub 时访问假服务器，只测AI代理本身）
+
+每个场景报告吞吐、错误率、p50/p95/p99延迟，以及每个MCP方法的同样指标。
+未指定 --url 时在子进程中启动 mcp_server.py（默认关闭读缓存）。测试创建的待办事项在结束时删除。
+
+--baseline 指定上一次的结果文件时，逐个场景比较吞吐和p99延迟，任一项变差超过 --max-regression 时以状态码1退出。
+
+用法：
+    python benchmarks/load_test.py --scenario mcp --concurrency 32 --duration 30 --output result.json
+    python benchmarks/load_test.py --scenario mcp --rate 200 --mix get_todos=6,create_todo=1,mark_completed=1
+    python benchmarks/load_test.py --scenario agent --concurrency 8 --first-token-delay 0.2
+    python benchmarks/load_test.py --output new.json --baseline old.json --max-regression 0.1
+需要 .env 中的 DATABASE_URL 指向已初始化的数据库（--scenario agent --agent-mcp stub 时不需要）。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import httpx
+
+from fake_llm import create_stub_app, start_server
+
+DEFAULT_MIX = "get_todos=4,search_todos=2,create_todo=2,update_todo=1,mark_completed=1"
+
+# 压测开始前创建的待办事项数，update_todo / mark_completed 从中随机选择
+SEED_TODOS = 200
+
+SEARCH_QUERIES = ["负载测试", "报告", "学习", "会议", "load"]
+
+# agent场景中假LLM返回的工具调用
+AGENT_TOOL_CALL = {
+    "id": "call_1",
+    "type": "function",
+    "function": {"name": "get_todos", "arguments": json.dumps({"completed": False, "limit": 20})},
+}
+
+# process_user_input 出错时返回的前缀
+AGENT_ERROR_PREFIXES = ("AI服务错误", "处理请求时出错")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(text: str) -> dict:
+    """"get_todos=4,create_todo=1" → {"get_todos": 4.0, "create_todo": 1.0}"""
+    mix = {}
+    for item in text.split(","):
+        method, _, weight = item.partition("=")
+        method = method.strip()
+        if method not in ("create_todo", "get_todos", "search_todos", "update_todo", "mark_completed"):
+            raise SystemExit(f"不支持的方法: {method}")
+        mix[method] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    """延迟单位为毫秒，吞吐只计成功的请求"""
+    values = sorted(latencies)
+    total = len(values) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(values, 0.50), 3),
+            "p95": round(percentile(values, 0.95), 3),
+            "p99": round(percentile(values, 0.99), 3),
+            "max": round(values[-1], 3) if values else 0.0,
+            "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        },
+    }
+
+
+class Recorder:
+    """按方法收集延迟和错误数"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    def record(self, method: str, latency_ms: float, ok: bool):
+        if not self.recording:
+            return
+        if ok:
+            self.latencies.setdefault(method, []).append(latency_ms)
+        else:
+            self.errors[method] = self.errors.get(method, 0) + 1
+
+    def result(self, elapsed: float) -> dict:
+        methods = sorted(set(self.latencies) | set(self.errors))
+        overall = summarize(
+            [latency for values in self.latencies.values() for latency in values], sum(self.errors.values()), elapsed
+        )
+        overall["methods"] = {
+            method: summarize(self.latencies.get(method, []), self.errors.get(method, 0), elapsed)
+            for method in methods
+        }
+        return overall
+
+
+async def drive(send, recorder: Recorder, concurrency: int, rate: float, duration: float, warmup: float, max_inflight: int):
+    """
+    固定并发：concurrency个客户端循环调用send；固定速率：每 1/rate 秒发起一次send（最多max_inflight个同时进行）。
+    先运行warmup秒（不记录），再记录duration秒，返回实际的记录时长
+    """
+    async def run_phase(seconds: float):
+        deadline = time.perf_counter() + seconds
+        if not rate:
+            async def client():
+                while time.perf_counter() < deadline:
+                    await send(time.perf_counter())
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return
+
+        interval = 1.0 / rate
+        inflight = asyncio.Semaphore(max_inflight)
+        tasks = set()
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await inflight.acquire()
+            task = asyncio.create_task(send(scheduled))
+            task.add_done_callback(lambda _: inflight.release())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            scheduled += interval
+        await asyncio.gather(*tasks)
+
+    if warmup:
+        await run_phase(warmup)
+    recorder.recording = True
+    start = time.perf_counter()
+    await run_phase(duration)
+    elapsed = time.perf_counter() - start
+    recorder.recording = False
+    return elapsed
+
+
+async def run_mcp_scenario(url: str, args) -> dict:
+    mix = parse_mix(args.mix)
+    methods, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    created_ids = []
+    counter = 0
+
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_inflight))
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        seeded = await client.post(url, json={"method": "bulk_create_todos", "params": {
+            "todos": [{"title": f"负载测试 {i}", "content": "load test seed"} for i in range(SEED_TODOS)]
+        }})
+        seed_ids = [todo["id"] for todo in seeded.json()["result"]["todos"]]
+
+        def next_call():
+            nonlocal counter
+            method = rng.choices(methods, weights)[0]
+            counter += 1
+            if method == "create_todo":
+                return method, {"title": f"负载测试 {counter}", "content": "load test"}
+            if method == "get_todos":
+                return method, {"completed": rng.choice([None, False, True]), "limit": 20}
+            if method == "search_todos":
+                return method, {"query": rng.choice(SEARCH_QUERIES), "limit": 20}
+            if method == "update_todo":
+                return method, {"id": rng.choice(seed_ids), "content": f"updated {counter}"}
+            return method, {"id": rng.choice(seed_ids)}
+
+        async def send(scheduled: float):
+            method, params = next_call()
+            ok = False
+            try:
+                response = await client.post(url, json={"method": method, "params": params})
+                body = response.json()
+                ok = response.status_code == 200 and not body.get("error")
+                if ok and method == "create_todo":
+                    created_ids.append(body["result"]["todo"]["id"])
+            except (httpx.HTTPError, ValueError):
+                pass
+            recorder.record(method, (time.perf_counter() - scheduled) * 1000, ok)
+
+        try:
+            elapsed = await drive(send, recorder, args.concurrency, args.rate, args.duration, args.warmup, args.max_inflight)
+        finally:
+            ids = seed_ids + created_ids
+            for i in range(0, len(ids), 10000):
+                await client.post(url, json={"method": "bulk_delete_todos", "params": {"ids": ids[i:i + 10000]}})
+
+    result = recorder.result(elapsed)
+    result["mix"] = mix
+    return result
+
+
+async def run_agent_scenario(args) -> dict:
+    from ai_agent import AIAgent
+
+    recorder = Recorder()
+    turn_input = "显示我未完成的任务"
+
+    async with AIAgent() as agent:
+        async def send(scheduled: float):
+            ok = False
+            try:
+                reply = await agent.process_user_input(turn_input)
+                ok = bool(reply) and not reply.startswith(AGENT_ERROR_PREFIXES)
+            except Exception:
+                pass
+            recorder.record("turn", (time.perf_counter() - scheduled) * 1000, ok)
+
+        elapsed = await drive(send, recorder, args.concurrency, args.rate, args.duration, args.warmup, args.max_inflight)
+
+    result = recorder.result(elapsed)
+    del result["methods"]
+    return result
+
+
+def start_mcp_server(port: int, cache: str) -> subprocess.Popen:
+    env = dict(os.environ, MCP_SERVER_PORT=str(port), TODO_CACHE_BACKEND=cache)
+    process = subprocess.Popen(
+        [sys.executable, "mcp_server.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://localhost:{port}/health/live").status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("MCP服务器启动超时")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """返回变差超过max_regression的项：吞吐下降或p99延迟上升"""
+    regressions = []
+    previous = {scenario["name"]: scenario for scenario in baseline.get("scenarios", [])}
+    for scenario in results["scenarios"]:
+        old = previous.get(scenario["name"])
+        if not old:
+            continue
+        old_rps, new_rps = old["throughput_rps"], scenario["throughput_rps"]
+        if old_rps and (old_rps - new_rps) / old_rps > max_regression:
+            regressions.append(f"{scenario['name']} 吞吐 {old_rps} → {new_rps} req/s")
+        old_p99, new_p99 = old["latency_ms"]["p99"], scenario["latency_ms"]["p99"]
+        if old_p99 and (new_p99 - old_p99) / old_p99 > max_regression:
+            regressions.append(f"{scenario['name']} p99 {old_p99} → {new_p99} ms")
+    return regressions
+
+
+def print_scenario(scenario: dict, out):
+    latency = scenario["latency_ms"]
+    print(
+        f"   {scenario['name']:<8} {scenario['throughput_rps']:>9.1f} req/s   p50 {latency['p50']:>8.2f}ms   "
+        f"p95 {latency['p95']:>8.2f}ms   p99 {latency['p99']:>8.2f}ms   错误率 {scenario['error_rate']:.2%}",
+        file=out,
+    )
+    for method, stats in scenario.get("methods", {}).items():
+        latency = stats["latency_ms"]
+        print(
+            f"     {method:<15} {stats['throughput_rps']:>7.1f} req/s   p50 {latency['p50']:>8.2f}ms   "
+            f"p99 {latency['p99']:>8.2f}ms   错误 {stats['errors']}",
+            file=out,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP服务器负载测试")
+    parser.add_argument("--scenario", choices=["mcp", "agent", "all"], default="all", help="运行的场景")
+    parser.add_argument("--url", help="被测MCP服务器的 /mcp 地址，未指定时在子进程中启动 mcp_server.py")
+    parser.add_argument("--cache", default="none", help="自动启动服务器时的 TODO_CACHE_BACKEND")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="mcp场景的方法比例，例如 get_todos=4,create_todo=1")
+    parser.add_argument("--concurrency", type=int, default=16, help="固定并发的客户端数")
+    parser.add_argument("--rate", type=float, default=0, help="固定到达速率（请求/秒），设置后忽略 --concurrency")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="固定速率模式下最多同时进行的请求数")
+    parser.add_argument("--duration", type=float, default=20, help="每个场景记录的秒数")
+    parser.add_argument("--warmup", type=float, default=2, help="每个场景开始记录前的预热秒数")
+    parser.add_argument("--timeout", type=float, default=30, help="单个请求的超时秒数")
+    parser.add_argument("--seed", type=int, default=0, help="请求序列的随机种子")
+    parser.add_argument("--agent-mcp", choices=["server", "stub"], default="server",
+                        help="agent场景的工具调用访问被测服务器（server）或假服务器（stub）")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="假LLM每次调用的等待（秒）")
+    parser.add_argument("--output", help="JSON结果文件，- 表示输出到标准输出")
+    parser.add_argument("--baseline", help="上一次的JSON结果文件，用于检查性能回退")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="允许的吞吐下降/p99上升比例")
+    args = parser.parse_args()
+
+    # JSON输出到标准输出时，文字报告改为输出到标准错误
+    out = sys.stderr if args.output == "-" else sys.stdout
+    scenarios = ["mcp", "agent"] if args.scenario == "all" else [args.scenario]
+    needs_server = "mcp" in scenarios or args.agent_mcp == "server"
+
+    server = None
+    url = args.url
+    if needs_server and not url:
+        port = free_port()
+        server = start_mcp_server(port, args.cache)
+        url = f"http://localhost:{port}/mcp"
+
+    mode = f"固定速率 {args.rate:g} req/s" if args.rate else f"固定并发 {args.concurrency}"
+    print(f"🚦 MCP服务器负载测试: {mode}，每个场景 {args.duration:g}s（预热 {args.warmup:g}s）", file=out)
+    print("=" * 72, file=out)
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "mode": "rate" if args.rate else "concurrency",
+            "concurrency": None if args.rate else args.concurrency,
+            "rate": args.rate or None,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "url": args.url,
+            "cache": None if args.url else args.cache,
+        },
+        "scenarios": [],
+    }
+
+    try:
+        for name in scenarios:
+            if name == "mcp":
+                scenario = asyncio.run(run_mcp_scenario(url, args))
+            else:
+                llm_port = free_port()
+                stub_port = free_port()
+                start_server(llm_port, create_stub_app(first_token_delay=args.first_token_delay, tool_call=AGENT_TOOL_CALL))
+                if args.agent_mcp == "stub":
+                    start_server(stub_port)
+                    os.environ["MCP_SERVER_PORT"] = str(stub_port)
+                else:
+                    os.environ["MCP_SERVER_PORT"] = str(httpx.URL(url).port)
+                os.environ["MCP_TRANSPORT"] = "http"
+                os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://localhost:{llm_port}/chat"
+                os.environ["AZURE_OPENAI_API_KEY"] = "stub"
+                os.environ["LLM_CACHE_ENABLED"] = "false"
+                scenario = asyncio.run(run_agent_scenario(args))
+                scenario["agent_mcp"] = args.agent_mcp
+                scenario["first_token_delay"] = args.first_token_delay
+            scenario = {"name": name, **scenario}
+            results["scenarios"].append(scenario)
+            print_scenario(scenario, out)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if args.output == "-":
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已写入 {args.output}", file=out)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("-" * 72, file=out)
+        # 负载配置不同时吞吐和延迟没有可比性
+        keys = ("mode", "concurrency", "rate", "duration")
+        if any(baseline["config"].get(key) != results["config"][key] for key in keys):
+            print(f"⚠️  {args.baseline} 的负载配置不同（{', '.join(keys)}），跳过回退检查", file=out)
+            return
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            for line in regressions:
+                print(f"❌ 性能回退: {line}", file=out)
+            sys.exit(1)
+        print(f"✅ 与 {args.baseline} 相比没有超过 {args.max_regression:.0%} 的回退", file=out)
+
+
+if __name__ == "__main__":
+    main()
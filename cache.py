@@ -0,0 +1,503 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+import psycopg
+from pydantic import TypeAdapter
+
+from models import Todo, TodoBulkUpdate, TodoCreate, TodoSearchResult, TodoUpdate
+
+# 列表缓存的代数计数器：写操作递增相关计数器，旧代数下的列表缓存键随之失效
+GENERATION_ALL = "all"
+GENERATION_SEARCH = "search"
+GENERATION_BY_STATUS = {True: "completed", False: "pending"}
+# 单条缓存的代数，只在无法确定受影响id时递增
+GENERATION_IDS = "ids"
+
+# migrations/002_change_notify.sql 中触发器发送通知的频道
+CHANGE_CHANNEL = "todo_changes"
+
+logger = logging.getLogger(__name__)
+
+TODO_LIST = TypeAdapter(List[Todo])
+SEARCH_RESULT_LIST = TypeAdapter(List[TodoSearchResult])
+
+
+class CacheBackend(ABC):
+    """
+    缓存后端接口，值统一为bytes
+
+    计数器（incr/get_counter）不受TTL和容量淘汰影响，用于缓存键的代数。
+    shared为True表示多个进程共用同一个后端，写操作的失效对所有进程立即可见
+    """
+
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, keys: Iterable[str]):
+        ...
+
+    @abstractmethod
+    def incr(self, names: Iterable[str]):
+        ...
+
+    @abstractmethod
+    def get_counter(self, name: str) -> int:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内LRU缓存，同时限制条目数和总字节数，条目过期后在读取时删除"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (过期时间, 值)，按最近使用顺序排列
+        self._entries = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._bytes = 0
+        self.evictions = 0
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        size = len(key) + len(value)
+        # 单个条目超过容量上限时不缓存
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+
+    def incr(self, names: Iterable[str]):
+        with self._lock:
+            for name in names:
+                self._counters[name] = self._counters.get(name, 0) + 1
+
+    def get_counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    基于Redis的共享缓存，多个服务进程共用同一份缓存和失效计数器
+
+    需要安装redis包；Redis应配置为 volatile-* 淘汰策略，避免计数器被淘汰
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "todo-cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("使用Redis缓存需要安装redis: pip install redis")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def delete(self, keys: Iterable[str]):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def incr(self, names: Iterable[str]):
+        pipeline = self.client.pipeline(transaction=False)
+        for name in names:
+            pipeline.incr(f"{self.prefix}gen:{name}")
+        pipeline.execute()
+
+    def get_counter(self, name: str) -> int:
+        return int(self.client.get(f"{self.prefix}gen:{name}") or 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+class TodoCache:
+    """
+    待办事项读缓存：单条缓存键为 todo:{ids代数}:{id}，列表缓存键包含查询参数和对应的代数
+
+    - get_todos(completed=None) 和单条缓存依赖 all 代数，任何写操作都会递增
+    - get_todos(completed=True/False) 分别依赖 completed/pending 代数，
+      只有影响该状态列表的写操作才会递增
+    - search_todos 依赖 search 代数
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 30.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.notifications = 0
+
+    def _record(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def generation(self) -> int:
+        """当前 all 代数，读库前获取，写入缓存时用于判断期间是否发生过写操作"""
+        return self.backend.get_counter(GENERATION_ALL)
+
+    def _todo_key(self, todo_id: int) -> str:
+        return f"todo:{self.backend.get_counter(GENERATION_IDS)}:{todo_id}"
+
+    def get_todo(self, todo_id: int) -> Optional[Todo]:
+        raw = self._record(self.backend.get(self._todo_key(todo_id)))
+        return Todo.model_validate_json(raw) if raw is not None else None
+
+    def set_todo(self, todo: Todo, generation: int):
+        """读库期间发生过写操作时放弃写入，避免缓存旧数据"""
+        if self.generation() == generation:
+            self.backend.set(self._todo_key(todo.id), todo.model_dump_json().encode(), self.ttl)
+
+    def todos_key(self, completed: Optional[bool], limit: Optional[int], cursor: Optional[str]) -> str:
+        name = GENERATION_ALL if completed is None else GENERATION_BY_STATUS[completed]
+        return f"todos:{name}:{self.backend.get_counter(name)}:{limit}:{cursor}"
+
+    def search_key(self, query: str, limit: Optional[int], cursor: Optional[str]) -> str:
+        return f"search:{self.backend.get_counter(GENERATION_SEARCH)}:{limit}:{cursor}:{query}"
+
+    def get_list(self, key: str, search: bool = False) -> Optional[List[Todo]]:
+        raw = self._record(self.backend.get(key))
+        if raw is None:
+            return None
+        return (SEARCH_RESULT_LIST if search else TODO_LIST).validate_json(raw)
+
+    def set_list(self, key: str, todos: List[Todo], search: bool = False):
+        self.backend.set(key, (SEARCH_RESULT_LIST if search else TODO_LIST).dump_json(todos), self.ttl)
+
+    def invalidate(self, todo_ids: Optional[Iterable[int]] = (), statuses: Optional[Iterable[bool]] = None):
+        """
+        删除单条缓存并递增受影响的列表代数
+
+        todo_ids为None表示受影响的id未知（所有单条缓存都失效），
+        statuses为写操作涉及的完成状态，None表示未知（两种状态的列表都失效）
+        """
+        statuses = set(GENERATION_BY_STATUS) if statuses is None else set(statuses)
+        generations = [GENERATION_ALL, GENERATION_SEARCH] + [GENERATION_BY_STATUS[status] for status in statuses]
+        if todo_ids is None:
+            generations.append(GENERATION_IDS)
+        else:
+            self.backend.delete([self._todo_key(todo_id) for todo_id in todo_ids])
+        self.backend.incr(generations)
+        self.invalidations += 1
+
+    def apply_change(self, payload: Dict[str, Any]):
+        """按数据库变更通知失效缓存，通知格式见 migrations/002_change_notify.sql"""
+        statuses = payload.get("statuses")
+        if statuses is None or None in statuses:
+            statuses = None
+        self.invalidate(payload.get("ids"), statuses)
+        self.notifications += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率等统计信息"""
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "notifications": self.notifications,
+            "ttl": self.ttl,
+        }
+        stats.update(self.backend.stats())
+        return stats
+
+
+class ChangeListener:
+    """
+    在后台任务中 LISTEN todo_changes，收到其它进程（或直接访问数据库的客户端）
+    写操作提交后的通知时失效本进程缓存
+
+    连接断开后自动重连；每次（重新）建立监听时整体失效一次，覆盖断开期间丢失的通知。
+    connected为False期间收不到其它进程的写操作，AsyncCachedDatabaseManager 此时不读写缓存
+    """
+
+    def __init__(self, cache: TodoCache, dsn: str, retry_interval: float = 1.0):
+        self.cache = cache
+        self.dsn = dsn
+        self.retry_interval = retry_interval
+        self.connected = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # 连续失败时只在第一次记录完整的异常信息
+        failures = 0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANGE_CHANNEL}")
+                    self.cache.invalidate(None)
+                    self.connected = True
+                    failures = 0
+                    logger.info("缓存失效监听已连接")
+                    async for notify in conn.notifies():
+                        self._apply(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.warning(
+                    "缓存失效监听连接失败或断开（第%d次），%.1f秒后重连，期间不使用缓存: %s",
+                    failures, self.retry_interval, e, exc_info=failures == 1,
+                )
+            finally:
+                self.connected = False
+            await asyncio.sleep(self.retry_interval)
+
+    def _apply(self, payload: str):
+        """无法解析的通知按整体失效处理"""
+        try:
+            self.cache.apply_change(json.loads(payload))
+        except Exception:
+            logger.warning("无法处理的变更通知，整体失效缓存: %r", payload, exc_info=True)
+            self.cache.invalidate(None)
+
+
+def create_cache_from_env() -> Optional[TodoCache]:
+    """
+    根据环境变量创建缓存，TODO_CACHE_BACKEND=none 时返回None
+
+    - TODO_CACHE_BACKEND: memory（默认）、redis 或 none
+    - TODO_CACHE_TTL: 缓存条目的存活秒数
+    - TODO_CACHE_MAX_ENTRIES / TODO_CACHE_MAX_BYTES: 进程内缓存的容量上限
+    - TODO_CACHE_REDIS_URL: Redis连接地址
+    """
+    backend_name = os.getenv("TODO_CACHE_BACKEND", "memory")
+    ttl = float(os.getenv("TODO_CACHE_TTL", 30))
+
+    if backend_name == "none":
+        return None
+    if backend_name == "memory":
+        backend = MemoryCacheBackend(
+            max_entries=int(os.getenv("TODO_CACHE_MAX_ENTRIES", 10000)),
+            max_bytes=int(os.getenv("TODO_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+    elif backend_name == "redis":
+        backend = RedisCacheBackend(os.getenv("TODO_CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        raise ValueError(f"不支持的缓存后端: {backend_name}")
+
+    return TodoCache(backend, ttl=ttl)
+
+
+def _update_statuses(todo_update: TodoUpdate, todo: Todo):
+    """更新操作影响的完成状态：修改了completed时两种状态的列表都受影响"""
+    return None if todo_update.completed is not None else [todo.completed]
+
+
+class AsyncCachedDatabaseManager:
+    """
+    在AsyncDatabaseManager前加一层读缓存
+
+    get_todo_by_id / get_todos / search_todos 先查缓存，写方法执行后精确失效，
+    其余方法直接转发给被包装的AsyncDatabaseManager。
+
+    transaction() 块内的读操作直接查库（避免缓存未提交的数据），
+    块内写操作的失效推迟到事务结束后执行（无论提交还是回滚）。
+    配置了listener而监听未连接时（启动中、数据库重启、重连期间）同样直接查库，
+    避免在收不到其它进程变更通知时返回过期数据
+    """
+
+    def __init__(self, db, cache: TodoCache, listener: Optional[ChangeListener] = None):
+        self.db = db
+        self.cache = cache
+        self.listener = listener
+        # transaction() 块内待执行的失效操作，块外为None
+        self._pending_invalidations = ContextVar("pending_invalidations", default=None)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    def _in_transaction(self) -> bool:
+        return self._pending_invalidations.get() is not None
+
+    def _bypass_cache(self) -> bool:
+        return self._in_transaction() or (self.listener is not None and not self.listener.connected)
+
+    def _invalidate(self, todo_ids: Iterable[int] = (), statuses: Optional[Iterable[bool]] = None):
+        pending = self._pending_invalidations.get()
+        if pending is not None:
+            pending.append((list(todo_ids), statuses))
+        else:
+            self.cache.invalidate(todo_ids, statuses)
+
+    @asynccontextmanager
+    async def transaction(self):
+        if self._in_transaction():
+            async with self.db.transaction():
+                yield
+            return
+
+        pending = []
+        token = self._pending_invalidations.set(pending)
+        try:
+            async with self.db.transaction():
+                yield
+        finally:
+            self._pending_invalidations.reset(token)
+            for todo_ids, statuses in pending:
+                self.cache.invalidate(todo_ids, statuses)
+
+    async def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
+        if self._bypass_cache():
+            return await self.db.get_todo_by_id(todo_id)
+        todo = self.cache.get_todo(todo_id)
+        if todo is not None:
+            return todo
+        generation = self.cache.generation()
+        todo = await self.db.get_todo_by_id(todo_id)
+        if todo is not None:
+            self.cache.set_todo(todo, generation)
+        return todo
+
+    async def get_todos(
+        self,
+        completed: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        if self._bypass_cache():
+            return await self.db.get_todos(completed=completed, limit=limit, cursor=cursor)
+        key = self.cache.todos_key(completed, limit, cursor)
+        todos = self.cache.get_list(key)
+        if todos is None:
+            todos = await self.db.get_todos(completed=completed, limit=limit, cursor=cursor)
+            self.cache.set_list(key, todos)
+        return todos
+
+    async def search_todos(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[TodoSearchResult]:
+        if self._bypass_cache():
+            return await self.db.search_todos(query, limit=limit, cursor=cursor)
+        key = self.cache.search_key(query, limit, cursor)
+        todos = self.cache.get_list(key, search=True)
+        if todos is None:
+            todos = await self.db.search_todos(query, limit=limit, cursor=cursor)
+            self.cache.set_list(key, todos, search=True)
+        return todos
+
+    async def create_todo(self, todo: TodoCreate) -> Todo:
+        created = await self.db.create_todo(todo)
+        self._invalidate(statuses=[created.completed])
+        return created
+
+    async def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        todo = await self.db.update_todo(todo_id, todo_update)
+        if todo is not None:
+            self._invalidate([todo_id], _update_statuses(todo_update, todo))
+        return todo
+
+    async def delete_todo(self, todo_id: int) -> bool:
+        deleted = await self.db.delete_todo(todo_id)
+        if deleted:
+            self._invalidate([todo_id])
+        return deleted
+
+    async def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        created = await self.db.bulk_create_todos(todos)
+        self._invalidate(statuses=[False])
+        return created
+
+    async def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        todos = await self.db.bulk_update_todos(updates)
+        self._invalidate([todo.id for todo in todos])
+        return todos
+
+    async def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        deleted_ids = await self.db.bulk_delete_todos(todo_ids)
+        self._invalidate(deleted_ids)
+        return deleted_ids
+
+    async def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        todos = await self.db.bulk_mark_completed(todo_ids)
+        self._invalidate([todo.id for todo in todos])
+        return todos
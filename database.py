@@ -1,103 +1,1119 @@
 import psycopg2
 import psycopg2.extras
-from typing import List, Optional
-from models import Todo, TodoCreate, TodoUpdate
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+from datetime import date, datetime, timedelta
+from models import Todo, TodoBulkUpdate, TodoCreate, TodoSearchResult, TodoUpdate
+from db_pool import ConnectionPool
+from metrics import REGISTRY, timed
+from storage import TodoStore
+import base64
+import csv
+import functools
+import hashlib
+import itertools
+import json
+import logging
 import os
+import re
+import threading
+import weakref
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class DatabaseManager:
+logger = logging.getLogger(__name__)
+
+# 每个DatabaseManager方法的耗时（包括等待连接池的时间），由 /metrics 导出
+DB_QUERY_SECONDS = REGISTRY.histogram("todo_db_query_duration_seconds", "数据库方法耗时（秒）", ["method"])
+DB_QUERY_ERRORS = REGISTRY.counter("todo_db_query_errors_total", "数据库方法抛出异常的次数", ["method"])
+timed_query = timed(DB_QUERY_SECONDS, DB_QUERY_ERRORS)
+
+# todos表中对外返回的列（不包含内部维护的search_vector）
+TODO_COLUMNS = "id, title, content, due_date, completed, created_at, updated_at"
+
+# UPDATE ... FROM (VALUES ...) 中需要用表别名限定的返回列
+TODO_COLUMNS_T = ", ".join(f"t.{column.strip()}" for column in TODO_COLUMNS.split(","))
+
+GET_TODO_SQL = f"SELECT {TODO_COLUMNS} FROM todos WHERE id = %s"
+DELETE_TODO_SQL = "DELETE FROM todos WHERE id = %s"
+
+# update_todo 可修改的列；每种列组合对应一条固定的UPDATE语句，最多 2**4 = 16 种
+UPDATE_COLUMNS = ("title", "content", "due_date", "completed")
+
+@functools.lru_cache(maxsize=2 ** len(UPDATE_COLUMNS))
+def _update_statement(columns: Tuple[str, ...]) -> str:
+    """列组合对应的UPDATE语句，没有要修改的列时为按id查询"""
+    if not columns:
+        return GET_TODO_SQL
+    assignments = ", ".join(f"{column} = %s" for column in columns)
+    return f"UPDATE todos SET {assignments} WHERE id = %s RETURNING {TODO_COLUMNS}"
+
+def _update_query(todo_id: int, todo_update: TodoUpdate):
+    """根据TodoUpdate中非空的字段选择UPDATE语句，返回 (sql, 参数)"""
+    columns = tuple(column for column in UPDATE_COLUMNS if getattr(todo_update, column) is not None)
+    values = [getattr(todo_update, column) for column in columns]
+    values.append(todo_id)
+    return _update_statement(columns), values
+
+# 服务器端预备语句：热点查询（按id查询/更新/删除、列表）在每个连接上只解析和规划一次。
+# 经过pgbouncer等事务级连接池时预备语句不能跨事务使用，需要设置 DB_PREPARED_STATEMENTS=false
+PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() not in ("0", "false", "no")
+
+@functools.lru_cache(maxsize=256)
+def _statement_name(sql: str) -> str:
+    return "todo_" + hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+def _numbered_placeholders(sql: str) -> str:
+    """把 %s 占位符改写为PREPARE使用的 $1, $2, ..."""
+    counter = itertools.count(1)
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+
+class PreparedStatements:
+    """
+    psycopg2连接上的服务器端预备语句（PREPARE / EXECUTE）
+
+    每个连接记录已经PREPARE过的语句名，之后只发送 EXECUTE 和参数，跳过SQL解析和重复规划。
+    预备语句属于数据库会话，事务回滚后仍然有效，连接关闭后随之失效。
+    """
+    
     def __init__(self):
-        self.connection_string = os.getenv("DATABASE_URL")
+        self._prepared = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.executes = 0
+    
+    def execute(self, cursor, sql: str, values=()):
+        name = _statement_name(sql)
+        conn = cursor.connection
+        with self._lock:
+            prepared = self._prepared.setdefault(conn, set())
+            new = name not in prepared
+        if new:
+            cursor.execute(f"PREPARE {name} AS {_numbered_placeholders(sql)}")
+        with self._lock:
+            if new:
+                prepared.add(name)
+                self.prepares += 1
+            self.executes += 1
+        if values:
+            cursor.execute(f"EXECUTE {name} (" + ", ".join(["%s"] * len(values)) + ")", values)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+    
+    def stats(self) -> dict:
+        return {"prepares": self.prepares, "executes": self.executes}
+
+# 批量写入时每条SQL语句包含的最大行数
+BULK_PAGE_SIZE = 1000
+
+BULK_INSERT_SQL = f"INSERT INTO todos (title, content, due_date) VALUES %s RETURNING {TODO_COLUMNS}"
+BULK_INSERT_TEMPLATE = "(%s, %s, %s)"
+
+# 按id批量更新，值为NULL的字段保持不变（与update_todo忽略None字段的语义一致）
+BULK_UPDATE_SQL = f"""
+    UPDATE todos AS t SET
+        title = COALESCE(v.title, t.title),
+        content = COALESCE(v.content, t.content),
+        due_date = COALESCE(v.due_date, t.due_date),
+        completed = COALESCE(v.completed, t.completed)
+    FROM (VALUES %s) AS v(id, title, content, due_date, completed)
+    WHERE t.id = v.id
+    RETURNING {TODO_COLUMNS_T}
+"""
+BULK_UPDATE_TEMPLATE = "(%s::integer, %s::varchar, %s::text, %s::date, %s::boolean)"
+
+def _bulk_update_rows(updates: List[TodoBulkUpdate]):
+    return [(u.id, u.title, u.content, u.due_date, u.completed) for u in updates]
+
+def _chunks(items: list, size: int = BULK_PAGE_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _multirow_values(template: str, rows: list):
+    """把多行参数展开为 VALUES 子句和扁平的参数列表"""
+    values = []
+    for row in rows:
+        values.extend(row)
+    return ", ".join([template] * len(rows)), values
+
+# COPY导入导出支持的格式和可导入的列
+COPY_FORMATS = ("csv", "ndjson")
+COPY_COLUMNS = ("id", "title", "content", "due_date", "completed", "created_at", "updated_at")
+# COPY FROM STDIN 每次读取的字符数
+COPY_CHUNK_SIZE = 64 * 1024
+# 每处理多少行回调一次进度
+COPY_PROGRESS_EVERY = 1000
+
+# 与查询规划器相同的行数估算：按上次ANALYZE时的每页行数乘以当前页数，只读系统表，耗时与表大小无关。
+# 表从未ANALYZE过（reltuples为-1）时返回NULL
+ESTIMATE_TODO_COUNT_SQL = """
+    SELECT CASE
+        WHEN c.reltuples < 0 THEN NULL
+        WHEN c.relpages = 0 THEN c.reltuples::bigint
+        ELSE (c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int))::bigint
+    END
+    FROM pg_class c
+    WHERE c.oid = 'todos'::regclass
+"""
+
+def _validate_copy_columns(columns: List[str]) -> List[str]:
+    unknown = [column for column in columns if column not in COPY_COLUMNS]
+    if unknown:
+        raise ValueError(f"不支持导入的列: {', '.join(unknown)}")
+    if "title" not in columns:
+        raise ValueError("导入数据缺少title列")
+    return columns
+
+def _csv_field(value) -> str:
+    """COPY ... WITH (FORMAT csv) 的字段：None为未加引号的空值（NULL），字符串总是加引号"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+def _ndjson_to_csv_rows(source: TextIO):
+    """把NDJSON逐行转换为CSV行，列以第一行的字段为准，返回 (columns, 行迭代器)"""
+    lines = (line for line in source if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return [], iter(())
+    
+    first_obj = json.loads(first)
+    columns = _validate_copy_columns(list(first_obj))
+    
+    def rows():
+        for obj in itertools.chain([first_obj], (json.loads(line) for line in lines)):
+            extra = set(obj) - set(columns)
+            if extra:
+                raise ValueError(f"NDJSON行包含第一行中没有的字段: {', '.join(sorted(extra))}")
+            yield ",".join(_csv_field(obj.get(column)) for column in columns) + "\n"
+    
+    return columns, rows()
+
+class _CopyRowReader:
+    """
+    COPY FROM STDIN 的输入：从行迭代器中按块读取，不会一次性加载整个文件
+
+    rows_read 是CSV记录数而不是物理行数：带引号的字段中可以有换行，引号成对闭合时一条记录才结束
+    """
+    
+    def __init__(self, rows: Iterable[str], progress: Optional[Callable[[int], None]] = None):
+        self._rows = iter(rows)
+        self._progress = progress
+        self._reported = 0
+        self._in_quotes = False
+        self.rows_read = 0
+    
+    def read(self, size: int = -1) -> str:
+        parts = []
+        length = 0
+        for row in self._rows:
+            parts.append(row)
+            length += len(row)
+            self._in_quotes ^= row.count('"') % 2 == 1
+            if not self._in_quotes:
+                self.rows_read += 1
+            if 0 < size <= length:
+                break
+        
+        if self._progress and self.rows_read - self._reported >= COPY_PROGRESS_EVERY:
+            self._reported = self.rows_read
+            self._progress(self.rows_read)
+        return "".join(parts)
+
+class _CopyExportWriter:
+    """
+    COPY TO STDOUT 的输出：写入目标文件并统计行数
+
+    unescape_text=True 时还原text格式对反斜杠的转义。row_to_json生成的JSON中不含
+    原始控制字符，text格式输出中唯一的转义就是把反斜杠写成两个反斜杠。
+    CSV格式按记录计数，与 _CopyRowReader 相同，不把带引号字段中的换行算作新的一行。
+    """
+    
+    def __init__(self, target, unescape_text: bool = False, progress: Optional[Callable[[int], None]] = None):
+        self._target = target
+        self._unescape_text = unescape_text
+        self._progress = progress
+        self._carry = b""
+        self._in_quotes = False
+        self._reported = 0
+        self.rows_written = 0
+    
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        
+        if self._unescape_text:
+            data = self._carry + data
+            # 块末尾落单的反斜杠留到下一块，避免把一对转义拆开
+            trailing = len(data) - len(data.rstrip(b"\\"))
+            self._carry = b"\\" if trailing % 2 else b""
+            if self._carry:
+                data = data[:-1]
+            data = data.replace(b"\\\\", b"\\")
+        
+        self._target.write(data)
+        if self._unescape_text:
+            self.rows_written += data.count(b"\n")
+        else:
+            *lines, tail = data.split(b"\n")
+            for line in lines:
+                self._in_quotes ^= line.count(b'"') % 2 == 1
+                if not self._in_quotes:
+                    self.rows_written += 1
+            self._in_quotes ^= tail.count(b'"') % 2 == 1
+        if self._progress and self.rows_written - self._reported >= COPY_PROGRESS_EVERY:
+            self._reported = self.rows_written
+            self._progress(self.rows_written)
+        return len(data)
+
+# 搜索模式：fulltext 使用 migrations/001_fulltext_search.sql 建立的全文检索和三元组索引，
+# ilike 为不依赖迁移的全表扫描
+SEARCH_MODE_FULLTEXT = "fulltext"
+SEARCH_MODE_ILIKE = "ilike"
+
+# fulltext模式依赖 migrations/001_fulltext_search.sql 创建的 search_vector 列和 pg_trgm 的 similarity()
+FULLTEXT_CHECK_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'todos' AND column_name = 'search_vector'
+    ) AND to_regprocedure('similarity(text, text)') IS NOT NULL
+"""
+
+def _checked_search_mode(fulltext_available: bool) -> str:
+    """fulltext模式的检查结果：数据库未迁移时记录警告并退回ilike"""
+    if fulltext_available:
+        return SEARCH_MODE_FULLTEXT
+    logger.warning(
+        "数据库缺少全文检索迁移（search_vector列或pg_trgm扩展），搜索改用ilike；"
+        "执行 python main.py migrate 后重启服务即可使用fulltext"
+    )
+    return SEARCH_MODE_ILIKE
+
+# 与 todo_cjk_segment() 使用相同的中日韩字符范围
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+")
+_WORD = re.compile(r"[^\W_]+")
+
+def build_search_tsquery(query: str) -> Optional[str]:
+    """
+    把搜索词转换为to_tsquery表达式，分词方式与todo_cjk_segment()一致：
+    连续的CJK字符按二元组做短语匹配，单个CJK字符和其它单词做前缀匹配，各部分之间为AND。
+    没有可检索的词时返回None。
+    """
+    text = query.lower()
+    parts = []
+    pos = 0
+    
+    for match in _CJK_RUN.finditer(text):
+        parts.extend(f"'{word}':*" for word in _WORD.findall(text[pos:match.start()]))
+        run = match.group()
+        if len(run) == 1:
+            parts.append(f"'{run}':*")
+        else:
+            bigrams = [f"'{run[i:i + 2]}'" for i in range(len(run) - 1)]
+            parts.append("(" + " <-> ".join(bigrams) + ")")
+        pos = match.end()
+    
+    parts.extend(f"'{word}':*" for word in _WORD.findall(text[pos:]))
+    return " & ".join(parts) or None
+
+def encode_cursor(todo: Todo) -> str:
+    """
+    把一页最后一条记录的排序键编码为不透明的分页游标：
+    普通列表为 (created_at, id)，按相关度排序的搜索结果额外包含rank
+    """
+    key = [todo.created_at.isoformat(), todo.id]
+    rank = getattr(todo, "rank", None)
+    if rank is not None:
+        key.append(rank)
+    raw = json.dumps(key)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, Optional[float]]:
+    """解析分页游标，返回 (created_at, id, rank)，格式不正确时抛出ValueError"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at, todo_id = key[0], key[1]
+        rank = float(key[2]) if len(key) > 2 else None
+        return datetime.fromisoformat(created_at), int(todo_id), rank
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+
+def encode_due_cursor(todo: Todo) -> str:
+    """按截止日期排序的列表（get_todos_due）的分页游标，排序键为 (due_date, id)"""
+    raw = json.dumps(["due", todo.due_date.isoformat(), todo.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_due_cursor(cursor: str) -> Tuple[date, int]:
+    """解析截止日期分页游标，返回 (due_date, id)，格式不正确时抛出ValueError"""
+    try:
+        kind, due_date, todo_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if kind != "due":
+            raise ValueError(kind)
+        return date.fromisoformat(due_date), int(todo_id)
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+
+# get_todos_due 支持的快捷时间段
+DUE_PERIODS = ("today", "tomorrow", "this_week", "next_7_days")
+
+def due_period(period: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """
+    时间段对应的截止日期范围 (start, end)，两端都包含：
+    this_week 为本周一到周日，next_7_days 为今天起的7天
+    """
+    today = today or date.today()
+    if period == "today":
+        return today, today
+    if period == "tomorrow":
+        tomorrow = today + timedelta(days=1)
+        return tomorrow, tomorrow
+    if period == "this_week":
+        monday = today - timedelta(days=today.weekday())
+        return monday, monday + timedelta(days=6)
+    if period == "next_7_days":
+        return today, today + timedelta(days=6)
+    raise ValueError(f"不支持的时间段: {period}，可选: {', '.join(DUE_PERIODS)}")
+
+def _build_due_query(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    completed: Optional[bool] = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    placeholder: str = "%s",
+):
+    """
+    构建按截止日期查询的SQL，结果按 (due_date, id) 正序（最早到期的在前），cursor为 encode_due_cursor() 生成的游标
+
+    完成状态直接写在SQL中而不是作为参数，completed=False 时规划器可以使用
+    部分索引 idx_todos_due_date_open (due_date, id) WHERE NOT completed（预备语句的通用计划同样适用）
+    """
+    conditions = ["due_date IS NOT NULL"]
+    values = []
+    
+    if completed is not None:
+        conditions.append("completed" if completed else "NOT completed")
+    
+    if start is not None:
+        conditions.append(f"due_date >= {placeholder}")
+        values.append(start)
+    
+    if end is not None:
+        conditions.append(f"due_date <= {placeholder}")
+        values.append(end)
+    
+    if cursor is not None:
+        due_date, todo_id = decode_due_cursor(cursor)
+        conditions.append(f"(due_date, id) > ({placeholder}, {placeholder})")
+        values.extend([due_date, todo_id])
+    
+    query = f"SELECT {TODO_COLUMNS} FROM todos WHERE {' AND '.join(conditions)} ORDER BY due_date, id"
+    
+    if limit is not None:
+        query += f" LIMIT {placeholder}"
+        values.append(limit)
+    
+    return query, values
+
+# todo_stats 的截止日期直方图默认统计的周数和上限
+STATS_WEEKS = 4
+MAX_STATS_WEEKS = 52
+
+def _stats_weeks(today: date, weeks: int) -> List[Tuple[date, date]]:
+    """直方图各周的 [start, end) 范围：第一周从今天到本周日，之后每周从周一开始"""
+    monday = today - timedelta(days=today.weekday())
+    starts = [today] + [monday + timedelta(weeks=i) for i in range(1, weeks + 1)]
+    return list(zip(starts, starts[1:]))
+
+def _build_stats_query(today: date, weeks: int = STATS_WEEKS, placeholder: str = "%s"):
+    """
+    构建 todo_stats 的聚合SQL，结果为一行：total、completed、no_due_date、overdue、due_today、
+    week_0..week_{weeks-1} 和 due_later
+
+    按完成状态的计数扫描全表；按截止日期的计数只需要有截止日期的未完成事项，
+    单独聚合可以只扫描部分索引 idx_todos_due_date_open，两部分在同一条语句中返回
+    """
+    ph = placeholder
+    ranges = _stats_weeks(today, weeks)
+    due_columns = [
+        f"count(*) FILTER (WHERE due_date < {ph}) AS overdue",
+        f"count(*) FILTER (WHERE due_date = {ph}) AS due_today",
+    ]
+    values = [today, today]
+    for i, (start, end) in enumerate(ranges):
+        due_columns.append(f"count(*) FILTER (WHERE due_date >= {ph} AND due_date < {ph}) AS week_{i}")
+        values.extend([start, end])
+    due_columns.append(f"count(*) FILTER (WHERE due_date >= {ph}) AS due_later")
+    values.append(ranges[-1][1])
+    
+    query = f"""
+        SELECT * FROM
+            (SELECT count(*) AS total,
+                    count(*) FILTER (WHERE completed) AS completed,
+                    count(*) FILTER (WHERE NOT completed AND due_date IS NULL) AS no_due_date
+             FROM todos) AS status_counts,
+            (SELECT {', '.join(due_columns)}
+             FROM todos WHERE NOT completed AND due_date IS NOT NULL) AS due_counts
+    """
+    return query, values
+
+def _stats_from_row(row: dict, today: date, weeks: int = STATS_WEEKS) -> dict:
+    """把聚合结果整理成 todo_stats 的返回值"""
+    return {
+        "today": today,
+        "total": row["total"],
+        "completed": row["completed"],
+        "pending": row["total"] - row["completed"],
+        "overdue": row["overdue"],
+        "due_today": row["due_today"],
+        "no_due_date": row["no_due_date"],
+        "due_by_week": [
+            {"week_start": start, "count": row[f"week_{i}"]}
+            for i, (start, _) in enumerate(_stats_weeks(today, weeks))
+        ],
+        "due_later": row["due_later"],
+    }
+
+def _build_list_query(
+    completed: Optional[bool] = None,
+    search: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    search_mode: str = SEARCH_MODE_FULLTEXT,
+):
+    """
+    构建列表查询，cursor存在时只返回游标之后的记录（keyset分页）
+
+    - 普通列表和ilike搜索按 (created_at, id) 倒序
+    - fulltext搜索按 (rank, created_at, id) 倒序，rank为全文检索相关度加标题三元组相似度
+    """
+    columns = TODO_COLUMNS
+    conditions = []
+    values = []
+    order_key = "created_at, id"
+    rank_values = []
+    
+    tsquery = build_search_tsquery(search) if search is not None and search_mode == SEARCH_MODE_FULLTEXT else None
+    
+    if tsquery is not None:
+        rank_expr = "(ts_rank_cd(search_vector, to_tsquery('simple', %s)) + similarity(title, %s))::float8"
+        rank_values = [tsquery, search]
+        columns += f", {rank_expr} AS rank"
+        values.extend(rank_values)
         
+        match = "search_vector @@ to_tsquery('simple', %s)"
+        match_values = [tsquery]
+        # 三元组索引可以处理3个字符以上的任意子串；单字查询在二元组中可能出现在第二个字，同样需要子串匹配
+        if len(search) >= 3 or len(search) == 1:
+            match += " OR title ILIKE %s OR content ILIKE %s"
+            match_values.extend([f"%{search}%", f"%{search}%"])
+        conditions.append(f"({match})")
+        values.extend(match_values)
+        order_key = f"{rank_expr}, created_at, id"
+    elif search is not None:
+        conditions.append("(title ILIKE %s OR content ILIKE %s)")
+        values.extend([f"%{search}%", f"%{search}%"])
+    
+    if completed is not None:
+        conditions.append("completed = %s")
+        values.append(completed)
+    
+    if cursor is not None:
+        created_at, todo_id, rank = decode_cursor(cursor)
+        if tsquery is not None:
+            if rank is None:
+                raise ValueError(f"无效的分页游标: {cursor}")
+            conditions.append(f"({order_key}) < (%s, %s, %s)")
+            values.extend(rank_values + [rank, created_at, todo_id])
+        else:
+            conditions.append("(created_at, id) < (%s, %s)")
+            values.extend([created_at, todo_id])
+    
+    query = f"SELECT {columns} FROM todos"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    if tsquery is not None:
+        query += " ORDER BY rank DESC, created_at DESC, id DESC"
+    else:
+        query += " ORDER BY created_at DESC, id DESC"
+    
+    if limit is not None:
+        query += " LIMIT %s"
+        values.append(limit)
+    
+    return query, values
+
+class DatabaseManager(TodoStore):
+    """PostgreSQL存储后端（psycopg2 + 线程安全连接池）"""
+    
+    def __init__(self, connection_string: Optional[str] = None):
+        self.connection_string = connection_string or os.getenv("DATABASE_URL")
+        self.search_mode = os.getenv("TODO_SEARCH_MODE", SEARCH_MODE_FULLTEXT)
+        # fulltext模式在首次搜索时确认数据库已迁移（见 _check_search_mode）
+        self._fulltext_checked = False
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.statements = PreparedStatements() if PREPARED_STATEMENTS else None
+    
+    def _check_search_mode(self, conn) -> str:
+        """返回实际使用的搜索模式：fulltext模式首次使用时检查依赖的迁移对象，缺失时退回ilike"""
+        if self.search_mode == SEARCH_MODE_FULLTEXT and not self._fulltext_checked:
+            with conn.cursor() as cursor:
+                cursor.execute(FULLTEXT_CHECK_SQL)
+                self.search_mode = _checked_search_mode(cursor.fetchone()[0])
+            self._fulltext_checked = True
+        return self.search_mode
+    
+    def _execute(self, cursor, sql: str, values=()):
+        """热点查询走预备语句（DB_PREPARED_STATEMENTS=false 时直接执行）"""
+        if self.statements is not None:
+            self.statements.execute(cursor, sql, values)
+        else:
+            cursor.execute(sql, values)
+    
+    @property
+    def pool(self) -> ConnectionPool:
+        """延迟创建连接池，避免在导入或fork之前建立连接"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        self.connection_string,
+                        min_size=int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+                        max_size=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                        timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+                        max_idle=float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+                    )
+        return self._pool
+    
     def get_connection(self):
-        return psycopg2.connect(self.connection_string)
+        """从连接池借出连接，with块结束时提交（异常时回滚）并归还"""
+        return self.pool.connection()
+    
+    def pool_stats(self) -> dict:
+        """连接池统计信息"""
+        if self._pool is None:
+            return {}
+        return self._pool.stats()
+    
+    def ping(self):
+        """借出连接执行 SELECT 1，连接池或数据库不可用时抛出异常"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
     
+    @timed_query
+    def estimate_todo_count(self) -> int:
+        """估算待办事项总数（pg_class.reltuples），表从未ANALYZE过时退回 count(*)"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(ESTIMATE_TODO_COUNT_SQL)
+                estimate = cursor.fetchone()[0]
+                if estimate is None:
+                    cursor.execute("SELECT count(*) FROM todos")
+                    estimate = cursor.fetchone()[0]
+                return estimate
+    
+    def close(self):
+        """关闭连接池"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+    
+    @timed_query
     def create_todo(self, todo: TodoCreate) -> Todo:
         with self.get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                 cursor.execute(
-                    """
+                    f"""
                     INSERT INTO todos (title, content, due_date) 
                     VALUES (%s, %s, %s) 
-                    RETURNING *
+                    RETURNING {TODO_COLUMNS}
                     """,
                     (todo.title, todo.content, todo.due_date)
                 )
                 result = cursor.fetchone()
                 return Todo(**result)
     
-    def get_todos(self, completed: Optional[bool] = None) -> List[Todo]:
+    @timed_query
+    def get_todos(
+        self,
+        completed: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        query, values = _build_list_query(completed=completed, limit=limit, cursor=cursor)
         with self.get_connection() as conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                if completed is not None:
-                    cursor.execute(
-                        "SELECT * FROM todos WHERE completed = %s ORDER BY created_at DESC",
-                        (completed,)
-                    )
-                else:
-                    cursor.execute("SELECT * FROM todos ORDER BY created_at DESC")
-                
-                results = cursor.fetchall()
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as db_cursor:
+                self._execute(db_cursor, query, values)
+                results = db_cursor.fetchall()
                 return [Todo(**row) for row in results]
     
+    @timed_query
+    def get_todos_due(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        completed: Optional[bool] = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        query, values = _build_due_query(start=start, end=end, completed=completed, limit=limit, cursor=cursor)
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as db_cursor:
+                self._execute(db_cursor, query, values)
+                return [Todo(**row) for row in db_cursor.fetchall()]
+    
+    @timed_query
+    def get_todo_stats(self, today: Optional[date] = None, weeks: int = STATS_WEEKS) -> dict:
+        today = today or date.today()
+        query, values = _build_stats_query(today, weeks)
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as db_cursor:
+                self._execute(db_cursor, query, values)
+                return _stats_from_row(db_cursor.fetchone(), today, weeks)
+    
+    def iter_todos(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Todo]:
+        """通过服务器端命名游标逐批读取，内存占用与结果集大小无关"""
+        with self.get_connection() as conn:
+            search_mode = self._check_search_mode(conn) if search is not None else self.search_mode
+            query, values = _build_list_query(
+                completed=completed, search=search, limit=limit, cursor=cursor, search_mode=search_mode
+            )
+            with conn.cursor(name="todos_stream", cursor_factory=psycopg2.extras.RealDictCursor) as db_cursor:
+                db_cursor.itersize = batch_size
+                db_cursor.execute(query, values)
+                for row in db_cursor:
+                    yield TodoSearchResult(**row) if search is not None else Todo(**row)
+    
+    @timed_query
     def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
         with self.get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                cursor.execute("SELECT * FROM todos WHERE id = %s", (todo_id,))
+                self._execute(cursor, GET_TODO_SQL, (todo_id,))
                 result = cursor.fetchone()
                 return Todo(**result) if result else None
     
+    @timed_query
     def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        # 没有要修改的字段时为按id查询，同样只用一个连接、一次往返
+        query, values = _update_query(todo_id, todo_update)
         with self.get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-                # 构建动态更新查询
-                update_fields = []
-                values = []
-                
-                if todo_update.title is not None:
-                    update_fields.append("title = %s")
-                    values.append(todo_update.title)
-                
-                if todo_update.content is not None:
-                    update_fields.append("content = %s")
-                    values.append(todo_update.content)
-                
-                if todo_update.due_date is not None:
-                    update_fields.append("due_date = %s")
-                    values.append(todo_update.due_date)
-                
-                if todo_update.completed is not None:
-                    update_fields.append("completed = %s")
-                    values.append(todo_update.completed)
-                
-                if not update_fields:
-                    return self.get_todo_by_id(todo_id)
-                
-                values.append(todo_id)
-                query = f"UPDATE todos SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
-                
-                cursor.execute(query, values)
+                self._execute(cursor, query, values)
                 result = cursor.fetchone()
                 return Todo(**result) if result else None
     
+    @timed_query
     def delete_todo(self, todo_id: int) -> bool:
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute("DELETE FROM todos WHERE id = %s", (todo_id,))
+                self._execute(cursor, DELETE_TODO_SQL, (todo_id,))
                 return cursor.rowcount > 0
     
-    def search_todos(self, query: str) -> List[Todo]:
+    @timed_query
+    def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        """多行INSERT批量创建，返回创建的待办事项"""
+        rows = [(todo.title, todo.content, todo.due_date) for todo in todos]
+        if not rows:
+            return []
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                results = psycopg2.extras.execute_values(
+                    cursor, BULK_INSERT_SQL, rows,
+                    template=BULK_INSERT_TEMPLATE, page_size=BULK_PAGE_SIZE, fetch=True
+                )
+                return [Todo(**row) for row in results]
+    
+    @timed_query
+    def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        """UPDATE ... FROM (VALUES ...) 批量更新，返回更新后的待办事项（不存在的id会被忽略）"""
+        rows = _bulk_update_rows(updates)
+        if not rows:
+            return []
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                results = psycopg2.extras.execute_values(
+                    cursor, BULK_UPDATE_SQL, rows,
+                    template=BULK_UPDATE_TEMPLATE, page_size=BULK_PAGE_SIZE, fetch=True
+                )
+                return [Todo(**row) for row in results]
+    
+    @timed_query
+    def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        """批量删除，返回实际删除的id"""
+        if not todo_ids:
+            return []
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM todos WHERE id = ANY(%s) RETURNING id", (list(todo_ids),))
+                return [row[0] for row in cursor.fetchall()]
+    
+    @timed_query
+    def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        """批量标记为已完成，返回更新后的待办事项"""
+        if not todo_ids:
+            return []
         with self.get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                 cursor.execute(
-                    """
-                    SELECT * FROM todos 
-                    WHERE title ILIKE %s OR content ILIKE %s 
-                    ORDER BY created_at DESC
+                    f"UPDATE todos SET completed = TRUE WHERE id = ANY(%s) RETURNING {TODO_COLUMNS}",
+                    (list(todo_ids),)
+                )
+                return [Todo(**row) for row in cursor.fetchall()]
+    
+    @timed_query
+    def export_todos(self, target, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        通过 COPY TO STDOUT 把todos表流式导出到二进制文件target，返回导出的行数
+
+        fmt为csv（带表头）或ndjson（每行一个JSON对象），progress定期以已导出行数回调
+        """
+        if fmt == "csv":
+            sql = f"COPY (SELECT {TODO_COLUMNS} FROM todos ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        elif fmt == "ndjson":
+            sql = f"COPY (SELECT row_to_json(t) FROM (SELECT {TODO_COLUMNS} FROM todos ORDER BY id) t) TO STDOUT"
+        else:
+            raise ValueError(f"不支持的格式: {fmt}，可选: {', '.join(COPY_FORMATS)}")
+        
+        writer = _CopyExportWriter(target, unescape_text=(fmt == "ndjson"), progress=progress)
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(sql, writer)
+                return cursor.rowcount
+    
+    @timed_query
+    def import_todos(self, source: TextIO, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        通过 COPY FROM STDIN 把文本文件source流式导入todos表，返回导入的行数
+
+        CSV需要表头行，NDJSON的列以第一行的字段为准；可导入的列见COPY_COLUMNS。
+        整个导入在一个事务中完成，包含id列时会同步更新id序列。
+        """
+        if fmt == "csv":
+            header = source.readline()
+            if not header.strip():
+                return 0
+            columns = _validate_copy_columns([column.strip() for column in next(csv.reader([header]))])
+            rows = source
+        elif fmt == "ndjson":
+            columns, rows = _ndjson_to_csv_rows(source)
+            if not columns:
+                return 0
+        else:
+            raise ValueError(f"不支持的格式: {fmt}，可选: {', '.join(COPY_FORMATS)}")
+        
+        reader = _CopyRowReader(rows, progress=progress)
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY todos ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    reader,
+                    size=COPY_CHUNK_SIZE
+                )
+                imported = cursor.rowcount
+                if "id" in columns:
+                    cursor.execute(
+                        "SELECT setval(pg_get_serial_sequence('todos', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM todos"
+                    )
+                return imported
+    
+    @timed_query
+    def search_todos(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[TodoSearchResult]:
+        with self.get_connection() as conn:
+            sql, values = _build_list_query(
+                search=query, limit=limit, cursor=cursor, search_mode=self._check_search_mode(conn)
+            )
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as db_cursor:
+                db_cursor.execute(sql, values)
+                results = db_cursor.fetchall()
+                return [TodoSearchResult(**row) for row in results]
+
+
+class AsyncDatabaseManager:
+    """
+    DatabaseManager的异步版本，接口与DatabaseManager一致
+
+    基于psycopg 3的异步驱动和AsyncConnectionPool，查询期间不会阻塞事件循环，
+    并发请求的数据库I/O可以互相重叠。使用前需要 await open()。
+    """
+
+    def __init__(self, connection_string: Optional[str] = None):
+        self.connection_string = connection_string or os.getenv("DATABASE_URL")
+        self.search_mode = os.getenv("TODO_SEARCH_MODE", SEARCH_MODE_FULLTEXT)
+        self._fulltext_checked = False
+        self.pool = AsyncConnectionPool(
+            self.connection_string,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            max_idle=float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            check=AsyncConnectionPool.check_connection,
+            # 关闭预备语句时也不让psycopg自动预备重复执行的查询
+            kwargs=None if PREPARED_STATEMENTS else {"prepare_threshold": None},
+            open=False,
+        )
+        # 热点查询在每个连接上首次执行时就预备（psycopg默认执行5次后才预备）
+        self.prepare = PREPARED_STATEMENTS
+        # transaction() 块内绑定的连接
+        self._transaction_connection = ContextVar("transaction_connection", default=None)
+    
+    async def _check_search_mode(self, conn) -> str:
+        """与 DatabaseManager._check_search_mode 相同，首次搜索时检查"""
+        if self.search_mode == SEARCH_MODE_FULLTEXT and not self._fulltext_checked:
+            async with conn.cursor() as cursor:
+                await cursor.execute(FULLTEXT_CHECK_SQL)
+                self.search_mode = _checked_search_mode((await cursor.fetchone())[0])
+            self._fulltext_checked = True
+        return self.search_mode
+    
+    async def open(self):
+        """打开连接池"""
+        await self.pool.open()
+    
+    async def close(self):
+        """关闭连接池"""
+        await self.pool.close()
+    
+    @asynccontextmanager
+    async def get_connection(self):
+        """
+        从连接池借出连接，async with块结束时提交（异常时回滚）并归还；
+        在 transaction() 块内则复用事务绑定的连接，由事务统一提交
+        """
+        conn = self._transaction_connection.get()
+        if conn is not None:
+            yield conn
+            return
+        
+        async with self.pool.connection() as conn:
+            yield conn
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        在一个数据库事务中执行块内的所有方法调用：正常退出时提交，异常时整体回滚
+        """
+        if self._transaction_connection.get() is not None:
+            yield
+            return
+        
+        async with self.pool.connection() as conn:
+            token = self._transaction_connection.set(conn)
+            try:
+                yield
+            finally:
+                self._transaction_connection.reset(token)
+    
+    def pool_stats(self) -> dict:
+        """连接池统计信息"""
+        return self.pool.get_stats()
+    
+    async def ping(self, timeout: Optional[float] = None):
+        """
+        在timeout秒内从连接池借出连接执行 SELECT 1，连接池饱和或数据库不可用时抛出异常
+        """
+        async with self.pool.connection(timeout=timeout) as conn:
+            await conn.execute("SELECT 1")
+    
+    @timed_query
+    async def estimate_todo_count(self) -> int:
+        """估算待办事项总数（pg_class.reltuples），表从未ANALYZE过时退回 count(*)"""
+        async with self.get_connection() as conn:
+            cursor = await conn.execute(ESTIMATE_TODO_COUNT_SQL)
+            estimate = (await cursor.fetchone())[0]
+            if estimate is None:
+                cursor = await conn.execute("SELECT count(*) FROM todos")
+                estimate = (await cursor.fetchone())[0]
+            return estimate
+    
+    @timed_query
+    async def create_todo(self, todo: TodoCreate) -> Todo:
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(
+                    f"""
+                    INSERT INTO todos (title, content, due_date) 
+                    VALUES (%s, %s, %s) 
+                    RETURNING {TODO_COLUMNS}
                     """,
-                    (f"%{query}%", f"%{query}%")
+                    (todo.title, todo.content, todo.due_date)
                 )
-                results = cursor.fetchall()
+                result = await cursor.fetchone()
+                return Todo(**result)
+    
+    @timed_query
+    async def get_todos(
+        self,
+        completed: Optional[bool] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        query, values = _build_list_query(completed=completed, limit=limit, cursor=cursor)
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as db_cursor:
+                await db_cursor.execute(query, values, prepare=self.prepare)
+                results = await db_cursor.fetchall()
                 return [Todo(**row) for row in results]
+    
+    @timed_query
+    async def get_todos_due(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        completed: Optional[bool] = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        query, values = _build_due_query(start=start, end=end, completed=completed, limit=limit, cursor=cursor)
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as db_cursor:
+                await db_cursor.execute(query, values, prepare=self.prepare)
+                return [Todo(**row) for row in await db_cursor.fetchall()]
+    
+    async def get_overdue_todos(
+        self, today: Optional[date] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        """截止日期早于今天且未完成的待办事项，最早到期的在前"""
+        today = today or date.today()
+        return await self.get_todos_due(end=today - timedelta(days=1), completed=False, limit=limit, cursor=cursor)
+    
+    @timed_query
+    async def get_todo_stats(self, today: Optional[date] = None, weeks: int = STATS_WEEKS) -> dict:
+        """按完成状态、逾期和截止周统计的数量，见 _stats_from_row()"""
+        today = today or date.today()
+        query, values = _build_stats_query(today, weeks)
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as db_cursor:
+                await db_cursor.execute(query, values, prepare=self.prepare)
+                return _stats_from_row(await db_cursor.fetchone(), today, weeks)
+    
+    async def iter_todos(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Todo]:
+        """通过服务器端命名游标逐批读取，内存占用与结果集大小无关"""
+        async with self.get_connection() as conn:
+            search_mode = await self._check_search_mode(conn) if search is not None else self.search_mode
+            query, values = _build_list_query(
+                completed=completed, search=search, limit=limit, cursor=cursor, search_mode=search_mode
+            )
+            async with conn.cursor(name="todos_stream", row_factory=dict_row) as db_cursor:
+                db_cursor.itersize = batch_size
+                await db_cursor.execute(query, values)
+                async for row in db_cursor:
+                    yield TodoSearchResult(**row) if search is not None else Todo(**row)
+    
+    @timed_query
+    async def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(GET_TODO_SQL, (todo_id,), prepare=self.prepare)
+                result = await cursor.fetchone()
+                return Todo(**result) if result else None
+    
+    @timed_query
+    async def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        query, values = _update_query(todo_id, todo_update)
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(query, values, prepare=self.prepare)
+                result = await cursor.fetchone()
+                return Todo(**result) if result else None
+    
+    @timed_query
+    async def delete_todo(self, todo_id: int) -> bool:
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(DELETE_TODO_SQL, (todo_id,), prepare=self.prepare)
+                return cursor.rowcount > 0
+    
+    @timed_query
+    async def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        """多行INSERT批量创建，返回创建的待办事项"""
+        rows = [(todo.title, todo.content, todo.due_date) for todo in todos]
+        results = []
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                for chunk in _chunks(rows):
+                    placeholders, values = _multirow_values(BULK_INSERT_TEMPLATE, chunk)
+                    await cursor.execute(BULK_INSERT_SQL.replace("%s", placeholders, 1), values)
+                    results.extend(await cursor.fetchall())
+        return [Todo(**row) for row in results]
+    
+    @timed_query
+    async def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        """UPDATE ... FROM (VALUES ...) 批量更新，返回更新后的待办事项（不存在的id会被忽略）"""
+        rows = _bulk_update_rows(updates)
+        results = []
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                for chunk in _chunks(rows):
+                    placeholders, values = _multirow_values(BULK_UPDATE_TEMPLATE, chunk)
+                    await cursor.execute(BULK_UPDATE_SQL.replace("%s", placeholders, 1), values)
+                    results.extend(await cursor.fetchall())
+        return [Todo(**row) for row in results]
+    
+    @timed_query
+    async def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        """批量删除，返回实际删除的id"""
+        if not todo_ids:
+            return []
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("DELETE FROM todos WHERE id = ANY(%s) RETURNING id", (list(todo_ids),))
+                return [row[0] for row in await cursor.fetchall()]
+    
+    @timed_query
+    async def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        """批量标记为已完成，返回更新后的待办事项"""
+        if not todo_ids:
+            return []
+        async with self.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                await cursor.execute(
+                    f"UPDATE todos SET completed = TRUE WHERE id = ANY(%s) RETURNING {TODO_COLUMNS}",
+                    (list(todo_ids),)
+                )
+                return [Todo(**row) for row in await cursor.fetchall()]
+    
+    @timed_query
+    async def search_todos(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[TodoSearchResult]:
+        async with self.get_connection() as conn:
+            sql, values = _build_list_query(
+                search=query, limit=limit, cursor=cursor, search_mode=await self._check_search_mode(conn)
+            )
+            async with conn.cursor(row_factory=dict_row) as db_cursor:
+                await db_cursor.execute(sql, values)
+                results = await db_cursor.fetchall()
+                return [TodoSearchResult(**row) for row in results]
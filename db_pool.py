@@ -0,0 +1,258 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """在超时时间内无法从连接池获取连接"""
+
+
+class ConnectionPool:
+    """
+    线程安全的有界psycopg2连接池
+
+    - min_size/max_size: 连接池保持的最小连接数与允许的最大连接数
+    - timeout: 连接池饱和时等待可用连接的最长秒数
+    - max_idle: 空闲超过该秒数的连接会被回收（保留min_size个）
+    - health_check_after: 空闲超过该秒数的连接在借出前会执行 SELECT 1 检查
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        health_check_after: float = 5.0,
+        reap_interval: float = 60.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"无效的连接池大小: min_size={min_size}, max_size={max_size}")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.reap_interval = reap_interval
+
+        self._cond = threading.Condition()
+        # 空闲连接队列，元素为 (connection, 归还时间)
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_waits": 0,
+            "checkout_timeouts": 0,
+            "checkout_wait_seconds": 0.0,
+            "health_check_failures": 0,
+            "connections_reaped": 0,
+            "max_in_use": 0,
+        }
+
+        for _ in range(min_size):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+            self._size += 1
+            self._stats["connections_created"] += 1
+
+        self._reaper_stop = threading.Event()
+        self._reaper = None
+        if reap_interval > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, name="db-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _connect(self):
+        return psycopg2.connect(self.dsn)
+
+    def _close_connection(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats["connections_closed"] += 1
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        """借出前检查连接是否可用"""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """从连接池借出一个连接，连接池饱和时最多等待timeout秒"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_started = time.monotonic()
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("连接池已关闭")
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    # 预占一个名额，在锁外建立连接
+                    self._size += 1
+                    conn = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["checkout_timeouts"] += 1
+                    raise PoolTimeout(
+                        f"等待数据库连接超时（{self.timeout}秒），连接池已满: {self.max_size}"
+                    )
+
+                if not waited:
+                    waited = True
+                    self._stats["checkout_waits"] += 1
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if conn is not None and not self._is_healthy(conn, time.monotonic() - returned_at):
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+                self._close_connection(conn)
+            conn = None
+
+        created = False
+        if conn is None:
+            try:
+                conn = self._connect()
+                created = True
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            if created:
+                self._stats["connections_created"] += 1
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["checkout_wait_seconds"] += time.monotonic() - wait_started
+            in_use = self._size - len(self._idle)
+            if in_use > self._stats["max_in_use"]:
+                self._stats["max_in_use"] = in_use
+
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """归还连接；discard为True或连接已损坏时直接关闭"""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._close_connection(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        借出连接的上下文管理器：正常退出时提交，异常时回滚，最后归还连接池
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def reap_idle(self) -> int:
+        """关闭空闲时间超过max_idle的连接，保留至少min_size个连接"""
+        now = time.monotonic()
+        reaped = 0
+        with self._cond:
+            kept = deque()
+            # 队列头部是最早归还的连接
+            while self._idle:
+                conn, returned_at = self._idle.popleft()
+                if self._size > self.min_size and now - returned_at > self.max_idle:
+                    self._close_connection(conn)
+                    self._size -= 1
+                    reaped += 1
+                else:
+                    kept.append((conn, returned_at))
+            self._idle = kept
+            self._stats["connections_reaped"] += reaped
+        return reaped
+
+    def _reap_loop(self):
+        while not self._reaper_stop.wait(self.reap_interval):
+            try:
+                self.reap_idle()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池状态及饱和度指标"""
+        with self._cond:
+            idle = len(self._idle)
+            in_use = self._size - idle
+            stats = dict(self._stats)
+            stats.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "saturation": in_use / self.max_size,
+            })
+        return stats
+
+    def close(self):
+        """关闭连接池及所有空闲连接"""
+        self._reaper_stop.set()
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_connection(conn)
+                self._size -= 1
+            self._cond.notify_all()
@@ -1,17 +1,23 @@
-import httpx
-import json
 import os
-import re
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from dotenv import load_dotenv
+from ai_agent import AIAgent
+from intent_classifier import CHAT_LABEL, load_or_train
+from intent_matcher import IntentMatcher
 
 load_dotenv()
 
-class EnhancedAIAgent:
+class EnhancedAIAgent(AIAgent):
+    """在AIAgent的基础上增加本地意图分析，HTTP客户端和AI调用沿用AIAgent"""
+    
+    # 本地分类器置信度足够时可以跳过AI模型直接执行的工具；
+    # create_todo/update_todo 的标题、相对日期等自由文本参数交给AI模型提取
+    fast_path_tools = (
+        "get_todos", "search_todos", "get_todos_due", "get_overdue_todos", "todo_stats", "delete_todo", "mark_completed",
+    )
+
     def __init__(self):
-        self.azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        self.api_key = os.getenv("AZURE_OPENAI_API_KEY")
-        self.mcp_server_url = f"http://localhost:{os.getenv('MCP_SERVER_PORT', 8000)}/mcp"
+        super().__init__()
         
         # 扩展的工具定义，包含更详细的描述和关键词
         self.tools = [
@@ -95,6 +101,52 @@ class EnhancedAIAgent:
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_todos_due",
+                    "description": "按截止日期查询未完成的待办事项。关键词：到期、截止、今天、明天、本周、这周",
+                    "keywords": ["到期", "截止", "快到期", "本周", "这周", "明天"],
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "period": {
+                                "type": "string",
+                                "enum": ["today", "tomorrow", "this_week", "next_7_days"],
+                                "description": "时间段：今天、明天、本周（周一到周日）、今天起的7天"
+                            },
+                            "start_date": {"type": "string", "format": "date", "description": "截止日期范围的开始日期，格式为YYYY-MM-DD"},
+                            "end_date": {"type": "string", "format": "date", "description": "截止日期范围的结束日期，格式为YYYY-MM-DD"}
+                        }
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_overdue_todos",
+                    "description": "获取已过截止日期但未完成的待办事项。关键词：逾期、过期、超期",
+                    "keywords": ["逾期", "过期", "超期", "overdue"],
+                    "parameters": {
+                        "type": "object",
+                        "properties": {}
+                    }
+                }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "todo_stats",
+                    "description": "获取待办事项的统计数量（总数、未完成、逾期、每周到期数）。关键词：多少、几个、统计、数量",
+                    "keywords": ["多少", "几个", "统计", "数量", "总数", "how many"],
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "weeks": {"type": "integer", "description": "按周统计到期数量的周数，默认4"}
+                        }
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
@@ -122,6 +174,29 @@ class EnhancedAIAgent:
                 r"我要.*做",
                 r"需要.*完成"
             ],
+            "todo_stats": [
+                r"多少.*任务",
+                r"几个.*任务",
+                r"任务.*多少",
+                r"任务.*几个",
+                r"多少.*待办",
+                r"几个.*待办",
+                r"统计"
+            ],
+            "get_overdue_todos": [
+                r"逾期",
+                r"过期",
+                r"超期",
+                r"过了.*截止"
+            ],
+            "get_todos_due": [
+                r"到期.*任务",
+                r"截止.*任务",
+                r"到期.*待办",
+                r"截止.*待办",
+                r"快到期",
+                r"快截止"
+            ],
             "get_todos": [
                 r"显示.*任务",
                 r"查看.*列表",
@@ -154,253 +229,83 @@ class EnhancedAIAgent:
                 r".*完成了"
             ]
         }
+        
+        self._intent_matcher = None
+        self._intent_matcher_key = None
+        
+        # 本地意图分类器（data/intent_corpus.jsonl 训练），置信度低于阈值时交给AI模型
+        self.intent_classifier = load_or_train()
+        self.confidence_threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.9))
+    
+    @property
+    def intent_matcher(self) -> IntentMatcher:
+        """按当前的意图模式和工具关键词编译的匹配器，修改intent_patterns或tools后重新编译"""
+        key = (id(self.intent_patterns), id(self.tools))
+        if self._intent_matcher_key != key:
+            self._intent_matcher = IntentMatcher(self.intent_patterns, self.tools)
+            self._intent_matcher_key = key
+        return self._intent_matcher
     
     def analyze_user_intent(self, user_input: str) -> Optional[str]:
         """
         分析用户意图，返回最可能的功能名称
-        """
-        user_input_lower = user_input.lower()
-        
-        # 1. 基于正则表达式的模式匹配
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, user_input, re.IGNORECASE):
-                    return intent
-        
-        # 2. 基于关键词匹配
-        intent_scores = {}
-        for tool in self.tools:
-            function_name = tool["function"]["name"]
-            keywords = tool["function"].get("keywords", [])
-            score = 0
-            
-            for keyword in keywords:
-                if keyword in user_input_lower:
-                    score += 1
-            
-            if score > 0:
-                intent_scores[function_name] = score
-        
-        # 返回得分最高的意图
-        if intent_scores:
-            return max(intent_scores, key=intent_scores.get)
         
-        return None
+        先按顺序匹配意图模式，都不命中时取关键词得分最高的功能
+        """
+        return self.intent_matcher.analyze(user_input)
     
     def extract_parameters(self, user_input: str, function_name: str) -> Dict[str, Any]:
         """
         从用户输入中提取参数
         """
-        params = {}
-        
-        if function_name == "create_todo":
-            # 提取标题
-            title_patterns = [
-                r"创建.*?[：:\"'](.*?)[\"']",
-                r"添加.*?[：:\"'](.*?)[\"']",
-                r"任务[：:\"'](.*?)[\"']",
-                r"做.*?[：:\"'](.*?)[\"']"
-            ]
-            
-            for pattern in title_patterns:
-                match = re.search(pattern, user_input)
-                if match:
-                    params["title"] = match.group(1).strip()
-                    break
-            
-            # 如果没有引号，尝试提取整个描述
-            if "title" not in params:
-                # 简单的启发式方法
-                if "创建" in user_input:
-                    title_start = user_input.find("创建") + 2
-                    title = user_input[title_start:].strip()
-                    if title:
-                        params["title"] = title
-            
-            # 提取日期
-            date_pattern = r"(\d{4}-\d{2}-\d{2})"
-            date_match = re.search(date_pattern, user_input)
-            if date_match:
-                params["due_date"] = date_match.group(1)
-        
-        elif function_name == "get_todos":
-            if "未完成" in user_input:
-                params["completed"] = False
-            elif "已完成" in user_input:
-                params["completed"] = True
-        
-        elif function_name == "search_todos":
-            # 提取搜索关键词
-            search_patterns = [
-                r"搜索[：:\"\']?(.*?)[\"\']*",
-                r"查找[：:\"\']?(.*?)[\"\']*",
-                r"包含[：:\"\']?(.*?)[\"\']*的"
-            ]
-            
-            for pattern in search_patterns:
-                match = re.search(pattern, user_input)
-                if match:
-                    query = match.group(1).strip()
-                    if query:
-                        params["query"] = query
-                        break
-        
-        elif function_name in ["update_todo", "delete_todo", "mark_completed"]:
-            # 提取ID
-            id_patterns = [
-                r"任务(\d+)",
-                r"ID(\d+)",
-                r"编号(\d+)",
-                r"第(\d+)个"
-            ]
-            
-            for pattern in id_patterns:
-                match = re.search(pattern, user_input)
-                if match:
-                    params["id"] = int(match.group(1))
-                    break
-        
-        return params
-    
-    async def call_mcp_server(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """调用MCP服务器"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.mcp_server_url,
-                json={"method": method, "params": params}
-            )
-            return response.json()
+        return self.intent_matcher.extract_parameters(user_input, function_name)
     
-    async def call_azure_openai(self, messages: List[Dict[str, str]], tools: Optional[List] = None) -> Dict[str, Any]:
-        """调用Azure OpenAI服务"""
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": self.api_key
-        }
-        
-        payload = {
-            "messages": messages,
-            "max_tokens": 1500,
-            "temperature": 0.7
-        }
-        
-        if tools:
-            payload["tools"] = tools
-            payload["tool_choice"] = "auto"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.azure_endpoint,
-                headers=headers,
-                json=payload,
-                timeout=60.0
-            )
-            return response.json()
+    def classify_user_intent(self, user_input: str) -> Tuple[str, float]:
+        """
+        本地分类器的预测结果：(意图, 校准后的置信度)，意图为 chat 表示不对应任何工具
+        """
+        return self.intent_classifier.predict(user_input)
     
-    async def execute_function_call(self, function_name: str, arguments: Dict[str, Any]) -> str:
-        """执行函数调用"""
-        try:
-            result = await self.call_mcp_server(function_name, arguments)
-            
-            if result.get("error"):
-                return f"错误: {result['error']}"
-            
-            return json.dumps(result.get("result", {}), ensure_ascii=False, indent=2)
+    def local_decision(self, user_input: str) -> Optional[Tuple[str, Dict[str, Any], float]]:
+        """
+        判断能否跳过AI模型直接执行：分类器置信度不低于阈值、工具在 fast_path_tools 中且必需参数都能提取到时
+        返回 (功能名称, 参数, 置信度)，否则返回None
+        """
+        intent, confidence = self.classify_user_intent(user_input)
+        if intent == CHAT_LABEL or intent not in self.fast_path_tools or confidence < self.confidence_threshold:
+            return None
         
-        except Exception as e:
-            return f"执行函数时出错: {str(e)}"
+        params = self.extract_parameters(user_input, intent)
+        tool = next((t for t in self.tools if t["function"]["name"] == intent), None)
+        if tool is None:
+            return None
+        required_params = tool["function"]["parameters"].get("required", [])
+        if any(p not in params for p in required_params):
+            return None
+        return intent, params, confidence
     
     async def process_user_input_with_intent_analysis(self, user_input: str) -> str:
         """
-        使用意图分析处理用户输入
+        使用意图分析处理用户输入：本地分类器有把握时直接执行，否则回退到AI模型决策
         """
-        # 1. 分析用户意图
-        predicted_intent = self.analyze_user_intent(user_input)
+        decision = self.local_decision(user_input)
         
-        if predicted_intent:
-            # 2. 提取参数
-            params = self.extract_parameters(user_input, predicted_intent)
-            
-            # 3. 验证必需参数
-            tool = next((t for t in self.tools if t["function"]["name"] == predicted_intent), None)
-            if tool:
-                required_params = tool["function"]["parameters"].get("required", [])
-                missing_params = [p for p in required_params if p not in params]
-                
-                if missing_params:
-                    return f"缺少必需参数：{', '.join(missing_params)}。请提供更多信息。"
-            
-            # 4. 执行函数
+        if decision:
+            intent, params, confidence = decision
             try:
-                result = await self.execute_function_call(predicted_intent, params)
-                return f"预测意图: {predicted_intent}\n提取参数: {params}\n\n执行结果:\n{result}"
+                result = await self.execute_function_call(intent, params)
+                return f"预测意图: {intent}（置信度 {confidence:.2f}）\n提取参数: {params}\n\n执行结果:\n{result}"
             except Exception as e:
                 return f"执行时出错: {str(e)}"
         
-        # 如果无法确定意图，回退到AI模型决策
+        # 置信度不足、缺少必需参数或不对应任何工具时，回退到AI模型决策
         return await self.process_user_input_with_ai(user_input)
     
     async def process_user_input_with_ai(self, user_input: str) -> str:
         """
         使用AI模型处理用户输入（原始方法）
         """
-        messages = [
-            {
-                "role": "system",
-                "content": """你是一个智能的待办事项助手。你可以帮助用户管理他们的日常任务。
-
-你具有以下功能：
-1. 创建待办事项 - 用户可以添加新的任务，包括标题、内容和截止日期
-2. 查看待办事项 - 显示所有任务、已完成的任务或未完成的任务
-3. 更新待办事项 - 修改任务的任何信息
-4. 删除待办事项 - 移除不需要的任务
-5. 搜索待办事项 - 根据关键词查找任务
-6. 标记完成 - 将任务标记为已完成
-
-请根据用户的需求选择合适的功能来帮助他们。回复时要友好和有帮助。
-
-如果用户提到日期，请使用YYYY-MM-DD格式（例如：2025-06-26）。"""
-            },
-            {
-                "role": "user",
-                "content": user_input
-            }
-        ]
-        
-        try:
-            # 调用Azure OpenAI
-            response = await self.call_azure_openai(messages, self.tools)
-            
-            if "error" in response:
-                return f"AI服务错误: {response['error']['message']}"
-            
-            message = response["choices"][0]["message"]
-            
-            # 检查是否有工具调用
-            if message.get("tool_calls"):
-                tool_call = message["tool_calls"][0]
-                function_name = tool_call["function"]["name"]
-                arguments = json.loads(tool_call["function"]["arguments"])
-                
-                # 执行函数调用
-                function_result = await self.execute_function_call(function_name, arguments)
-                
-                # 将函数结果发送回AI获取最终响应
-                messages.append(message)
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call["id"],
-                    "content": function_result
-                })
-                
-                final_response = await self.call_azure_openai(messages)
-                return final_response["choices"][0]["message"]["content"]
-            
-            else:
-                return message["content"]
-        
-        except Exception as e:
-            return f"处理请求时出错: {str(e)}"
+        return await super().process_user_input(user_input)
     
     async def process_user_input(self, user_input: str, use_intent_analysis: bool = True) -> str:
         """
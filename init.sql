@@ -23,3 +23,6 @@ CREATE TRIGGER update_todos_updated_at
     BEFORE UPDATE ON todos 
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
+
+-- 索引、全文检索和变更通知触发器在 migrations/ 中，docker-compose 在本脚本之后依次执行，
+-- 已有数据库执行 python main.py migrate 应用
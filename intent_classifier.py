@@ -0,0 +1,255 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from llm_cache import normalize_input
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_CORPUS = os.path.join(DATA_DIR, "intent_corpus.jsonl")
+DEFAULT_MODEL = os.path.join(DATA_DIR, "intent_model.npz")
+
+# 不对应任何工具、需要交给AI模型处理的输入（闲聊、复杂请求）
+CHAT_LABEL = "chat"
+
+_DIGITS = re.compile(r"\d+")
+
+
+def load_corpus(path: str = DEFAULT_CORPUS) -> List[Tuple[str, str]]:
+    """读取标注语料（每行 {"text": ..., "intent": ...}），返回 [(文本, 意图)]"""
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["text"], row["intent"]) for row in rows]
+
+
+def corpus_digest(path: str = DEFAULT_CORPUS) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def char_ngrams(text: str, sizes: Tuple[int, ...] = (1, 2, 3)) -> Counter:
+    """归一化后的字符n-gram计数；数字统一替换为0，任务编号不影响特征"""
+    text = " " + _DIGITS.sub("0", normalize_input(text)) + " "
+    grams = Counter()
+    for n in sizes:
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    """
+    本地意图分类器：字符n-gram TF-IDF特征 + 多分类逻辑回归，参数保存为NumPy数组
+
+    输出每个工具（以及 chat）的概率，概率经过温度缩放校准，可以直接和置信度阈值比较。
+    """
+
+    def __init__(
+        self,
+        vocabulary: List[str],
+        idf: np.ndarray,
+        weights: np.ndarray,
+        bias: np.ndarray,
+        labels: List[str],
+        temperature: float = 1.0,
+        corpus_sha: str = "",
+    ):
+        self.vocabulary = list(vocabulary)
+        self.index = {gram: i for i, gram in enumerate(self.vocabulary)}
+        self.idf = idf.astype(np.float32)
+        # 提前乘上1/温度，预测时少一次运算
+        self.weights = (weights / temperature).astype(np.float32)
+        self.bias = (bias / temperature).astype(np.float32)
+        self.labels = list(labels)
+        self.temperature = temperature
+        self.corpus_sha = corpus_sha
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (n-gram编号, L2归一化后的TF-IDF值)，不在词表中的n-gram忽略"""
+        indices = []
+        counts = []
+        for gram, count in char_ngrams(text).items():
+            i = self.index.get(gram)
+            if i is not None:
+                indices.append(i)
+                counts.append(count)
+        indices = np.array(indices, dtype=np.intp)
+        values = (1.0 + np.log(np.array(counts, dtype=np.float32))) * self.idf[indices]
+        norm = np.sqrt(values @ values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """每个意图的校准概率"""
+        indices, values = self._features(text)
+        probabilities = _softmax(values @ self.weights[indices] + self.bias)
+        return dict(zip(self.labels, probabilities.tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """返回 (最可能的意图, 置信度)"""
+        indices, values = self._features(text)
+        probabilities = _softmax(values @ self.weights[indices] + self.bias)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    @classmethod
+    def train(
+        cls,
+        examples: List[Tuple[str, str]],
+        min_df: int = 2,
+        l2: float = 1e-3,
+        epochs: int = 300,
+        learning_rate: float = 0.5,
+        calibration_fraction: float = 0.2,
+        corpus_sha: str = "",
+    ) -> "IntentClassifier":
+        """
+        训练分类器：先留出一部分语料拟合温度（校准置信度），再用全部语料训练最终的权重
+
+        类别按样本数加权，语料中样本较少的意图（例如 chat）不会被忽略。
+        """
+        labels = sorted({intent for _, intent in examples})
+        documents = [char_ngrams(text) for text, _ in examples]
+        targets = np.array([labels.index(intent) for _, intent in examples])
+
+        document_frequency = Counter(gram for grams in documents for gram in grams)
+        vocabulary = sorted(gram for gram, df in document_frequency.items() if df >= min_df)
+        index = {gram: i for i, gram in enumerate(vocabulary)}
+        idf = np.array(
+            [np.log((1 + len(documents)) / (1 + document_frequency[gram])) + 1 for gram in vocabulary],
+            dtype=np.float32,
+        )
+
+        features = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        for row, grams in enumerate(documents):
+            for gram, count in grams.items():
+                if gram in index:
+                    features[row, index[gram]] = (1.0 + np.log(count)) * idf[index[gram]]
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        features /= np.where(norms > 0, norms, 1.0)
+
+        # 按固定规则留出校准集（每个意图每5条取1条），结果可复现
+        rank = np.zeros(len(examples), dtype=int)
+        seen = Counter()
+        for row, target in enumerate(targets):
+            rank[row] = seen[target]
+            seen[target] += 1
+        held_out = rank % round(1 / calibration_fraction) == round(1 / calibration_fraction) - 1
+
+        weights, bias = _fit_softmax(features[~held_out], targets[~held_out], len(labels), l2, epochs, learning_rate)
+        temperature = _fit_temperature(features[held_out] @ weights + bias, targets[held_out])
+
+        weights, bias = _fit_softmax(features, targets, len(labels), l2, epochs, learning_rate)
+        return cls(vocabulary, idf, weights, bias, labels, temperature, corpus_sha)
+
+    def save(self, path: str = DEFAULT_MODEL):
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(self.vocabulary),
+            idf=self.idf,
+            weights=self.weights * self.temperature,
+            bias=self.bias * self.temperature,
+            labels=np.array(self.labels),
+            temperature=np.array(self.temperature),
+            corpus_sha=np.array(self.corpus_sha),
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL) -> "IntentClassifier":
+        with np.load(path) as data:
+            return cls(
+                data["vocabulary"].tolist(),
+                data["idf"],
+                data["weights"],
+                data["bias"],
+                data["labels"].tolist(),
+                float(data["temperature"]),
+                str(data["corpus_sha"]),
+            )
+
+
+def _fit_softmax(
+    features: np.ndarray, targets: np.ndarray, n_labels: int, l2: float, epochs: int, learning_rate: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """全批量梯度下降（Adam）训练带L2正则、按类别加权的多分类逻辑回归"""
+    n_samples, n_features = features.shape
+    one_hot = np.eye(n_labels, dtype=np.float32)[targets]
+    class_weight = n_samples / (n_labels * np.bincount(targets, minlength=n_labels).clip(min=1))
+    sample_weight = class_weight[targets].astype(np.float32)[:, None] / n_samples
+
+    params = [np.zeros((n_features, n_labels), dtype=np.float32), np.zeros(n_labels, dtype=np.float32)]
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+    for step in range(1, epochs + 1):
+        weights, bias = params
+        error = (_softmax(features @ weights + bias) - one_hot) * sample_weight
+        gradients = [features.T @ error + l2 * weights, error.sum(axis=0)]
+        for param, gradient, m, v in zip(params, gradients, moments, velocities):
+            m *= beta1
+            m += (1 - beta1) * gradient
+            v *= beta2
+            v += (1 - beta2) * gradient * gradient
+            param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+    return params[0], params[1]
+
+
+def _fit_temperature(logits: np.ndarray, targets: np.ndarray) -> float:
+    """在留出集上搜索使负对数似然最小的温度"""
+    if len(targets) == 0:
+        return 1.0
+    best_temperature, best_nll = 1.0, float("inf")
+    for temperature in np.exp(np.linspace(np.log(0.05), np.log(20), 200)):
+        probabilities = _softmax(logits / temperature)
+        nll = -np.mean(np.log(probabilities[np.arange(len(targets)), targets] + 1e-12))
+        if nll < best_nll:
+            best_temperature, best_nll = float(temperature), nll
+    return best_temperature
+
+
+def train_from_corpus(corpus_path: str = DEFAULT_CORPUS) -> IntentClassifier:
+    return IntentClassifier.train(load_corpus(corpus_path), corpus_sha=corpus_digest(corpus_path))
+
+
+def load_or_train(model_path: str = DEFAULT_MODEL, corpus_path: str = DEFAULT_CORPUS) -> IntentClassifier:
+    """
+    加载保存的模型；模型文件不存在或语料已修改（摘要不一致）时重新训练并尝试保存
+    """
+    digest = corpus_digest(corpus_path)
+    if os.path.exists(model_path):
+        classifier = IntentClassifier.load(model_path)
+        if classifier.corpus_sha == digest:
+            return classifier
+
+    classifier = IntentClassifier.train(load_corpus(corpus_path), corpus_sha=digest)
+    try:
+        classifier.save(model_path)
+    except OSError:
+        pass
+    return classifier
+
+
+def evaluate(classifier: IntentClassifier, examples: List[Tuple[str, str]], threshold: float) -> Dict[str, Optional[float]]:
+    """准确率，以及置信度不低于阈值的样本比例和这部分样本的准确率"""
+    predictions = [classifier.predict(text) for text, _ in examples]
+    correct = [predicted == intent for (predicted, _), (_, intent) in zip(predictions, examples)]
+    confident = [confidence >= threshold for _, confidence in predictions]
+    confident_correct = [c for c, sure in zip(correct, confident) if sure]
+    return {
+        "accuracy": sum(correct) / len(examples),
+        "confident_fraction": sum(confident) / len(examples),
+        "confident_accuracy": sum(confident_correct) / len(confident_correct) if confident_correct else None,
+    }
@@ -0,0 +1,188 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# 参数提取用的正则，按原来的尝试顺序排列
+_TITLE_PATTERNS = [
+    r"创建.*?[：:\"'](.*?)[\"']",
+    r"添加.*?[：:\"'](.*?)[\"']",
+    r"任务[：:\"'](.*?)[\"']",
+    r"做.*?[：:\"'](.*?)[\"']",
+]
+_SEARCH_PATTERNS = [
+    r"搜索[：:\"\']?(.*?)[\"\']*",
+    r"查找[：:\"\']?(.*?)[\"\']*",
+    r"包含[：:\"\']?(.*?)[\"\']*的",
+]
+_ID_PATTERNS = [
+    r"任务(\d+)",
+    r"ID(\d+)",
+    r"编号(\d+)",
+    r"第(\d+)个",
+]
+_DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})")
+# get_todos_due 的时间段关键词，按顺序取第一个出现的
+_DUE_PERIODS = [
+    ("今天", "today"),
+    ("明天", "tomorrow"),
+    ("本周", "this_week"),
+    ("这周", "this_week"),
+    ("本星期", "this_week"),
+    ("这个星期", "this_week"),
+]
+_ID_FUNCTIONS = ("update_todo", "delete_todo", "mark_completed")
+
+
+def _search_anywhere(pattern: str, name: str) -> str:
+    """
+    把 pattern 包成从文本开头执行的零宽断言，pattern 在任意位置出现时命中，等价于 re.search(pattern)；
+    整个 pattern 放在命名分组 name 中，pattern 自身的第一个分组紧随其后
+    """
+    return rf"(?=(?s:.*?)(?P<{name}>{pattern}))"
+
+
+def _first_of(patterns: List[str], prefix: str) -> re.Pattern:
+    """按顺序尝试多个模式的合并正则：第一个在文本中出现的模式命中，lastgroup 为其序号"""
+    return re.compile("|".join(_search_anywhere(pattern, f"{prefix}{i}") for i, pattern in enumerate(patterns)))
+
+
+def _required_literals(pattern: str) -> Optional[List[str]]:
+    """
+    "A.*B" 形式的模式命中时输入中必然出现的字面量片段（小写）；
+    含其它正则语法或大小写字母（忽略大小写时匹配规则较复杂）时返回None，表示每次都要执行该模式
+    """
+    fragments = [fragment for fragment in pattern.split(".*") if fragment]
+    if not fragments or any(re.escape(f) != f or f.lower() != f.upper() for f in fragments):
+        return None
+    return fragments
+
+
+class IntentMatcher:
+    """
+    预编译的意图匹配器
+
+    意图模式中的字面量片段和所有工具关键词合并成一个正则，对小写化的输入扫描一遍，同时得到关键词得分
+    和可能命中的意图模式，只对这些候选模式按原来的优先顺序执行预编译的正则确认；参数提取的各组正则
+    按顺序合并成一个正则。结果与逐个 re.search 模式、逐个检查关键词的实现完全一致。
+    """
+
+    def __init__(self, intent_patterns: Dict[str, List[str]], tools: List[Dict[str, Any]]):
+        # 意图模式按原来的优先顺序编号
+        self.patterns: List[Tuple[str, re.Pattern]] = [
+            (intent, re.compile(pattern, re.IGNORECASE))
+            for intent, patterns in intent_patterns.items()
+            for pattern in patterns
+        ]
+        # 字面量 -> 以它为片段的模式编号；无法拆成字面量的模式每次都要检查
+        literal_patterns: Dict[str, List[int]] = {}
+        self.always_check: List[int] = []
+        for index, (_, regex) in enumerate(self.patterns):
+            fragments = _required_literals(regex.pattern)
+            if fragments is None:
+                self.always_check.append(index)
+            else:
+                # 只记录一个片段即可作为候选条件，最终由模式自身的正则确认
+                literal_patterns.setdefault(fragments[0], []).append(index)
+
+        # 关键词 -> 包含该关键词的功能（同一个关键词可能属于多个功能，重复的关键词重复计分）
+        self.tool_names = [tool["function"]["name"] for tool in tools]
+        keyword_tools: Dict[str, List[int]] = {}
+        for tool_index, tool in enumerate(tools):
+            for keyword in tool["function"].get("keywords", []):
+                keyword_tools.setdefault(keyword, []).append(tool_index)
+        self.keyword_tools = keyword_tools
+
+        # 所有字面量合并成一个正则，在小写化的输入上扫描一遍。零宽断言让每个位置都尝试匹配，
+        # 同一位置只返回最长的字面量，以它开头的较短字面量由前缀表补上
+        literals = sorted(set(literal_patterns) | set(keyword_tools), key=len, reverse=True)
+        self.scanner = re.compile("(?=(" + "|".join(re.escape(literal) for literal in literals) + "))") if literals else None
+        self.prefixes = {literal: frozenset(other for other in literals if literal.startswith(other)) for literal in literals}
+        self.literal_patterns = literal_patterns
+
+        self.title_regex = _first_of(_TITLE_PATTERNS, "t")
+        self.search_patterns = [re.compile(pattern) for pattern in _SEARCH_PATTERNS]
+        self.id_regex = _first_of(_ID_PATTERNS, "i")
+
+    def analyze(self, user_input: str) -> Optional[str]:
+        """返回最可能的功能名称：先按顺序匹配意图模式，都不命中时取关键词得分最高的功能"""
+        present = set()
+        if self.scanner is not None:
+            present = present.union(*map(self.prefixes.__getitem__, self.scanner.findall(user_input.lower())))
+
+        candidates = list(self.always_check)
+        scores = [0] * len(self.tool_names)
+        for literal in present:
+            if literal in self.literal_patterns:
+                candidates.extend(self.literal_patterns[literal])
+            if literal in self.keyword_tools:
+                for tool_index in self.keyword_tools[literal]:
+                    scores[tool_index] += 1
+
+        for index in sorted(set(candidates)):
+            intent, regex = self.patterns[index]
+            if regex.search(user_input):
+                return intent
+
+        best = max(scores, default=0)
+        if best == 0:
+            return None
+        return self.tool_names[scores.index(best)]
+
+    def match(self, user_input: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """同时得到意图和参数，无法确定意图时返回 (None, {})"""
+        intent = self.analyze(user_input)
+        if intent is None:
+            return None, {}
+        return intent, self.extract_parameters(user_input, intent)
+
+    def extract_parameters(self, user_input: str, function_name: str) -> Dict[str, Any]:
+        """从用户输入中提取指定功能的参数"""
+        params = {}
+
+        if function_name == "create_todo":
+            # 提取标题
+            match = self.title_regex.match(user_input)
+            if match:
+                params["title"] = match.group(match.lastindex + 1).strip()
+
+            # 如果没有引号，取"创建"之后的整段描述
+            if "title" not in params and "创建" in user_input:
+                title = user_input[user_input.find("创建") + 2:].strip()
+                if title:
+                    params["title"] = title
+
+            # 提取日期
+            date_match = _DATE_PATTERN.search(user_input)
+            if date_match:
+                params["due_date"] = date_match.group(1)
+
+        elif function_name == "get_todos":
+            if "未完成" in user_input:
+                params["completed"] = False
+            elif "已完成" in user_input:
+                params["completed"] = True
+
+        elif function_name == "get_todos_due":
+            # 两个日期表示范围，一个日期表示当天，否则按时间段关键词，默认今天起的7天
+            dates = _DATE_PATTERN.findall(user_input)
+            if dates:
+                params["start_date"] = dates[0]
+                params["end_date"] = dates[1] if len(dates) > 1 else dates[0]
+            else:
+                params["period"] = next((period for word, period in _DUE_PERIODS if word in user_input), "next_7_days")
+
+        elif function_name == "search_todos":
+            # 查询词为空时继续尝试下一个模式，无法合并成一个正则
+            for pattern in self.search_patterns:
+                match = pattern.search(user_input)
+                if match:
+                    query = match.group(1).strip()
+                    if query:
+                        params["query"] = query
+                        break
+
+        elif function_name in _ID_FUNCTIONS:
+            match = self.id_regex.match(user_input)
+            if match:
+                params["id"] = int(match.group(match.lastindex + 1))
+
+        return params
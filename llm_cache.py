@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+# 归一化时去掉的首尾标点
+_EDGE_PUNCTUATION = "。，、！？；：,.!?;:~～ \t\r\n"
+_WHITESPACE = re.compile(r"\s+")
+
+# 只读工具：只缓存全部由这些工具组成的工具选择，写操作（创建、删除、标记完成等）每次都由AI重新决定
+READ_ONLY_TOOLS = frozenset({"get_todos", "search_todos", "get_todos_due", "get_overdue_todos", "todo_stats"})
+
+
+def normalize_input(user_input: str) -> str:
+    """用户输入归一化：全角转半角、转小写、合并空白、去掉首尾标点"""
+    text = unicodedata.normalize("NFKC", user_input).lower()
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(_EDGE_PUNCTUATION)
+
+
+def tools_version(tools: List[Dict[str, Any]]) -> str:
+    """工具定义的版本号：工具名称、描述或参数变化后旧的缓存自动失效"""
+    return hashlib.sha256(json.dumps(tools, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+class SQLiteTier:
+    """
+    磁盘缓存层：多次启动CLI之间保留缓存，超过max_rows时删除最久未使用的条目
+    """
+
+    def __init__(self, path: str, max_rows: int = 10000):
+        self.path = path
+        self.max_rows = max_rows
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """首次使用（或close之后再次使用）时打开数据库"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now),
+        )
+        self.conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self.conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_rows,),
+        )
+        self.conn.commit()
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class LLMDecisionCache:
+    """
+    缓存AI的工具选择结果（第一轮LLM调用返回的tool_calls），不缓存工具执行结果和最终回复；
+    只缓存全部为只读工具（READ_ONLY_TOOLS）的选择，避免重复输入时不经AI确认就再次执行写操作
+
+    缓存键由归一化的用户输入、工具定义版本、LLM端点和当天日期组成（"明天"等相对日期按天失效）。
+    先查进程内LRU，未命中再查可选的SQLite磁盘层。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400.0,
+        max_entries: int = 1000,
+        sqlite_path: Optional[str] = None,
+        sqlite_max_rows: int = 10000,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (过期时间, tool_calls)
+        self._memory = OrderedDict()
+        self.disk = SQLiteTier(sqlite_path, sqlite_max_rows) if sqlite_path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # 未命中时返回了tool_calls的LLM调用次数和耗时，用于估算命中节省的时间
+        self.timed_misses = 0
+        self.miss_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def make_key(user_input: str, version: str, endpoint: Optional[str]) -> str:
+        raw = json.dumps([normalize_input(user_input), version, endpoint, date.today().isoformat()], ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _average_miss_seconds(self) -> float:
+        return self.miss_seconds / self.timed_misses if self.timed_misses else 0.0
+
+    def _remember(self, key: str, tool_calls: List[Dict[str, str]], expires_at: float):
+        self._memory[key] = (expires_at, tool_calls)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[Dict[str, str]]]:
+        """返回缓存的tool_calls（[{"name", "arguments"}]），未命中返回None"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, tool_calls = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_seconds += self._average_miss_seconds()
+                return tool_calls
+            del self._memory[key]
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                tool_calls = json.loads(value)
+                self._remember(key, tool_calls, time.time() + self.ttl)
+                self.disk_hits += 1
+                self.saved_seconds += self._average_miss_seconds()
+                return tool_calls
+
+        return None
+
+    def record_miss(self, seconds: Optional[float] = None):
+        """记录一次未命中；seconds为这次工具选择调用的耗时（AI没有选择工具时为None）"""
+        self.misses += 1
+        if seconds is not None:
+            self.timed_misses += 1
+            self.miss_seconds += seconds
+
+    @staticmethod
+    def cacheable(tool_calls: List[Dict[str, Any]]) -> bool:
+        return bool(tool_calls) and all(call["function"]["name"] in READ_ONLY_TOOLS for call in tool_calls)
+
+    def set(self, key: str, tool_calls: List[Dict[str, Any]]):
+        """保存AI返回的tool_calls（只保留函数名和参数），包含写操作工具时不保存"""
+        if not self.cacheable(tool_calls):
+            return
+        decision = [
+            {"name": call["function"]["name"], "arguments": call["function"]["arguments"]}
+            for call in tool_calls
+        ]
+        self._remember(key, decision, time.time() + self.ttl)
+        if self.disk is not None:
+            self.disk.set(key, json.dumps(decision, ensure_ascii=False), self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率和估算节省的LLM调用时间"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self.disk.count() if self.disk is not None else None,
+            "avg_llm_seconds": self._average_miss_seconds(),
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def to_tool_calls(decision: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """把缓存的工具选择还原为tool_calls消息格式，生成新的tool_call id"""
+    return [
+        {
+            "id": f"call_cached_{i}",
+            "type": "function",
+            "function": {"name": call["name"], "arguments": call["arguments"]},
+        }
+        for i, call in enumerate(decision)
+    ]
+
+
+def create_llm_cache_from_env() -> Optional[LLMDecisionCache]:
+    """
+    根据环境变量创建工具选择缓存，LLM_CACHE_ENABLED=false 时返回None
+
+    - LLM_CACHE_TTL: 缓存条目的存活秒数
+    - LLM_CACHE_MAX_ENTRIES: 进程内LRU的最大条目数
+    - LLM_CACHE_SQLITE_PATH: SQLite磁盘层的文件路径，为空时不启用磁盘层
+    - LLM_CACHE_SQLITE_MAX_ROWS: 磁盘层的最大条目数
+    """
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return LLMDecisionCache(
+        ttl=float(os.getenv("LLM_CACHE_TTL", 86400)),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000)),
+        sqlite_path=os.getenv("LLM_CACHE_SQLITE_PATH") or None,
+        sqlite_max_rows=int(os.getenv("LLM_CACHE_SQLITE_MAX_ROWS", 10000)),
+    )
@@ -8,9 +8,13 @@ from rich.text import Text
 from rich.live import Live
 from rich.layout import Layout
 from rich.align import Align
-from ai_agent import AIAgent
+from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from typing import Optional
+from ai_agent import AIAgent, LLM_SECONDS, LLM_TOKENS, TOOL_CALLS
+import os
 import signal
 import sys
+import time
 
 console = Console()
 app = typer.Typer()
@@ -19,6 +23,8 @@ class TodoApp:
     def __init__(self):
         self.agent = AIAgent()
         self.running = True
+        # AGENT_STREAM=false 时等待完整回复后再显示
+        self.stream = os.getenv("AGENT_STREAM", "true").lower() in ("1", "true", "yes")
         
     def signal_handler(self, signum, frame):
         """处理Ctrl+C信号"""
@@ -59,13 +65,93 @@ class TodoApp:
         """显示思考动画"""
         return Text("🤔 正在处理您的请求...", style="italic yellow")
     
+    def display_cache_stats(self):
+        """显示本次会话的工具选择缓存命中率和节省的LLM调用时间"""
+        if not self.agent.llm_cache:
+            return
+        stats = self.agent.llm_cache.stats()
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        if hits + stats["misses"] == 0:
+            return
+        console.print(
+            f"[dim]🧠 工具选择缓存: 命中 {hits}/{hits + stats['misses']}（{stats['hit_rate']:.0%}），"
+            f"约节省 {stats['saved_seconds']:.1f}s[/dim]"
+        )
+    
+    def display_agent_metrics(self):
+        """显示本次会话的LLM调用次数、平均耗时、token用量和工具调用次数"""
+        calls, seconds = 0, 0.0
+        for mode in ("request", "stream"):
+            mode_calls, mode_seconds = LLM_SECONDS.get(mode=mode)
+            calls += mode_calls
+            seconds += mode_seconds
+        if calls == 0:
+            return
+        prompt_tokens = LLM_TOKENS.get(type="prompt")
+        completion_tokens = LLM_TOKENS.get(type="completion")
+        tool_calls = sum(value for _, _, value in TOOL_CALLS.samples())
+        console.print(
+            f"[dim]📊 LLM调用 {calls} 次，平均 {seconds / calls:.2f}s；"
+            f"token {prompt_tokens:.0f} 输入 + {completion_tokens:.0f} 输出；工具调用 {tool_calls:.0f} 次[/dim]"
+        )
+    
     async def run_interactive(self):
-        """运行交互式界面"""
+        """运行交互式界面，退出时关闭AI代理的HTTP连接"""
         # 设置信号处理器
         signal.signal(signal.SIGINT, self.signal_handler)
         
         self.display_welcome()
         
+        async with self.agent:
+            await self.chat_loop()
+    
+    def render_response(self, text: str, tool_lines: list, subtitle: Optional[str] = None) -> Panel:
+        """渲染助手响应面板：工具调用进度 + 已生成的回复"""
+        body = Text()
+        for line in tool_lines:
+            body.append(line + "\n", style="dim")
+        if text:
+            body.append(text)
+        else:
+            body.append_text(self.display_thinking())
+        
+        return Panel(
+            body,
+            title="[bold cyan]🤖 助手[/bold cyan]",
+            subtitle=subtitle,
+            border_style="cyan",
+            padding=(1, 2)
+        )
+    
+    async def stream_response(self, user_input: str):
+        """通过rich.live.Live边接收边显示AI回复，面板底部显示首字时间（TTFT）和总耗时"""
+        text = ""
+        tool_lines = []
+        start = time.perf_counter()
+        first_token = None
+        
+        with Live(self.render_response(text, tool_lines), console=console, refresh_per_second=20) as live:
+            async for event in self.agent.process_user_input_stream(user_input):
+                if event["type"] == "token":
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    text += event["text"]
+                elif event["type"] == "tool_call":
+                    cached = "（⚡ 缓存）" if event.get("cached") else ""
+                    tool_lines.append(f"🔧 调用 {event['name']}({event['arguments']}){cached}")
+                elif event["type"] == "tool_result":
+                    failed = event["content"].startswith(("错误:", "执行函数时出错", "参数解析失败"))
+                    tool_lines.append(f"{'❌' if failed else '✅'} {event['name']} {'失败' if failed else '完成'}")
+                elif event["type"] == "error":
+                    text = event["text"]
+                live.update(self.render_response(text, tool_lines))
+            
+            total = time.perf_counter() - start
+            ttft = f"首字 {first_token:.2f}s · " if first_token is not None else ""
+            live.update(self.render_response(text, tool_lines, subtitle=f"[dim]{ttft}总计 {total:.2f}s[/dim]"))
+    
+    async def chat_loop(self):
+        """循环读取用户输入并显示AI响应"""
         while self.running:
             try:
                 # 获取用户输入
@@ -79,9 +165,16 @@ class TodoApp:
                 
                 # 检查退出命令
                 if user_input.lower() in ['quit', 'exit', '退出', 'q']:
+                    self.display_cache_stats()
+                    self.display_agent_metrics()
                     console.print("👋 再见！感谢使用待办事项助手！", style="bold yellow")
                     break
                 
+                if self.stream:
+                    await self.stream_response(user_input)
+                    console.print()
+                    continue
+                
                 # 显示思考状态
                 with console.status("[yellow]🤔 正在处理您的请求...[/yellow]"):
                     response = await self.agent.process_user_input(user_input)
@@ -109,10 +202,41 @@ def interactive():
     asyncio.run(todo_app.run_interactive())
 
 @app.command()
-def server():
+def server(
+    prod: bool = typer.Option(False, "--prod", help="生产模式：多个工作进程、预加载应用、SIGTERM时优雅退出"),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", help="工作进程数（生产模式），默认取MCP_SERVER_WORKERS或CPU核心数"),
+    host: str = typer.Option("0.0.0.0", "--host", help="监听地址（生产模式）"),
+    port: Optional[int] = typer.Option(None, "--port", help="监听端口，默认取MCP_SERVER_PORT或8000"),
+    loop: str = typer.Option(os.getenv("MCP_SERVER_LOOP", "auto"), "--loop", help="事件循环：auto、asyncio或uvloop"),
+    http: str = typer.Option(os.getenv("MCP_SERVER_HTTP", "auto"), "--http", help="HTTP解析器：auto、h11或httptools"),
+    graceful_timeout: int = typer.Option(int(os.getenv("MCP_SERVER_GRACEFUL_TIMEOUT", 30)), "--graceful-timeout", help="退出时等待进行中请求完成的最长秒数"),
+):
     """启动MCP服务器"""
     import subprocess
-    import os
+    
+    port = port or int(os.getenv("MCP_SERVER_PORT", 8000))
+    
+    if prod:
+        from server_runner import HTTP_CHOICES, LOOP_CHOICES, default_workers, run_production_server, worker_pool_sizes
+        
+        if loop not in LOOP_CHOICES or http not in HTTP_CHOICES:
+            console.print(f"[red]--loop 可选 {', '.join(LOOP_CHOICES)}，--http 可选 {', '.join(HTTP_CHOICES)}[/red]")
+            raise typer.Exit(1)
+        
+        workers = workers or default_workers()
+        from storage import BACKEND_MEMORY, backend_for_url
+        if workers > 1 and backend_for_url(os.getenv("DATABASE_URL")) == BACKEND_MEMORY:
+            # 每个工作进程有各自的内存数据，请求落在不同进程上会看到不同的待办事项
+            console.print("[red]memory:// 后端的数据不能在进程间共享，请使用 --workers 1[/red]")
+            raise typer.Exit(1)
+        min_size, max_size = worker_pool_sizes(workers)
+        console.print(
+            f"🚀 以生产模式启动MCP服务器: {workers} 个工作进程，监听 {host}:{port}，"
+            f"每个进程连接池 {min_size}-{max_size}，事件循环 {loop}，HTTP {http}",
+            style="bold green",
+        )
+        run_production_server(host, port, workers, loop, http, graceful_timeout)
+        return
     
     console.print("🚀 启动MCP服务器...", style="bold green")
     
@@ -120,7 +244,7 @@ def server():
         # 启动MCP服务器
         subprocess.run([
             sys.executable, "mcp_server.py"
-        ], cwd=os.getcwd())
+        ], cwd=os.getcwd(), env=dict(os.environ, MCP_SERVER_PORT=str(port)))
     except KeyboardInterrupt:
         console.print("\n✋ MCP服务器已停止", style="bold yellow")
     except Exception as e:
@@ -159,5 +283,137 @@ def setup():
     except Exception as e:
         console.print(f"❌ 设置过程中出错: {str(e)}", style="bold red")
 
+def detect_copy_format(path: str, fmt: Optional[str]) -> str:
+    """根据 --format 参数或文件扩展名确定导入导出格式"""
+    if fmt:
+        return fmt.lower()
+    if path.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def copy_progress():
+    """导入导出共用的进度显示：已处理行数、速度和耗时"""
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("{task.description}"),
+        TextColumn("[cyan]{task.completed:,} 行"),
+        TimeElapsedColumn(),
+        console=console,
+    )
+
+@app.command("import")
+def import_todos(
+    path: str = typer.Argument(..., help="要导入的CSV或NDJSON文件"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="csv或ndjson，默认根据扩展名判断"),
+):
+    """流式导入待办事项（PostgreSQL后端使用 COPY FROM STDIN）"""
+    import time
+    from storage import create_store
+    
+    fmt = detect_copy_format(path, fmt)
+    db = create_store()
+    start = time.perf_counter()
+    
+    try:
+        with copy_progress() as progress, open(path, "r", encoding="utf-8", newline="") as source:
+            task = progress.add_task(f"📥 导入 {path}", total=None)
+            
+            def on_progress(rows: int):
+                rate = rows / (time.perf_counter() - start)
+                progress.update(task, completed=rows, description=f"📥 导入 {path} ({rate:,.0f} 行/秒)")
+            
+            rows = db.import_todos(source, fmt=fmt, progress=on_progress)
+            progress.update(task, completed=rows)
+        
+        elapsed = time.perf_counter() - start
+        console.print(f"✅ 导入完成：{rows:,} 行，耗时 {elapsed:.2f} 秒，{rows / max(elapsed, 1e-9):,.0f} 行/秒", style="bold green")
+    except Exception as e:
+        console.print(f"❌ 导入失败（已回滚）: {str(e)}", style="bold red")
+        raise typer.Exit(1)
+    finally:
+        db.close()
+
+@app.command("export")
+def export_todos(
+    path: str = typer.Argument(..., help="导出的目标文件"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="csv或ndjson，默认根据扩展名判断"),
+):
+    """流式导出待办事项（PostgreSQL后端使用 COPY TO STDOUT）"""
+    import time
+    from storage import create_store
+    
+    fmt = detect_copy_format(path, fmt)
+    db = create_store()
+    start = time.perf_counter()
+    
+    try:
+        with copy_progress() as progress, open(path, "wb") as target:
+            task = progress.add_task(f"📤 导出 {path}", total=None)
+            
+            def on_progress(rows: int):
+                rate = rows / (time.perf_counter() - start)
+                progress.update(task, completed=rows, description=f"📤 导出 {path} ({rate:,.0f} 行/秒)")
+            
+            rows = db.export_todos(target, fmt=fmt, progress=on_progress)
+            progress.update(task, completed=rows)
+        
+        elapsed = time.perf_counter() - start
+        console.print(f"✅ 导出完成：{rows:,} 行，耗时 {elapsed:.2f} 秒，{rows / max(elapsed, 1e-9):,.0f} 行/秒", style="bold green")
+    except Exception as e:
+        console.print(f"❌ 导出失败: {str(e)}", style="bold red")
+        raise typer.Exit(1)
+    finally:
+        db.close()
+
+@app.command()
+def migrate():
+    """按顺序应用 migrations/ 目录中的数据库迁移（迁移脚本可重复执行）"""
+    from pathlib import Path
+    from database import DatabaseManager
+    from storage import BACKEND_POSTGRES, backend_for_url
+    
+    if backend_for_url(os.getenv("DATABASE_URL")) != BACKEND_POSTGRES:
+        console.print("SQLite和内存后端在打开时自动建表，不需要迁移", style="yellow")
+        return
+    
+    migrations_dir = Path(__file__).parent / "migrations"
+    scripts = sorted(migrations_dir.glob("*.sql"))
+    
+    if not scripts:
+        console.print("没有需要应用的迁移", style="yellow")
+        return
+    
+    db = DatabaseManager()
+    try:
+        for script in scripts:
+            console.print(f"📜 应用迁移 {script.name}...")
+            with db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(script.read_text(encoding="utf-8"))
+        console.print("✅ 数据库迁移完成", style="bold green")
+    except Exception as e:
+        console.print(f"❌ 迁移过程中出错: {str(e)}", style="bold red")
+        raise typer.Exit(1)
+    finally:
+        db.close()
+
+@app.command("train-intent")
+def train_intent():
+    """用 data/intent_corpus.jsonl 重新训练本地意图分类器，保存到 data/intent_model.npz"""
+    from intent_classifier import DATA_DIR, DEFAULT_MODEL, evaluate, load_corpus, train_from_corpus
+    
+    console.print("🧠 训练本地意图分类器...", style="bold blue")
+    classifier = train_from_corpus()
+    classifier.save(DEFAULT_MODEL)
+    console.print(f"✅ 已保存到 {DEFAULT_MODEL}（{len(classifier.vocabulary)} 个n-gram特征，校准温度 {classifier.temperature:.2f}）", style="bold green")
+    
+    threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.9))
+    result = evaluate(classifier, load_corpus(os.path.join(DATA_DIR, "intent_eval.jsonl")), threshold)
+    confident_accuracy = result["confident_accuracy"]
+    console.print(
+        f"📊 评估语料准确率 {result['accuracy']:.1%}，置信度≥{threshold} 的比例 {result['confident_fraction']:.1%}"
+        + (f"（其中准确率 {confident_accuracy:.1%}）" if confident_accuracy is not None else "")
+    )
+
 if __name__ == "__main__":
     app()
@@ -1,12 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from models import MCPRequest, MCPResponse, TodoCreate, TodoUpdate
-from database import DatabaseManager
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from models import MCPRequest, MCPResponse, TodoBulkUpdate, TodoCreate, TodoUpdate
+from database import DUE_PERIODS, MAX_STATS_WEEKS, STATS_WEEKS, decode_cursor, decode_due_cursor, due_period, encode_cursor, encode_due_cursor
+from cache import AsyncCachedDatabaseManager, ChangeListener, create_cache_from_env
+from metrics import CONTENT_TYPE, REGISTRY, SIZE_BUCKETS
+from storage import BACKEND_POSTGRES, backend_for_url, create_async_store
 import uvicorn
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
-from datetime import datetime, date
-import json
+from datetime import date
+from typing import List, Optional, Union
 
 load_dotenv()
 
@@ -21,66 +28,299 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-db = DatabaseManager()
+# 存储后端由 DATABASE_URL 的scheme决定（postgresql://、sqlite:///、memory://）
+backend = backend_for_url(os.getenv("DATABASE_URL"))
 
-def serialize_datetime(obj):
-    """JSON序列化日期时间对象"""
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+# TODO_CACHE_BACKEND=none 时不启用读缓存；进程内的SQLite和内存后端本身就足够快，
+# 而且没有变更通知，不启用读缓存
+cache = create_cache_from_env() if backend == BACKEND_POSTGRES else None
 
-@app.post("/mcp", response_model=MCPResponse)
-async def handle_mcp_request(request: MCPRequest):
-    """处理MCP请求"""
+# 进程内缓存通过数据库变更通知感知其它进程的写操作，共享缓存（Redis）不需要；
+# 监听未连接时读操作绕过缓存
+change_listener = ChangeListener(cache, os.getenv("DATABASE_URL")) if cache and not cache.backend.shared else None
+db = AsyncCachedDatabaseManager(create_async_store(), cache, change_listener) if cache else create_async_store()
+
+@app.on_event("startup")
+async def startup():
+    """打开数据库连接池，启动缓存失效监听"""
+    await db.open()
+    if change_listener:
+        change_listener.start()
+    REGISTRY.start_snapshots()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """停止缓存失效监听，关闭数据库连接池"""
+    REGISTRY.stop_snapshots()
+    if change_listener:
+        await change_listener.stop()
+    await db.close()
+
+# 按MCP方法统计的请求数、错误数、耗时和响应体大小，由 /metrics 导出
+MCP_REQUESTS = REGISTRY.counter("todo_mcp_requests_total", "MCP请求数", ["method"])
+MCP_ERRORS = REGISTRY.counter("todo_mcp_request_errors_total", "返回error的MCP请求数", ["method"])
+MCP_SECONDS = REGISTRY.histogram("todo_mcp_request_duration_seconds", "MCP请求处理耗时（秒）", ["method"])
+MCP_RESPONSE_BYTES = REGISTRY.histogram(
+    "todo_mcp_response_bytes", "序列化后的MCP响应体大小（字节），批量请求的method为batch", ["method"], SIZE_BUCKETS
+)
+DB_POOL_STAT = REGISTRY.gauge("todo_db_pool_stat", "数据库连接池当前状态（连接数、等待数等）", ["stat"])
+DB_POOL_EVENTS = REGISTRY.counter("todo_db_pool_events_total", "数据库连接池累计统计（请求数、等待毫秒数、错误数等）", ["stat"])
+CACHE_STAT = REGISTRY.gauge("todo_cache_stat", "读缓存当前状态（条目数、字节数、容量）", ["stat"])
+CACHE_EVENTS = REGISTRY.counter("todo_cache_events_total", "读缓存累计统计（命中、未命中、失效、淘汰）", ["stat"])
+
+# 连接池和缓存统计中表示当前状态的项，其余都是累计值，导出为计数器；
+# 比例（hit_ratio、saturation）和配置（ttl）不导出，多进程合并后没有意义，可以由计数器计算
+POOL_STATE_STATS = {
+    "pool_min", "pool_max", "pool_size", "pool_available", "requests_waiting",
+    "min_size", "max_size", "size", "idle", "in_use", "waiting", "max_in_use",
+}
+CACHE_STATE_STATS = {"entries", "bytes", "max_entries", "max_bytes"}
+UNEXPORTED_STATS = {"saturation", "hit_ratio", "ttl"}
+
+def export_stats(stats: dict, state_stats: set, gauge, counter):
+    for stat, value in stats.items():
+        if stat in UNEXPORTED_STATS or isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        (gauge if stat in state_stats else counter).set(value, stat=stat)
+
+def collect_pool_and_cache_stats():
+    export_stats(db.pool_stats(), POOL_STATE_STATS, DB_POOL_STAT, DB_POOL_EVENTS)
+    if cache:
+        export_stats(cache.stats(), CACHE_STATE_STATS, CACHE_STAT, CACHE_EVENTS)
+
+REGISTRY.add_collector(collect_pool_and_cache_stats)
+
+# 批量响应数组的序列化器
+MCP_RESPONSE_LIST = TypeAdapter(List[MCPResponse])
+
+def encode_mcp_response(response: Union[MCPResponse, List[MCPResponse]], method: str = "batch") -> Response:
+    """
+    将MCP响应直接编码为JSON响应体
+
+    result中保留Todo模型对象，由pydantic-core一次遍历完成序列化，
+    返回预编码的Response，跳过FastAPI对response_model的再次校验和序列化
+    """
+    if isinstance(response, list):
+        body = MCP_RESPONSE_LIST.dump_json(response)
+    else:
+        body = response.model_dump_json()
+    MCP_RESPONSE_BYTES.observe(len(body), method=method)
+    return Response(content=body, media_type="application/json")
+
+# 单页最多返回的记录数
+MAX_PAGE_SIZE = 1000
+
+def parse_page_params(params: dict, decode=decode_cursor):
+    """解析并校验分页参数 limit/cursor，无效时抛出ValueError"""
+    limit = params.get("limit")
+    cursor = params.get("cursor")
+    
+    if limit is not None:
+        if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit必须是1到{MAX_PAGE_SIZE}之间的整数")
+    
+    if cursor is not None:
+        decode(cursor)
+    
+    return limit, cursor
+
+async def list_todos_page(fetch, limit: int, cursor, encode=encode_cursor):
+    """多取一条判断是否还有下一页，返回 (当前页, next_cursor)"""
+    todos = await fetch(limit=limit + 1, cursor=cursor)
+    if len(todos) > limit:
+        todos = todos[:limit]
+        return todos, encode(todos[-1])
+    return todos, None
+
+def parse_date_param(params: dict, key: str) -> Optional[date]:
+    """读取 YYYY-MM-DD 格式的日期参数，无效时抛出ValueError"""
+    value = params.get(key)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}必须是YYYY-MM-DD格式的日期")
+
+# completed参数接受的字符串写法，与PostgreSQL的布尔字面量一致（不区分大小写）
+_BOOL_LITERALS = {
+    "t": True, "true": True, "y": True, "yes": True, "on": True, "1": True,
+    "f": False, "false": False, "n": False, "no": False, "off": False, "0": False,
+}
+
+def parse_completed_param(params: dict, default: Optional[bool] = None) -> Optional[bool]:
+    """读取completed过滤条件：布尔值、0/1或布尔字面量字符串，null表示不过滤，无效时抛出ValueError"""
+    value = params.get("completed", default)
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _BOOL_LITERALS:
+        return _BOOL_LITERALS[value.strip().lower()]
+    raise ValueError("completed必须是布尔值")
+
+def parse_due_params(params: dict):
+    """
+    解析 get_todos_due 的日期范围：period（相对today参数或服务器当天）或 start_date/end_date，
+    返回 (start, end)，无效时抛出ValueError
+    """
+    today = parse_date_param(params, "today")
+    period = params.get("period")
+    if period is not None:
+        if period not in DUE_PERIODS:
+            raise ValueError(f"period必须是{', '.join(DUE_PERIODS)}之一")
+        return due_period(period, today)
+    
+    start = parse_date_param(params, "start_date")
+    end = parse_date_param(params, "end_date")
+    if start is None and end is None:
+        raise ValueError("缺少period或start_date/end_date")
+    if start is not None and end is not None and start > end:
+        raise ValueError("start_date不能晚于end_date")
+    return start, end
+
+def stream_todos_ndjson(**filters) -> StreamingResponse:
+    """以NDJSON格式流式返回待办事项，每行一条，客户端可以边接收边处理"""
+    async def generate():
+        async for todo in db.iter_todos(**filters):
+            yield todo.model_dump_json() + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# 只读方法：批量请求中相邻的只读请求会并发执行
+READ_METHODS = {"get_todos", "get_todo", "search_todos", "get_todos_due", "get_overdue_todos", "todo_stats"}
+
+# 单个批量请求最多包含的请求数
+MAX_BATCH_SIZE = 1000
+
+# bulk_* 方法单次最多处理的行数
+MAX_BULK_SIZE = 10000
+
+def parse_id_param(params: dict) -> int:
+    """读取单条操作的id参数，缺失或不是整数（包括布尔值）时抛出ValueError"""
+    todo_id = params.get("id")
+    if todo_id is None:
+        raise ValueError("缺少todo ID")
+    if isinstance(todo_id, bool) or not isinstance(todo_id, int):
+        raise ValueError("id必须是整数")
+    return todo_id
+
+def parse_bulk_list(params: dict, key: str, model=None) -> list:
+    """
+    读取bulk_*方法的列表参数，缺失、为空或超过上限时抛出ValueError
+
+    key为ids时每一项必须是整数（不能是布尔值）；指定model时每一项必须是对象并转换为model，
+    某一项无效时ValueError的消息中包含它的下标
+    """
+    items = params.get(key)
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"缺少{key}列表")
+    if len(items) > MAX_BULK_SIZE:
+        raise ValueError(f"{key}最多包含{MAX_BULK_SIZE}项")
+    
+    if model is None:
+        for index, item in enumerate(items):
+            if isinstance(item, bool) or not isinstance(item, int):
+                raise ValueError(f"{key}[{index}]必须是整数")
+        return items
+    
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"{key}[{index}]必须是对象")
+        try:
+            parsed.append(model(**item))
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            raise ValueError(f"{key}[{index}]无效: {errors}")
+    return parsed
+
+class BatchAborted(Exception):
+    """批量事务中某一项失败，用于触发整个事务回滚"""
+
+# 支持的MCP方法，其它方法名在指标中统一记为 unsupported，避免标签无限增长
+MCP_METHODS = READ_METHODS | {
+    "create_todo", "update_todo", "delete_todo", "mark_completed",
+    "bulk_create_todos", "bulk_update_todos", "bulk_delete_todos", "bulk_mark_completed",
+}
+
+def metric_method(method: str) -> str:
+    return method if method in MCP_METHODS else "unsupported"
+
+async def execute_mcp_request(request: MCPRequest):
+    """执行单个MCP请求，记录请求数、错误数和耗时（流式响应只计到开始返回为止）"""
+    method = metric_method(request.method)
+    start = time.perf_counter()
+    response = await dispatch_mcp_request(request)
+    MCP_SECONDS.observe(time.perf_counter() - start, method=method)
+    MCP_REQUESTS.inc(method=method)
+    if isinstance(response, MCPResponse) and response.error:
+        MCP_ERRORS.inc(method=method)
+    return response
+
+async def dispatch_mcp_request(request: MCPRequest):
+    """按method调用数据库方法"""
     try:
         method = request.method
         params = request.params
         
         if method == "create_todo":
             todo_data = TodoCreate(**params)
-            todo = db.create_todo(todo_data)
-            result = json.loads(json.dumps(todo.dict(), default=serialize_datetime))
-            return MCPResponse(result={"todo": result, "message": "待办事项创建成功"})
+            todo = await db.create_todo(todo_data)
+            return MCPResponse(result={"todo": todo, "message": "待办事项创建成功"})
         
         elif method == "get_todos":
-            completed = params.get("completed")
-            todos = db.get_todos(completed=completed)
-            result = [json.loads(json.dumps(todo.dict(), default=serialize_datetime)) for todo in todos]
-            return MCPResponse(result={"todos": result})
+            try:
+                completed = parse_completed_param(params)
+                limit, cursor = parse_page_params(params)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
+            
+            if params.get("stream"):
+                return stream_todos_ndjson(completed=completed, limit=limit, cursor=cursor)
+            
+            if limit is None:
+                todos = await db.get_todos(completed=completed)
+                return MCPResponse(result={"todos": todos})
+            
+            fetch = lambda **page: db.get_todos(completed=completed, **page)
+            todos, next_cursor = await list_todos_page(fetch, limit, cursor)
+            return MCPResponse(result={"todos": todos, "next_cursor": next_cursor})
         
         elif method == "get_todo":
-            todo_id = params.get("id")
-            if not todo_id:
-                raise HTTPException(status_code=400, detail="缺少todo ID")
+            try:
+                todo_id = parse_id_param(params)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
             
-            todo = db.get_todo_by_id(todo_id)
+            todo = await db.get_todo_by_id(todo_id)
             if not todo:
                 return MCPResponse(error="待办事项不存在")
             
-            result = json.loads(json.dumps(todo.dict(), default=serialize_datetime))
-            return MCPResponse(result={"todo": result})
+            return MCPResponse(result={"todo": todo})
         
         elif method == "update_todo":
-            todo_id = params.get("id")
-            if not todo_id:
-                raise HTTPException(status_code=400, detail="缺少todo ID")
+            try:
+                todo_id = parse_id_param(params)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
             
             update_data = {k: v for k, v in params.items() if k != "id"}
             todo_update = TodoUpdate(**update_data)
-            todo = db.update_todo(todo_id, todo_update)
+            todo = await db.update_todo(todo_id, todo_update)
             
             if not todo:
                 return MCPResponse(error="待办事项不存在或更新失败")
             
-            result = json.loads(json.dumps(todo.dict(), default=serialize_datetime))
-            return MCPResponse(result={"todo": result, "message": "待办事项更新成功"})
+            return MCPResponse(result={"todo": todo, "message": "待办事项更新成功"})
         
         elif method == "delete_todo":
-            todo_id = params.get("id")
-            if not todo_id:
-                raise HTTPException(status_code=400, detail="缺少todo ID")
+            try:
+                todo_id = parse_id_param(params)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
             
-            success = db.delete_todo(todo_id)
+            success = await db.delete_todo(todo_id)
             if success:
                 return MCPResponse(result={"message": "待办事项删除成功"})
             else:
@@ -88,23 +328,110 @@ async def handle_mcp_request(request: MCPRequest):
         
         elif method == "search_todos":
             query = params.get("query", "")
-            todos = db.search_todos(query)
-            result = [json.loads(json.dumps(todo.dict(), default=serialize_datetime)) for todo in todos]
-            return MCPResponse(result={"todos": result})
+            try:
+                limit, cursor = parse_page_params(params)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
+            
+            if params.get("stream"):
+                return stream_todos_ndjson(search=query, limit=limit, cursor=cursor)
+            
+            if limit is None:
+                todos = await db.search_todos(query)
+                return MCPResponse(result={"todos": todos})
+            
+            fetch = lambda **page: db.search_todos(query, **page)
+            todos, next_cursor = await list_todos_page(fetch, limit, cursor)
+            return MCPResponse(result={"todos": todos, "next_cursor": next_cursor})
+        
+        elif method in ("get_todos_due", "get_overdue_todos"):
+            # completed默认为false（只看未完成的），为null时包含全部
+            try:
+                completed = parse_completed_param(params, default=False)
+                limit, cursor = parse_page_params(params, decode=decode_due_cursor)
+                if method == "get_todos_due":
+                    start, end = parse_due_params(params)
+                    fetch = lambda **page: db.get_todos_due(start=start, end=end, completed=completed, **page)
+                else:
+                    today = parse_date_param(params, "today")
+                    fetch = lambda **page: db.get_overdue_todos(today=today, **page)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
+            
+            if limit is None:
+                todos = await fetch(limit=None, cursor=cursor)
+                return MCPResponse(result={"todos": todos})
+            
+            todos, next_cursor = await list_todos_page(fetch, limit, cursor, encode=encode_due_cursor)
+            return MCPResponse(result={"todos": todos, "next_cursor": next_cursor})
+        
+        elif method == "todo_stats":
+            # 只返回各类数量，代替为了计数而获取完整列表
+            weeks = params.get("weeks", STATS_WEEKS)
+            if isinstance(weeks, bool) or not isinstance(weeks, int) or not 1 <= weeks <= MAX_STATS_WEEKS:
+                return MCPResponse(error=f"weeks必须是1到{MAX_STATS_WEEKS}之间的整数")
+            try:
+                today = parse_date_param(params, "today")
+            except ValueError as e:
+                return MCPResponse(error=str(e))
+            
+            stats = await db.get_todo_stats(today=today, weeks=weeks)
+            return MCPResponse(result={"stats": stats})
         
         elif method == "mark_completed":
-            todo_id = params.get("id")
-            if not todo_id:
-                raise HTTPException(status_code=400, detail="缺少todo ID")
+            try:
+                todo_id = parse_id_param(params)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
             
             todo_update = TodoUpdate(completed=True)
-            todo = db.update_todo(todo_id, todo_update)
+            todo = await db.update_todo(todo_id, todo_update)
             
             if not todo:
                 return MCPResponse(error="待办事项不存在或标记失败")
             
-            result = json.loads(json.dumps(todo.dict(), default=serialize_datetime))
-            return MCPResponse(result={"todo": result, "message": "待办事项已标记为完成"})
+            return MCPResponse(result={"todo": todo, "message": "待办事项已标记为完成"})
+        
+        elif method in ("bulk_create_todos", "bulk_update_todos", "bulk_delete_todos", "bulk_mark_completed"):
+            key = "todos" if method in ("bulk_create_todos", "bulk_update_todos") else "ids"
+            model = {"bulk_create_todos": TodoCreate, "bulk_update_todos": TodoBulkUpdate}.get(method)
+            try:
+                items = parse_bulk_list(params, key, model)
+            except ValueError as e:
+                return MCPResponse(error=str(e))
+            
+            if method == "bulk_create_todos":
+                todos = await db.bulk_create_todos(items)
+                return MCPResponse(result={
+                    "todos": todos,
+                    "count": len(todos),
+                    "message": f"已批量创建{len(todos)}个待办事项",
+                })
+            
+            if method == "bulk_delete_todos":
+                deleted_ids = await db.bulk_delete_todos(items)
+                return MCPResponse(result={
+                    "deleted_ids": deleted_ids,
+                    "not_found_ids": sorted(set(items) - set(deleted_ids)),
+                    "count": len(deleted_ids),
+                    "message": f"已批量删除{len(deleted_ids)}个待办事项",
+                })
+            
+            if method == "bulk_update_todos":
+                todos = await db.bulk_update_todos(items)
+                requested_ids = {update.id for update in items}
+                message = f"已批量更新{len(todos)}个待办事项"
+            else:
+                todos = await db.bulk_mark_completed(items)
+                requested_ids = set(items)
+                message = f"已将{len(todos)}个待办事项标记为完成"
+            
+            return MCPResponse(result={
+                "todos": todos,
+                "not_found_ids": sorted(requested_ids - {todo.id for todo in todos}),
+                "count": len(todos),
+                "message": message,
+            })
         
         else:
             return MCPResponse(error=f"不支持的方法: {method}")
@@ -112,15 +439,129 @@ async def handle_mcp_request(request: MCPRequest):
     except Exception as e:
         return MCPResponse(error=f"服务器错误: {str(e)}")
 
+async def execute_batch(requests: List[MCPRequest]) -> List[MCPResponse]:
+    """
+    按顺序执行批量请求：相邻的只读请求通过asyncio.gather并发执行，
+    写请求按原顺序依次执行，保证后面的读请求能看到前面写入的结果
+    """
+    responses: List[Optional[MCPResponse]] = [None] * len(requests)
+    pending_reads = []
+    
+    async def flush_reads():
+        results = await asyncio.gather(*(execute_mcp_request(requests[i]) for i in pending_reads))
+        for i, response in zip(pending_reads, results):
+            responses[i] = response
+        pending_reads.clear()
+    
+    for i, request in enumerate(requests):
+        if request.method in READ_METHODS:
+            pending_reads.append(i)
+        else:
+            await flush_reads()
+            responses[i] = await execute_mcp_request(request)
+    
+    await flush_reads()
+    return responses
+
+async def execute_batch_in_transaction(requests: List[MCPRequest]) -> List[MCPResponse]:
+    """
+    在同一个数据库事务中依次执行批量请求，任一项失败时整个事务回滚：
+    失败项返回自身的错误，其余已执行和未执行的项分别标记为已回滚和未执行
+    """
+    responses: List[MCPResponse] = []
+    
+    try:
+        async with db.transaction():
+            for request in requests:
+                response = await execute_mcp_request(request)
+                responses.append(response)
+                if response.error:
+                    raise BatchAborted()
+    except BatchAborted:
+        failed = len(responses) - 1
+        rolled_back = MCPResponse(error=f"事务已回滚：第{failed + 1}项执行失败")
+        not_executed = MCPResponse(error=f"未执行：事务在第{failed + 1}项失败后已回滚")
+        return (
+            [rolled_back] * failed
+            + [responses[failed]]
+            + [not_executed] * (len(requests) - failed - 1)
+        )
+    
+    return responses
+
+@app.post("/mcp", response_model=Union[MCPResponse, List[MCPResponse]])
+async def handle_mcp_request(request: Union[MCPRequest, List[MCPRequest]], transaction: bool = False):
+    """
+    处理MCP请求
+
+    请求体可以是单个MCP请求，也可以是请求数组（批量），批量时按相同顺序返回响应数组。
+    transaction=true 时批量请求在同一个数据库事务中执行。
+    """
+    if isinstance(request, MCPRequest):
+        response = await execute_mcp_request(request)
+        if isinstance(response, StreamingResponse):
+            return response
+        return encode_mcp_response(response, metric_method(request.method))
+    
+    if len(request) > MAX_BATCH_SIZE:
+        return encode_mcp_response(MCPResponse(error=f"批量请求最多包含{MAX_BATCH_SIZE}个请求"))
+    
+    if any(item.params.get("stream") for item in request):
+        return encode_mcp_response(MCPResponse(error="批量请求不支持stream模式"))
+    
+    if transaction:
+        return encode_mcp_response(await execute_batch_in_transaction(request))
+    return encode_mcp_response(await execute_batch(request))
+
+# 就绪检查借连接的最长等待秒数，连接池饱和时尽快返回503
+HEALTH_DB_TIMEOUT = float(os.getenv("HEALTH_DB_TIMEOUT", 2))
+# 待办事项总数估算的刷新间隔（秒），期间的就绪检查直接返回缓存的估算值
+HEALTH_ESTIMATE_INTERVAL = float(os.getenv("HEALTH_ESTIMATE_INTERVAL", 30))
+todo_estimate = {"value": None, "refreshed_at": None}
+
+async def get_todo_estimate() -> Optional[int]:
+    now = time.monotonic()
+    refreshed_at = todo_estimate["refreshed_at"]
+    if refreshed_at is None or now - refreshed_at >= HEALTH_ESTIMATE_INTERVAL:
+        todo_estimate["value"] = await db.estimate_todo_count()
+        todo_estimate["refreshed_at"] = now
+    return todo_estimate["value"]
+
+@app.get("/health/live")
+async def liveness_check():
+    """存活检查：进程能处理请求即返回200，不访问数据库"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
 @app.get("/health")
-async def health_check():
-    """健康检查接口"""
+async def readiness_check():
+    """
+    就绪检查：从连接池借连接执行 SELECT 1，返回待办事项总数的估算值以及连接池和缓存统计；
+    数据库不可用或连接池饱和时返回503
+    """
     try:
-        # 测试数据库连接
-        todos = db.get_todos()
-        return {"status": "healthy", "database": "connected", "todos_count": len(todos)}
+        await db.ping(timeout=HEALTH_DB_TIMEOUT)
+        todos_estimate = await get_todo_estimate()
     except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "error": str(e), "pool": db.pool_stats()},
+        )
+    
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "backend": backend,
+        "todos_estimate": todos_estimate,
+        "pool": db.pool_stats(),
+        "cache": cache.stats() if cache else None,
+        "cache_listener": change_listener.connected if change_listener else None,
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus文本格式的指标：MCP请求、数据库方法耗时、连接池和缓存统计"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     port = int(os.getenv("MCP_SERVER_PORT", 8000))
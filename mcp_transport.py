@@ -0,0 +1,89 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import httpx
+
+from models import MCPRequest, MCPResponse
+
+
+class MCPTransport(ABC):
+    """MCP传输层接口：call() 返回与 POST /mcp 响应体结构相同的dict"""
+
+    @abstractmethod
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    async def aclose(self):
+        pass
+
+
+class HTTPTransport(MCPTransport):
+    """通过HTTP访问独立运行的MCP服务器，使用长连接的httpx.AsyncClient（首次调用时创建）"""
+
+    def __init__(self, url: str, limits: Optional[httpx.Limits] = None):
+        self.url = url
+        self.limits = limits or httpx.Limits()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits)
+        return self._client
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.client.post(self.url, json={"method": method, "params": params})
+        return response.json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class InProcessTransport(MCPTransport):
+    """
+    在当前进程内直接调用 mcp_server 的方法处理函数，跳过HTTP请求和JSON编解码
+
+    首次调用时执行MCP服务器的启动逻辑（打开数据库连接池等），aclose() 时执行关闭逻辑
+    """
+
+    def __init__(self):
+        self._server = None
+        self._lock = asyncio.Lock()
+
+    async def _get_server(self):
+        async with self._lock:
+            if self._server is None:
+                import mcp_server
+                await mcp_server.startup()
+                self._server = mcp_server
+        return self._server
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        server = await self._get_server()
+        response = await server.execute_mcp_request(MCPRequest(method=method, params=params))
+        if not isinstance(response, MCPResponse):
+            return {"result": None, "error": "进程内传输不支持stream模式"}
+        return response.model_dump(mode="json")
+
+    async def aclose(self):
+        async with self._lock:
+            if self._server is not None:
+                await self._server.shutdown()
+                self._server = None
+
+
+def create_transport_from_env(url: str, limits: Optional[httpx.Limits] = None) -> MCPTransport:
+    """
+    根据 MCP_TRANSPORT 创建传输层：http（默认，访问url上的MCP服务器）
+    或 inprocess（在当前进程内处理，不需要单独启动MCP服务器）
+    """
+    transport = os.getenv("MCP_TRANSPORT", "http")
+    if transport == "http":
+        return HTTPTransport(url, limits)
+    if transport == "inprocess":
+        return InProcessTransport()
+    raise ValueError(f"不支持的MCP传输方式: {transport}")
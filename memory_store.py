@@ -0,0 +1,357 @@
+import bisect
+import os
+import threading
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+from database import (
+    COPY_PROGRESS_EVERY,
+    SEARCH_MODE_FULLTEXT,
+    STATS_WEEKS,
+    _CJK_RUN,
+    _WORD,
+    _stats_from_row,
+    _stats_weeks,
+    decode_cursor,
+    decode_due_cursor,
+    timed_query,
+)
+from models import Todo, TodoBulkUpdate, TodoCreate, TodoSearchResult, TodoUpdate
+from storage import LocalTodoStore, read_import_rows, write_export_rows
+
+_UPDATE_FIELDS = ("title", "content", "due_date", "completed")
+
+
+def _search_terms(query: str) -> List[str]:
+    """搜索词中的CJK连续字符和其它单词（小写），各部分之间为AND"""
+    text = query.lower()
+    terms = []
+    pos = 0
+    for match in _CJK_RUN.finditer(text):
+        terms.extend(_WORD.findall(text[pos:match.start()]))
+        terms.append(match.group())
+        pos = match.end()
+    terms.extend(_WORD.findall(text[pos:]))
+    return terms
+
+
+def _sort_key(todo: Todo) -> Tuple[datetime, int]:
+    return todo.created_at, todo.id
+
+
+class MemoryDatabaseManager(LocalTodoStore):
+    """
+    进程内存存储后端，数据只存在于当前进程中，适合测试、基准测试和临时使用
+
+    todos按id保存；另外维护按 (created_at, id) 排序的键列表（全部和按完成状态分组）用于keyset分页，
+    以及按 (due_date, id) 排序的截止日期索引。Todo对象只替换不修改，begin() 保存的快照可以直接用于回滚。
+    """
+
+    def __init__(self):
+        self.search_mode = os.getenv("TODO_SEARCH_MODE", SEARCH_MODE_FULLTEXT)
+        self._lock = threading.RLock()
+        self._todos: Dict[int, Todo] = {}
+        self._order: List[Tuple[datetime, int]] = []
+        self._by_status: Dict[bool, List[Tuple[datetime, int]]] = {True: [], False: []}
+        self._by_due_date: List[Tuple[date, int]] = []
+        self._next_id = 1
+        self._snapshot = None
+
+    def _index(self, todo: Todo):
+        key = _sort_key(todo)
+        bisect.insort(self._order, key)
+        bisect.insort(self._by_status[todo.completed], key)
+        if todo.due_date is not None:
+            bisect.insort(self._by_due_date, (todo.due_date, todo.id))
+
+    def _unindex(self, todo: Todo):
+        key = _sort_key(todo)
+        for keys in (self._order, self._by_status[todo.completed]):
+            del keys[bisect.bisect_left(keys, key)]
+        if todo.due_date is not None:
+            del self._by_due_date[bisect.bisect_left(self._by_due_date, (todo.due_date, todo.id))]
+
+    def _put(self, todo: Todo) -> Todo:
+        previous = self._todos.get(todo.id)
+        if previous is not None:
+            self._unindex(previous)
+        self._todos[todo.id] = todo
+        self._index(todo)
+        return todo
+
+    def _remove(self, todo_id: int) -> bool:
+        todo = self._todos.pop(todo_id, None)
+        if todo is None:
+            return False
+        self._unindex(todo)
+        return True
+
+    def begin(self):
+        with self._lock:
+            self._snapshot = (
+                dict(self._todos), list(self._order),
+                {status: list(keys) for status, keys in self._by_status.items()},
+                list(self._by_due_date), self._next_id,
+            )
+
+    def commit(self):
+        with self._lock:
+            self._snapshot = None
+
+    def rollback(self):
+        with self._lock:
+            if self._snapshot is not None:
+                self._todos, self._order, self._by_status, self._by_due_date, self._next_id = self._snapshot
+                self._snapshot = None
+
+    def ping(self):
+        pass
+
+    def estimate_todo_count(self) -> int:
+        return len(self._todos)
+
+    def _insert(self, values: dict) -> Todo:
+        now = datetime.now()
+        todo_id = values.get("id")
+        if todo_id is None:
+            todo_id = self._next_id
+        elif todo_id in self._todos:
+            raise ValueError(f"待办事项id重复: {todo_id}")
+        self._next_id = max(self._next_id, todo_id + 1)
+        todo = Todo(**{
+            "completed": False,
+            "created_at": now,
+            "updated_at": now,
+            **{column: value for column, value in values.items() if value is not None},
+            "id": todo_id,
+        })
+        return self._put(todo)
+
+    def _update(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        todo = self._todos.get(todo_id)
+        if todo is None:
+            return None
+        fields = {
+            field: value
+            for field, value in todo_update.model_dump(include=set(_UPDATE_FIELDS)).items()
+            if value is not None
+        }
+        if not fields:
+            return todo
+        return self._put(todo.model_copy(update={**fields, "updated_at": datetime.now()}))
+
+    @timed_query
+    def create_todo(self, todo: TodoCreate) -> Todo:
+        with self._lock:
+            return self._insert(todo.model_dump())
+
+    def _rank(self, todo: Todo, search: str, terms: List[str]) -> Optional[float]:
+        """
+        每个搜索词在标题中出现记2分、只在内容中出现记1分，所有词都出现时返回得分；
+        与PostgreSQL后端一样，搜索词长度为1或不少于3时整个搜索词的子串匹配也算命中（得分0）
+        """
+        title = todo.title.lower()
+        content = (todo.content or "").lower()
+        rank = 0.0
+        for term in terms:
+            if term in title:
+                rank += 2.0
+            elif term in content:
+                rank += 1.0
+            else:
+                break
+        else:
+            return rank
+        if len(search) >= 3 or len(search) == 1:
+            needle = search.lower()
+            if needle in title or needle in content:
+                return 0.0
+        return None
+
+    def _list(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        """与 database._build_list_query 相同的过滤、排序和keyset分页规则"""
+        terms = _search_terms(search) if search is not None and self.search_mode == SEARCH_MODE_FULLTEXT else []
+        after = decode_cursor(cursor) if cursor is not None else None
+
+        with self._lock:
+            keys = self._order if completed is None else self._by_status[completed]
+
+            if terms:
+                results = []
+                for key in keys:
+                    todo = self._todos[key[1]]
+                    rank = self._rank(todo, search, terms)
+                    if rank is not None:
+                        results.append(TodoSearchResult(**todo.model_dump(), rank=rank))
+                results.sort(key=lambda todo: (todo.rank, todo.created_at, todo.id), reverse=True)
+                if after is not None:
+                    created_at, todo_id, rank = after
+                    if rank is None:
+                        raise ValueError(f"无效的分页游标: {cursor}")
+                    results = [todo for todo in results if (todo.rank, todo.created_at, todo.id) < (rank, created_at, todo_id)]
+                return results if limit is None else results[:limit]
+
+            # 按 (created_at, id) 从游标位置向前倒序扫描
+            end = len(keys) if after is None else bisect.bisect_left(keys, after[:2])
+            needle = search.lower() if search is not None else None
+            results = []
+            for index in range(end - 1, -1, -1):
+                if limit is not None and len(results) >= limit:
+                    break
+                todo = self._todos[keys[index][1]]
+                if needle is not None:
+                    if needle not in todo.title.lower() and needle not in (todo.content or "").lower():
+                        continue
+                    todo = TodoSearchResult(**todo.model_dump())
+                results.append(todo)
+            return results
+
+    @timed_query
+    def get_todos(
+        self, completed: Optional[bool] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        return self._list(completed=completed, limit=limit, cursor=cursor)
+
+    @timed_query
+    def get_todos_due(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        completed: Optional[bool] = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        """与 database._build_due_query 相同的过滤、排序和keyset分页规则"""
+        with self._lock:
+            keys = self._by_due_date
+            if cursor is not None:
+                after = decode_due_cursor(cursor)
+                index = bisect.bisect_right(keys, after)
+                if start is not None:
+                    index = max(index, bisect.bisect_left(keys, (start, 0)))
+            else:
+                index = 0 if start is None else bisect.bisect_left(keys, (start, 0))
+            results = []
+            for due_date, todo_id in keys[index:]:
+                if (end is not None and due_date > end) or (limit is not None and len(results) >= limit):
+                    break
+                todo = self._todos[todo_id]
+                if completed is None or todo.completed == completed:
+                    results.append(todo)
+            return results
+
+    @timed_query
+    def get_todo_stats(self, today: Optional[date] = None, weeks: int = STATS_WEEKS) -> dict:
+        """与 database._build_stats_query 相同的统计规则；截止日期只遍历按日期排序的索引，按分界点分桶"""
+        today = today or date.today()
+        ranges = _stats_weeks(today, weeks)
+        # 分界点依次为 today、各周的结束日期；bucket 0 为逾期，最后一个为 due_later
+        bounds = [today] + [end for _, end in ranges]
+        buckets = [0] * (len(bounds) + 1)
+        due_today = dated = 0
+        with self._lock:
+            completed = len(self._by_status[True])
+            total = len(self._todos)
+            bucket = 0
+            for due_date, todo_id in self._by_due_date:
+                if self._todos[todo_id].completed:
+                    continue
+                while bucket < len(bounds) and due_date >= bounds[bucket]:
+                    bucket += 1
+                buckets[bucket] += 1
+                due_today += due_date == today
+                dated += 1
+        row = {
+            "total": total,
+            "completed": completed,
+            "no_due_date": total - completed - dated,
+            "overdue": buckets[0],
+            "due_today": due_today,
+            "due_later": buckets[-1],
+            **{f"week_{i}": count for i, count in enumerate(buckets[1:-1])},
+        }
+        return _stats_from_row(row, today, weeks)
+
+    @timed_query
+    def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
+        return self._todos.get(todo_id)
+
+    @timed_query
+    def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        with self._lock:
+            return self._update(todo_id, todo_update)
+
+    @timed_query
+    def delete_todo(self, todo_id: int) -> bool:
+        with self._lock:
+            return self._remove(todo_id)
+
+    @timed_query
+    def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        with self._lock:
+            return [self._insert(todo.model_dump()) for todo in todos]
+
+    @timed_query
+    def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        """返回更新后的待办事项（不存在的id会被忽略）"""
+        with self._lock:
+            results = [self._update(update.id, update) for update in updates]
+        return [todo for todo in results if todo is not None]
+
+    @timed_query
+    def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        """批量删除，返回实际删除的id"""
+        with self._lock:
+            return [todo_id for todo_id in dict.fromkeys(todo_ids) if self._remove(todo_id)]
+
+    @timed_query
+    def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        """批量标记为已完成，返回更新后的待办事项"""
+        update = TodoUpdate(completed=True)
+        with self._lock:
+            results = [self._update(todo_id, update) for todo_id in dict.fromkeys(todo_ids)]
+        return [todo for todo in results if todo is not None]
+
+    @timed_query
+    def export_todos(self, target, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        """按id顺序导出到二进制文件target，格式与PostgreSQL后端的COPY导出相同"""
+        with self._lock:
+            todos = [self._todos[todo_id] for todo_id in sorted(self._todos)]
+        return write_export_rows(todos, target, fmt, progress)
+
+    @timed_query
+    def import_todos(self, source: TextIO, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        """导入CSV或NDJSON，任意一行出错时整体回滚；包含id列时保留原id"""
+        columns, rows = read_import_rows(source, fmt)
+        if not columns:
+            return 0
+        imported = 0
+        with self._lock:
+            nested = self._snapshot is not None
+            if not nested:
+                self.begin()
+            try:
+                for row in rows:
+                    self._insert(row)
+                    imported += 1
+                    if progress and imported % COPY_PROGRESS_EVERY == 0:
+                        progress(imported)
+            except BaseException:
+                if not nested:
+                    self.rollback()
+                raise
+            if not nested:
+                self.commit()
+        return imported
+
+    @timed_query
+    def search_todos(
+        self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[TodoSearchResult]:
+        return self._list(search=query, limit=limit, cursor=cursor)
@@ -0,0 +1,368 @@
+import asyncio
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 默认的延迟直方图分桶（秒），覆盖亚毫秒级的缓存命中到数秒的LLM调用
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 响应体大小直方图分桶（字节）
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# 多进程模式：各工作进程把指标快照写到该目录下的 metrics_{pid}.json，抓取时合并
+MULTIPROCESS_DIR_ENV = "TODO_METRICS_DIR"
+# 工作进程写快照的间隔（秒），抓取到的其它进程的数据最多落后这么久
+SNAPSHOT_INTERVAL = float(os.getenv("TODO_METRICS_SNAPSHOT_INTERVAL", 1.0))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_multiprocess_dir(path: str):
+    """删除上次运行留下的快照，在启动工作进程之前调用（计数器按所有快照求和）"""
+    for snapshot in glob.glob(os.path.join(path, "metrics_*.json")):
+        os.remove(snapshot)
+
+
+class _Metric(ABC):
+    """按标签值分组保存样本；所有更新都持有锁，可以在线程和事件循环中同时使用"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """返回 (指标名后缀, 标签字符串, 值)"""
+
+    def options(self) -> dict:
+        """重建同一指标所需的额外构造参数"""
+        return {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            values = [[list(key), value] for key, value in self._values.items()]
+        return {
+            "kind": self.kind,
+            "documentation": self.documentation,
+            "labelnames": list(self.labelnames),
+            "options": self.options(),
+            "values": values,
+        }
+
+    @abstractmethod
+    def merge(self, values: list, alive: bool):
+        """把另一个进程快照中的值合并进来"""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def set(self, value: float, **labels):
+        """
+        直接设置当前值；计数器只用于镜像外部维护的累计值（例如连接池的累计借出次数），
+        调用方保证它不减少
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", _format_labels(self.labelnames, key), value) for key, value in items]
+
+    def merge(self, values, alive):
+        # 已退出进程的计数也保留，合并后的计数器不会因工作进程重启而回退
+        for key, value in values:
+            key = tuple(key)
+            self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Counter):
+    """瞬时值；多进程合并时对仍在运行的进程求和（例如各工作进程连接数之和），比例类的值应由计数器在查询时计算"""
+
+    kind = "gauge"
+
+    def merge(self, values, alive):
+        if alive:
+            super().merge(values, alive)
+
+
+class Histogram(_Metric):
+    """累积分桶直方图，同时记录总和与次数"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [每个分桶的计数..., 超出最大分桶的计数, 总和]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            # 第一个不小于value的分桶，超出最大分桶时落在 len(buckets)
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def options(self):
+        return {"buckets": list(self.buckets)}
+
+    def merge(self, values, alive):
+        for key, state in values:
+            key = tuple(key)
+            current = self._values.get(key)
+            self._values[key] = list(state) if current is None else [a + b for a, b in zip(current, state)]
+
+    def get(self, **labels) -> Tuple[int, float]:
+        """返回 (次数, 总和)"""
+        state = self._values.get(self._key(labels))
+        if state is None:
+            return 0, 0.0
+        return sum(state[:-1]), state[-1]
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        samples = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                samples.append(("_bucket", _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(("_sum", labels, state[-1]))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+_METRIC_TYPES = {metric_type.kind: metric_type for metric_type in (Counter, Gauge, Histogram)}
+
+
+class MetricsRegistry:
+    """
+    指标注册表，render() 输出Prometheus文本格式
+
+    collectors 在每次 render() 之前调用，用于在抓取时刷新连接池、缓存等状态对应的指标。
+
+    多进程模式（multiprocess_dir 或环境变量 TODO_METRICS_DIR）：多个工作进程共享同一个端口时，
+    一次抓取只会落到其中一个进程。每个进程由 start_snapshots() 启动的后台线程定期把自己的指标写到
+    metrics_{pid}.json，render() 先写入本进程的最新快照再合并目录中的所有快照：
+    计数器和直方图对所有进程（包括已退出的）求和，Gauge只合并仍在运行的进程。
+    """
+
+    def __init__(self, multiprocess_dir: Optional[str] = None):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self._multiprocess_dir = multiprocess_dir
+        self._snapshot_stop: Optional[threading.Event] = None
+        self._snapshot_thread: Optional[threading.Thread] = None
+
+    @property
+    def multiprocess_dir(self) -> Optional[str]:
+        # 环境变量在使用时读取：生产模式的主进程在导入本模块之后才设置它
+        return self._multiprocess_dir or os.getenv(MULTIPROCESS_DIR_ENV) or None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # 模块被重复导入时返回已注册的指标
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def _collect(self):
+        for collector in self._collectors:
+            collector()
+
+    def write_snapshot(self):
+        """把本进程的指标写到 {multiprocess_dir}/metrics_{pid}.json（先写临时文件再替换，读取方不会读到半个文件）"""
+        directory = self.multiprocess_dir
+        if not directory:
+            return
+        with self._lock:
+            metrics = list(self._metrics.values())
+        data = {"pid": os.getpid(), "metrics": {metric.name: metric.snapshot() for metric in metrics}}
+        path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temporary, path)
+
+    def _snapshot_loop(self, stop: threading.Event):
+        while not stop.wait(SNAPSHOT_INTERVAL):
+            try:
+                self._collect()
+                self.write_snapshot()
+            except Exception:
+                # 写快照失败只影响其它进程抓取到的数据，下一轮重试
+                pass
+
+    def start_snapshots(self):
+        """多进程模式下在每个工作进程启动时调用，未配置目录时不做任何事"""
+        if not self.multiprocess_dir or self._snapshot_thread is not None:
+            return
+        os.makedirs(self.multiprocess_dir, exist_ok=True)
+        self._snapshot_stop = threading.Event()
+        self._snapshot_thread = threading.Thread(
+            target=self._snapshot_loop, args=(self._snapshot_stop,), name="metrics-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def stop_snapshots(self):
+        """停止后台线程并写入最后一次快照，进程退出后它的计数仍然计入合并结果"""
+        if self._snapshot_thread is None:
+            return
+        self._snapshot_stop.set()
+        self._snapshot_thread.join()
+        self._snapshot_thread = None
+        self._collect()
+        self.write_snapshot()
+
+    def _merged_metrics(self) -> List[_Metric]:
+        merged: Dict[str, _Metric] = {}
+        for path in sorted(glob.glob(os.path.join(self.multiprocess_dir, "metrics_*.json"))):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = data["pid"] == os.getpid() or _pid_alive(data["pid"])
+            for name, state in data["metrics"].items():
+                metric = merged.get(name)
+                if metric is None:
+                    metric_type = _METRIC_TYPES[state["kind"]]
+                    metric = merged[name] = metric_type(
+                        name, state["documentation"], state["labelnames"], **state["options"]
+                    )
+                metric.merge(state["values"], alive)
+        return list(merged.values())
+
+    def render(self) -> str:
+        self._collect()
+        if self.multiprocess_dir:
+            self.write_snapshot()
+            metrics = self._merged_metrics()
+        else:
+            with self._lock:
+                metrics = list(self._metrics.values())
+        lines = []
+        for metric in sorted(metrics, key=lambda metric: metric.name):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(histogram: Histogram, errors: Optional[Counter] = None, label: str = "method"):
+    """
+    记录被装饰函数（同步或协程）的耗时，标签值为函数名；抛出异常时同时累加errors
+    """
+    def decorator(function):
+        name = function.__name__
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                except Exception:
+                    if errors is not None:
+                        errors.inc(**{label: name})
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start, **{label: name})
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(**{label: name})
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, **{label: name})
+        return wrapper
+
+    return decorator
@@ -0,0 +1,76 @@
+-- 全文检索与三元组索引
+-- 为 search_todos 提供基于索引的相关度排序搜索，可重复执行
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- CJK分词：把连续的中日韩字符切分为重叠的二元组（单字保持不变），
+-- 其它文本原样保留交给 simple 解析器处理
+-- 例如 "学习Python编程" -> " 学习 python 编程 "
+CREATE OR REPLACE FUNCTION todo_cjk_segment(input TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    result TEXT := '';
+    run TEXT := '';
+    ch TEXT;
+    i INT;
+BEGIN
+    IF input IS NULL THEN
+        RETURN '';
+    END IF;
+
+    -- 末尾追加一个空格，保证最后一段CJK字符也会被输出
+    input := lower(input) || ' ';
+
+    FOR i IN 1..char_length(input) LOOP
+        ch := substr(input, i, 1);
+        IF ch ~ '[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]' THEN
+            run := run || ch;
+        ELSE
+            IF run <> '' THEN
+                IF char_length(run) = 1 THEN
+                    result := result || ' ' || run;
+                ELSE
+                    FOR j IN 1..char_length(run) - 1 LOOP
+                        result := result || ' ' || substr(run, j, 2);
+                    END LOOP;
+                END IF;
+                result := result || ' ';
+                run := '';
+            END IF;
+            result := result || ch;
+        END IF;
+    END LOOP;
+
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- 维护的全文检索列：标题权重A，内容权重B
+ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION update_todos_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', todo_cjk_segment(NEW.title)), 'A') ||
+        setweight(to_tsvector('simple', todo_cjk_segment(NEW.content)), 'B');
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_todos_search_vector ON todos;
+CREATE TRIGGER update_todos_search_vector
+    BEFORE INSERT OR UPDATE OF title, content ON todos
+    FOR EACH ROW
+    EXECUTE FUNCTION update_todos_search_vector();
+
+-- 回填已有数据
+UPDATE todos
+SET search_vector =
+    setweight(to_tsvector('simple', todo_cjk_segment(title)), 'A') ||
+    setweight(to_tsvector('simple', todo_cjk_segment(content)), 'B')
+WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_todos_search_vector ON todos USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_todos_title_trgm ON todos USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_todos_content_trgm ON todos USING GIN (content gin_trgm_ops);
@@ -0,0 +1,66 @@
+-- 变更通知：写操作提交后在 todo_changes 频道发送通知，
+-- 多个MCP服务进程据此失效各自的进程内缓存，可重复执行
+
+-- 每条语句发送一条通知，内容为 {"op": ..., "ids": [...], "statuses": [...]}：
+-- ids为受影响的id，statuses为受影响行修改前后的完成状态；
+-- 影响超过500行或TRUNCATE时ids为null（接收方整体失效），避免超过NOTIFY载荷8000字节的上限
+CREATE OR REPLACE FUNCTION notify_todo_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_ids INT[];
+    statuses BOOLEAN[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(id), array_agg(DISTINCT completed) INTO changed_ids, statuses FROM new_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(id) INTO changed_ids FROM new_rows;
+        SELECT array_agg(DISTINCT completed) INTO statuses
+        FROM (SELECT completed FROM old_rows UNION SELECT completed FROM new_rows) AS changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(id), array_agg(DISTINCT completed) INTO changed_ids, statuses FROM old_rows;
+    END IF;
+
+    IF TG_OP <> 'TRUNCATE' THEN
+        -- 语句没有影响任何行
+        IF changed_ids IS NULL THEN
+            RETURN NULL;
+        END IF;
+        IF cardinality(changed_ids) > 500 THEN
+            changed_ids := NULL;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify(
+        'todo_changes',
+        json_build_object('op', TG_OP, 'ids', changed_ids, 'statuses', statuses)::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_todos_insert ON todos;
+CREATE TRIGGER notify_todos_insert
+    AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_todo_changes();
+
+DROP TRIGGER IF EXISTS notify_todos_update ON todos;
+CREATE TRIGGER notify_todos_update
+    AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_todo_changes();
+
+DROP TRIGGER IF EXISTS notify_todos_delete ON todos;
+CREATE TRIGGER notify_todos_delete
+    AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_todo_changes();
+
+DROP TRIGGER IF EXISTS notify_todos_truncate ON todos;
+CREATE TRIGGER notify_todos_truncate
+    AFTER TRUNCATE ON todos
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_todo_changes();
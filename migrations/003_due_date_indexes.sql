@@ -0,0 +1,12 @@
+-- 截止日期与完成状态索引
+-- 为 get_todos_due / get_overdue_todos 以及按完成状态过滤的列表分页提供索引，可重复执行
+
+-- keyset分页索引（get_todos 的 limit/cursor 分页）
+CREATE INDEX IF NOT EXISTS idx_todos_created_at_id ON todos (created_at DESC, id DESC);
+
+-- 未完成事项按截止日期排序：到期、逾期查询只扫描这部分行，
+-- 已完成的事项不进入索引，索引大小随未完成事项数量而不是总行数增长
+CREATE INDEX IF NOT EXISTS idx_todos_due_date_open ON todos (due_date, id) WHERE NOT completed;
+
+-- 按完成状态过滤的列表（get_todos completed=...）按 (created_at, id) 倒序分页
+CREATE INDEX IF NOT EXISTS idx_todos_completed_created_at ON todos (completed, created_at DESC, id DESC);
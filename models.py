@@ -16,6 +16,10 @@ class TodoUpdate(BaseModel):
     due_date: Optional[date] = None
     completed: Optional[bool] = None
 
+class TodoBulkUpdate(TodoUpdate):
+    """批量更新中的一项，未提供的字段保持不变"""
+    id: int
+
 class Todo(TodoBase):
     id: int
     completed: bool = False
@@ -25,6 +29,10 @@ class Todo(TodoBase):
     class Config:
         from_attributes = True
 
+class TodoSearchResult(Todo):
+    """搜索结果，rank为相关度得分（ilike搜索模式下为None）"""
+    rank: Optional[float] = None
+
 class MCPRequest(BaseModel):
     method: str
     params: dict
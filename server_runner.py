@@ -0,0 +1,110 @@
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+
+from storage import BACKEND_POSTGRES, backend_for_url
+
+LOOP_CHOICES = ("auto", "asyncio", "uvloop")
+HTTP_CHOICES = ("auto", "h11", "httptools")
+
+
+def default_workers() -> int:
+    """MCP_SERVER_WORKERS，未设置时每个CPU核心一个工作进程"""
+    return int(os.getenv("MCP_SERVER_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def worker_pool_sizes(workers: int) -> Tuple[int, int]:
+    """
+    按总连接预算 DB_POOL_TOTAL_MAX_SIZE 计算每个工作进程的连接池大小，返回 (min_size, max_size)
+
+    PostgreSQL后端使用进程内缓存时每个工作进程还有一个 LISTEN 连接，也计入预算；
+    SQLite和内存后端不启用读缓存，没有 LISTEN 连接。
+    """
+    budget = int(os.getenv("DB_POOL_TOTAL_MAX_SIZE", 50))
+    listens = (
+        backend_for_url(os.getenv("DATABASE_URL")) == BACKEND_POSTGRES
+        and os.getenv("TODO_CACHE_BACKEND", "memory").lower() == "memory"
+    )
+    listener = 1 if listens else 0
+    max_size = max(1, budget // workers - listener)
+    min_size = min(int(os.getenv("DB_POOL_MIN_SIZE", 1)), max_size)
+    return min_size, max_size
+
+
+def uvicorn_options() -> Dict:
+    """事件循环、HTTP解析器和优雅退出超时，由 MCP_SERVER_LOOP / MCP_SERVER_HTTP / MCP_SERVER_GRACEFUL_TIMEOUT 指定"""
+    return {
+        "loop": os.getenv("MCP_SERVER_LOOP", "auto"),
+        "http": os.getenv("MCP_SERVER_HTTP", "auto"),
+        "timeout_graceful_shutdown": int(os.getenv("MCP_SERVER_GRACEFUL_TIMEOUT", 30)),
+    }
+
+
+try:
+    from uvicorn.workers import UvicornWorker
+
+    class MCPUvicornWorker(UvicornWorker):
+        """gunicorn工作进程：按环境变量选择uvloop/httptools并设置优雅退出超时"""
+
+        def __init__(self, *args, **kwargs):
+            self.CONFIG_KWARGS = uvicorn_options()
+            super().__init__(*args, **kwargs)
+except ImportError:
+    # uvicorn.workers 依赖gunicorn
+    MCPUvicornWorker = None
+
+
+def run_production_server(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: Optional[int] = None,
+    loop: str = "auto",
+    http: str = "auto",
+    graceful_timeout: int = 30,
+):
+    """
+    多进程运行MCP服务器
+
+    优先使用gunicorn + UvicornWorker：主进程预加载应用（preload）后fork出工作进程，所有工作进程共享主进程监听的socket；
+    收到SIGTERM时各工作进程停止接收新连接，等待进行中的请求完成（最长 graceful_timeout 秒）后关闭连接池退出。
+    未安装gunicorn（例如Windows）时退回uvicorn自带的多进程模式，同样共享socket和优雅退出，但每个工作进程各自加载应用。
+    """
+    workers = workers or default_workers()
+
+    # 工作进程在启动时按这些变量创建连接池和uvicorn配置，必须在加载应用之前设置
+    min_size, max_size = worker_pool_sizes(workers)
+    os.environ["DB_POOL_MIN_SIZE"] = str(min_size)
+    os.environ["DB_POOL_MAX_SIZE"] = str(max_size)
+    os.environ["MCP_SERVER_LOOP"] = loop
+    os.environ["MCP_SERVER_HTTP"] = http
+    os.environ["MCP_SERVER_GRACEFUL_TIMEOUT"] = str(graceful_timeout)
+
+    # /metrics 合并所有工作进程的指标快照（见 metrics.MetricsRegistry）；未指定目录时使用临时目录，
+    # 启动前清空上次运行留下的快照
+    from metrics import MULTIPROCESS_DIR_ENV, clear_multiprocess_dir
+    metrics_dir = os.getenv(MULTIPROCESS_DIR_ENV) or tempfile.mkdtemp(prefix="todo-metrics-")
+    os.makedirs(metrics_dir, exist_ok=True)
+    clear_multiprocess_dir(metrics_dir)
+    os.environ[MULTIPROCESS_DIR_ENV] = metrics_dir
+
+    if MCPUvicornWorker is None:
+        uvicorn.run("mcp_server:app", host=host, port=port, workers=workers, **uvicorn_options())
+        return
+
+    from gunicorn.app.base import BaseApplication
+
+    class MCPServerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "server_runner.MCPUvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("graceful_timeout", graceful_timeout)
+
+        def load(self):
+            from mcp_server import app
+            return app
+
+    MCPServerApplication().run()
@@ -0,0 +1,415 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, List, Optional, TextIO
+
+from database import (
+    COPY_PROGRESS_EVERY,
+    SEARCH_MODE_FULLTEXT,
+    STATS_WEEKS,
+    TODO_COLUMNS,
+    _CJK_RUN,
+    _WORD,
+    _build_due_query,
+    _build_stats_query,
+    _chunks,
+    _stats_from_row,
+    decode_cursor,
+    timed_query,
+)
+from models import Todo, TodoBulkUpdate, TodoCreate, TodoSearchResult, TodoUpdate
+from storage import LocalTodoStore, read_import_rows, write_export_rows
+
+# 时间戳保存为定长文本（总是带微秒），按字符串比较即按时间排序
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT,
+    due_date TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_todos_created_at_id ON todos (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_todos_completed_created_at_id ON todos (completed, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_todos_due_date_open ON todos (due_date, id) WHERE NOT completed;
+
+-- 全文检索：保存经 todo_cjk_segment() 分词后的标题和内容，rowid与todos.id相同
+CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(title, content, tokenize = 'unicode61');
+
+CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+    INSERT INTO todos_fts (rowid, title, content)
+    VALUES (new.id, todo_cjk_segment(new.title), todo_cjk_segment(new.content));
+END;
+
+CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, content ON todos BEGIN
+    DELETE FROM todos_fts WHERE rowid = old.id;
+    INSERT INTO todos_fts (rowid, title, content)
+    VALUES (new.id, todo_cjk_segment(new.title), todo_cjk_segment(new.content));
+END;
+
+CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+    DELETE FROM todos_fts WHERE rowid = old.id;
+END;
+"""
+
+_UPDATE_FIELDS = ("title", "content", "due_date", "completed")
+
+
+def cjk_segment(text: Optional[str]) -> str:
+    """与 migrations/001_fulltext_search.sql 中的 todo_cjk_segment() 相同：连续的CJK字符切分为重叠的二元组"""
+    if text is None:
+        return ""
+    text = text.lower()
+    parts = []
+    pos = 0
+    for match in _CJK_RUN.finditer(text):
+        parts.append(text[pos:match.start()])
+        run = match.group()
+        if len(run) == 1:
+            parts.append(run)
+        else:
+            parts.extend(run[i:i + 2] for i in range(len(run) - 1))
+        pos = match.end()
+    parts.append(text[pos:])
+    return " ".join(parts)
+
+
+def build_fts_match(query: str) -> Optional[str]:
+    """
+    把搜索词转换为FTS5的MATCH表达式，规则与 database.build_search_tsquery() 一致：
+    连续的CJK字符按二元组做短语匹配，单个CJK字符和其它单词做前缀匹配，各部分之间为AND
+    """
+    text = query.lower()
+    parts = []
+    pos = 0
+    for match in _CJK_RUN.finditer(text):
+        parts.extend(f'"{word}"*' for word in _WORD.findall(text[pos:match.start()]))
+        run = match.group()
+        if len(run) == 1:
+            parts.append(f'"{run}"*')
+        else:
+            parts.append('"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        pos = match.end()
+    parts.extend(f'"{word}"*' for word in _WORD.findall(text[pos:]))
+    return " AND ".join(parts) or None
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _sql_value(value):
+    if isinstance(value, datetime):
+        return _timestamp(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class SQLiteDatabaseManager(LocalTodoStore):
+    """
+    SQLite存储后端，适合单机CLI和测试：不需要数据库服务，首次使用时自动建表
+
+    使用WAL日志模式，多个进程（多工作进程的MCP服务器）可以同时读取同一个数据库文件；
+    搜索使用FTS5全文索引，分词和排序规则与PostgreSQL后端的全文检索一致。
+    一个实例只持有一个连接，方法调用之间用锁串行。
+    """
+
+    def __init__(self, path: str = "todos.db"):
+        self.path = path
+        self.search_mode = os.getenv("TODO_SEARCH_MODE", SEARCH_MODE_FULLTEXT)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """延迟打开连接，与 DatabaseManager.pool 一样避免在导入或fork之前建立连接"""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    # isolation_level=None：事务由 _write() 和 begin() 显式控制
+                    conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    conn.row_factory = sqlite3.Row
+                    conn.create_function("todo_cjk_segment", 1, cjk_segment, deterministic=True)
+                    conn.execute("PRAGMA busy_timeout = 5000")
+                    if self.path != ":memory:":
+                        conn.execute("PRAGMA journal_mode = WAL")
+                        conn.execute("PRAGMA synchronous = NORMAL")
+                    conn.executescript(SCHEMA)
+                    self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _read(self):
+        with self._lock:
+            yield self.conn
+
+    @contextmanager
+    def _write(self):
+        """在写事务中执行，begin() 开启的事务内则并入该事务"""
+        with self._lock:
+            conn = self.conn
+            if conn.in_transaction:
+                yield conn
+                return
+            # IMMEDIATE：开始时就取得写锁，避免多进程下读锁升级失败
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def begin(self):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        with self._lock:
+            self.conn.execute("COMMIT")
+
+    def rollback(self):
+        with self._lock:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+
+    def ping(self):
+        with self._read() as conn:
+            conn.execute("SELECT 1")
+
+    @timed_query
+    def estimate_todo_count(self) -> int:
+        with self._read() as conn:
+            return conn.execute("SELECT count(*) FROM todos").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _insert(self, conn: sqlite3.Connection, values: dict) -> Todo:
+        now = _timestamp(datetime.now())
+        values = {
+            "completed": False,
+            "created_at": now,
+            "updated_at": now,
+            **{column: _sql_value(value) for column, value in values.items() if value is not None},
+        }
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        row = conn.execute(
+            f"INSERT INTO todos ({columns}) VALUES ({placeholders}) RETURNING {TODO_COLUMNS}",
+            list(values.values()),
+        ).fetchone()
+        return Todo(**row)
+
+    def _update(self, conn: sqlite3.Connection, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        fields = {
+            field: _sql_value(value)
+            for field, value in todo_update.model_dump(include=set(_UPDATE_FIELDS)).items()
+            if value is not None
+        }
+        if not fields:
+            row = conn.execute(f"SELECT {TODO_COLUMNS} FROM todos WHERE id = ?", (todo_id,)).fetchone()
+            return Todo(**row) if row else None
+        fields["updated_at"] = _timestamp(datetime.now())
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        row = conn.execute(
+            f"UPDATE todos SET {assignments} WHERE id = ? RETURNING {TODO_COLUMNS}",
+            [*fields.values(), todo_id],
+        ).fetchone()
+        return Todo(**row) if row else None
+
+    @timed_query
+    def create_todo(self, todo: TodoCreate) -> Todo:
+        with self._write() as conn:
+            return self._insert(conn, todo.model_dump())
+
+    def _list(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        """与 database._build_list_query 相同的过滤、排序和keyset分页规则"""
+        match = build_fts_match(search) if search is not None and self.search_mode == SEARCH_MODE_FULLTEXT else None
+        conditions = []
+        values = []
+
+        if match is not None:
+            # 全文索引匹配的行按bm25相关度排序（标题权重更高），只由子串匹配到的行rank为0
+            source = f"""
+                (SELECT t.*, COALESCE(m.rank, 0.0) AS rank FROM todos t
+                 LEFT JOIN (SELECT rowid AS id, -bm25(todos_fts, 2.0, 1.0) AS rank
+                            FROM todos_fts WHERE todos_fts MATCH ?) m ON m.id = t.id)
+            """
+            values.append(match)
+            condition = "id IN (SELECT rowid FROM todos_fts WHERE todos_fts MATCH ?)"
+            values.append(match)
+            if len(search) >= 3 or len(search) == 1:
+                condition += " OR title LIKE ? OR content LIKE ?"
+                values.extend([f"%{search}%", f"%{search}%"])
+            conditions.append(f"({condition})")
+            columns = f"{TODO_COLUMNS}, rank"
+        else:
+            source = "todos"
+            columns = TODO_COLUMNS
+            if search is not None:
+                conditions.append("(title LIKE ? OR content LIKE ?)")
+                values.extend([f"%{search}%", f"%{search}%"])
+
+        if completed is not None:
+            conditions.append("completed = ?")
+            values.append(completed)
+
+        if cursor is not None:
+            created_at, todo_id, rank = decode_cursor(cursor)
+            if match is not None:
+                if rank is None:
+                    raise ValueError(f"无效的分页游标: {cursor}")
+                conditions.append("(rank, created_at, id) < (?, ?, ?)")
+                values.extend([rank, _timestamp(created_at), todo_id])
+            else:
+                conditions.append("(created_at, id) < (?, ?)")
+                values.extend([_timestamp(created_at), todo_id])
+
+        query = f"SELECT {columns} FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if match is not None:
+            query += " ORDER BY rank DESC, created_at DESC, id DESC"
+        else:
+            query += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            values.append(limit)
+
+        model = TodoSearchResult if search is not None else Todo
+        with self._read() as conn:
+            return [model(**row) for row in conn.execute(query, values).fetchall()]
+
+    @timed_query
+    def get_todos(
+        self, completed: Optional[bool] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        return self._list(completed=completed, limit=limit, cursor=cursor)
+
+    @timed_query
+    def get_todos_due(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        completed: Optional[bool] = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        query, values = _build_due_query(
+            start=start, end=end, completed=completed, limit=limit, cursor=cursor, placeholder="?"
+        )
+        with self._read() as conn:
+            return [Todo(**row) for row in conn.execute(query, [_sql_value(value) for value in values]).fetchall()]
+
+    @timed_query
+    def get_todo_stats(self, today: Optional[date] = None, weeks: int = STATS_WEEKS) -> dict:
+        today = today or date.today()
+        query, values = _build_stats_query(today, weeks, placeholder="?")
+        with self._read() as conn:
+            row = conn.execute(query, [_sql_value(value) for value in values]).fetchone()
+        return _stats_from_row(row, today, weeks)
+
+    @timed_query
+    def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
+        with self._read() as conn:
+            row = conn.execute(f"SELECT {TODO_COLUMNS} FROM todos WHERE id = ?", (todo_id,)).fetchone()
+            return Todo(**row) if row else None
+
+    @timed_query
+    def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        with self._write() as conn:
+            return self._update(conn, todo_id, todo_update)
+
+    @timed_query
+    def delete_todo(self, todo_id: int) -> bool:
+        with self._write() as conn:
+            return conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,)).rowcount > 0
+
+    @timed_query
+    def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        """在一个事务中逐行插入，返回创建的待办事项"""
+        if not todos:
+            return []
+        with self._write() as conn:
+            return [self._insert(conn, todo.model_dump()) for todo in todos]
+
+    @timed_query
+    def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        """在一个事务中逐行更新，返回更新后的待办事项（不存在的id会被忽略）"""
+        results = []
+        with self._write() as conn:
+            for update in updates:
+                todo = self._update(conn, update.id, update)
+                if todo is not None:
+                    results.append(todo)
+        return results
+
+    @timed_query
+    def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        """批量删除，返回实际删除的id"""
+        deleted = []
+        with self._write() as conn:
+            for chunk in _chunks(list(todo_ids)):
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(f"DELETE FROM todos WHERE id IN ({placeholders}) RETURNING id", chunk)
+                deleted.extend(row[0] for row in rows.fetchall())
+        return deleted
+
+    @timed_query
+    def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        """批量标记为已完成，返回更新后的待办事项"""
+        results = []
+        with self._write() as conn:
+            for chunk in _chunks(list(todo_ids)):
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"UPDATE todos SET completed = 1, updated_at = ? WHERE id IN ({placeholders}) "
+                    f"RETURNING {TODO_COLUMNS}",
+                    [_timestamp(datetime.now()), *chunk],
+                )
+                results.extend(Todo(**row) for row in rows.fetchall())
+        return results
+
+    @timed_query
+    def export_todos(self, target, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        """按id顺序导出到二进制文件target，格式与PostgreSQL后端的COPY导出相同"""
+        with self._read() as conn:
+            rows = conn.execute(f"SELECT {TODO_COLUMNS} FROM todos ORDER BY id")
+            return write_export_rows((Todo(**row) for row in rows), target, fmt, progress)
+
+    @timed_query
+    def import_todos(self, source: TextIO, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        """在一个事务中导入CSV或NDJSON，包含id列时保留原id（AUTOINCREMENT计数随之更新）"""
+        columns, rows = read_import_rows(source, fmt)
+        if not columns:
+            return 0
+        imported = 0
+        with self._write() as conn:
+            for row in rows:
+                self._insert(conn, row)
+                imported += 1
+                if progress and imported % COPY_PROGRESS_EVERY == 0:
+                    progress(imported)
+        return imported
+
+    @timed_query
+    def search_todos(
+        self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[TodoSearchResult]:
+        return self._list(search=query, limit=limit, cursor=cursor)
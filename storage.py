@@ -0,0 +1,503 @@
+import asyncio
+import csv
+import io
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+from urllib.parse import unquote, urlsplit
+
+from models import Todo, TodoBulkUpdate, TodoCreate, TodoSearchResult, TodoUpdate
+
+# DATABASE_URL 的scheme与存储后端的对应关系
+BACKEND_POSTGRES = "postgres"
+BACKEND_SQLITE = "sqlite"
+BACKEND_MEMORY = "memory"
+
+_SCHEMES = {
+    "postgres": BACKEND_POSTGRES,
+    "postgresql": BACKEND_POSTGRES,
+    "sqlite": BACKEND_SQLITE,
+    "memory": BACKEND_MEMORY,
+}
+
+
+class TodoStore(ABC):
+    """
+    待办事项存储后端接口（同步），DatabaseManager（PostgreSQL）、SQLiteDatabaseManager 和 MemoryDatabaseManager 实现该接口
+
+    - 列表按 (created_at, id) 倒序，搜索结果按 (rank, created_at, id) 倒序；cursor 为 encode_cursor() 生成的keyset分页游标
+    - get_todos_due 按 (due_date, id) 正序，只包含有截止日期的待办事项；cursor 为 encode_due_cursor() 生成的游标
+    - update_todo / bulk_update_todos 忽略值为None的字段，不存在的id返回None或被忽略
+    - export_todos / import_todos 的格式见 database.COPY_FORMATS，各后端导出的文件可以互相导入
+    """
+
+    search_mode: str
+
+    @abstractmethod
+    def ping(self):
+        ...
+
+    @abstractmethod
+    def estimate_todo_count(self) -> int:
+        ...
+
+    def pool_stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    def create_todo(self, todo: TodoCreate) -> Todo:
+        ...
+
+    @abstractmethod
+    def get_todos(
+        self, completed: Optional[bool] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        ...
+
+    @abstractmethod
+    def iter_todos(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Todo]:
+        ...
+
+    @abstractmethod
+    def get_todos_due(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        completed: Optional[bool] = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        """截止日期在 [start, end] 之间（两端可省略）的待办事项，默认只包含未完成的"""
+
+    def get_overdue_todos(
+        self, today: Optional[date] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        """截止日期早于今天且未完成的待办事项，最早到期的在前"""
+        today = today or date.today()
+        return self.get_todos_due(end=today - timedelta(days=1), completed=False, limit=limit, cursor=cursor)
+
+    @abstractmethod
+    def get_todo_stats(self, today: Optional[date] = None, weeks: int = 4) -> dict:
+        """
+        汇总统计：总数、已完成、未完成、逾期、今天到期、无截止日期，
+        以及从今天起未完成事项按截止周的直方图（due_by_week）和之后的数量（due_later）
+        """
+
+    @abstractmethod
+    def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
+        ...
+
+    @abstractmethod
+    def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        ...
+
+    @abstractmethod
+    def delete_todo(self, todo_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        ...
+
+    @abstractmethod
+    def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        ...
+
+    @abstractmethod
+    def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        ...
+
+    @abstractmethod
+    def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        ...
+
+    @abstractmethod
+    def export_todos(self, target, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        ...
+
+    @abstractmethod
+    def import_todos(self, source: TextIO, fmt: str = "csv", progress: Optional[Callable[[int], None]] = None) -> int:
+        ...
+
+    @abstractmethod
+    def search_todos(
+        self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[TodoSearchResult]:
+        ...
+
+
+def _parse_import_value(column: str, value):
+    """把CSV字段或JSON值转换为列的类型，空值为None（title除外）"""
+    if value is None or (value == "" and column != "title"):
+        return None
+    if column == "id":
+        return int(value)
+    if column == "completed":
+        return value if isinstance(value, bool) else str(value).lower() in ("t", "true", "1", "yes")
+    if column == "due_date":
+        return date.fromisoformat(value)
+    if column in ("created_at", "updated_at"):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def read_import_rows(source: TextIO, fmt: str) -> Tuple[List[str], Iterator[dict]]:
+    """
+    进程内后端的导入：读取CSV（需要表头）或NDJSON，返回 (列名, 逐行的dict迭代器)，
+    列的校验和 import_todos 的COPY实现一致，布尔值接受PostgreSQL导出的 t/f
+    """
+    from database import COPY_FORMATS, _validate_copy_columns
+
+    if fmt == "csv":
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if not header:
+            return [], iter(())
+        columns = _validate_copy_columns([column.strip() for column in header])
+        rows = (dict(zip(columns, values)) for values in reader if values)
+    elif fmt == "ndjson":
+        lines = (json.loads(line) for line in source if line.strip())
+        first = next(lines, None)
+        if first is None:
+            return [], iter(())
+        columns = _validate_copy_columns(list(first))
+
+        def ndjson_rows():
+            yield first
+            for obj in lines:
+                extra = set(obj) - set(columns)
+                if extra:
+                    raise ValueError(f"NDJSON行包含第一行中没有的字段: {', '.join(sorted(extra))}")
+                yield obj
+        rows = ndjson_rows()
+    else:
+        raise ValueError(f"不支持的格式: {fmt}，可选: {', '.join(COPY_FORMATS)}")
+
+    def parsed():
+        for row in rows:
+            yield {column: _parse_import_value(column, row.get(column)) for column in columns}
+    return columns, parsed()
+
+
+def write_export_rows(
+    todos: Iterable[Todo], target, fmt: str, progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    进程内后端的导出，格式与PostgreSQL的COPY导出一致（CSV带表头、布尔值为t/f；NDJSON与row_to_json相同），
+    写入二进制文件target，返回导出的行数
+    """
+    from database import COPY_COLUMNS, COPY_FORMATS, COPY_PROGRESS_EVERY
+
+    if fmt not in COPY_FORMATS:
+        raise ValueError(f"不支持的格式: {fmt}，可选: {', '.join(COPY_FORMATS)}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(COPY_COLUMNS)
+
+    rows = 0
+    for todo in todos:
+        if fmt == "csv":
+            writer.writerow([
+                todo.id, todo.title, todo.content, todo.due_date,
+                "t" if todo.completed else "f", todo.created_at, todo.updated_at,
+            ])
+        else:
+            buffer.write(todo.model_dump_json(include=set(COPY_COLUMNS)) + "\n")
+        rows += 1
+        if rows % COPY_PROGRESS_EVERY == 0:
+            target.write(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+            if progress:
+                progress(rows)
+    target.write(buffer.getvalue().encode("utf-8"))
+    return rows
+
+
+class LocalTodoStore(TodoStore):
+    """
+    进程内存储后端（SQLite、内存）的公共部分
+
+    begin() / commit() / rollback() 供 AsyncStoreAdapter.transaction() 使用；
+    iter_todos 按keyset分页逐批读取，不会长时间占用读游标。
+    """
+
+    @abstractmethod
+    def begin(self):
+        ...
+
+    @abstractmethod
+    def commit(self):
+        ...
+
+    @abstractmethod
+    def rollback(self):
+        ...
+
+    @contextmanager
+    def transaction(self):
+        """块内的方法调用在一个事务中执行：正常退出时提交，异常时整体回滚"""
+        self.begin()
+        try:
+            yield
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    @abstractmethod
+    def _list(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        ...
+
+    def iter_todos(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Todo]:
+        from database import encode_cursor
+
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            page = self._list(completed=completed, search=search, limit=size, cursor=cursor)
+            yield from page
+            if len(page) < size:
+                return
+            cursor = encode_cursor(page[-1])
+            if remaining is not None:
+                remaining -= len(page)
+
+    def get_todos(
+        self, completed: Optional[bool] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        return self._list(completed=completed, limit=limit, cursor=cursor)
+
+    def search_todos(
+        self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[TodoSearchResult]:
+        return self._list(search=query, limit=limit, cursor=cursor)
+
+
+class AsyncStoreAdapter:
+    """
+    把同步的进程内存储后端包装成与 AsyncDatabaseManager 相同的异步接口
+
+    offload=True 时所有调用在一个专用线程中执行（SQLite的磁盘I/O不阻塞事件循环），否则直接在事件循环中执行（内存后端）。
+    transaction() 块持有一把 asyncio 锁，块外的调用要等事务结束，不会混入未提交的事务中。
+    """
+
+    def __init__(self, store: LocalTodoStore, offload: bool = True):
+        self.store = store
+        self.search_mode = store.search_mode
+        self.offload = offload
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._in_transaction = ContextVar("store_in_transaction", default=False)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # 在事件循环中首次使用时创建
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _run(self, function, *args, **kwargs):
+        if not self.offload:
+            return function(*args, **kwargs)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo-store")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, lambda: function(*args, **kwargs))
+
+    async def _call(self, function, *args, **kwargs):
+        if self._in_transaction.get():
+            return await self._run(function, *args, **kwargs)
+        async with self.lock:
+            return await self._run(function, *args, **kwargs)
+
+    async def open(self):
+        await self._run(self.store.ping)
+
+    async def close(self):
+        await self._run(self.store.close)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @asynccontextmanager
+    async def transaction(self):
+        if self._in_transaction.get():
+            yield
+            return
+
+        async with self.lock:
+            await self._run(self.store.begin)
+            token = self._in_transaction.set(True)
+            try:
+                yield
+            except BaseException:
+                await self._run(self.store.rollback)
+                raise
+            else:
+                await self._run(self.store.commit)
+            finally:
+                self._in_transaction.reset(token)
+
+    def pool_stats(self) -> dict:
+        return self.store.pool_stats()
+
+    async def ping(self, timeout: Optional[float] = None):
+        await self._call(self.store.ping)
+
+    async def estimate_todo_count(self) -> int:
+        return await self._call(self.store.estimate_todo_count)
+
+    async def create_todo(self, todo: TodoCreate) -> Todo:
+        return await self._call(self.store.create_todo, todo)
+
+    async def get_todos(
+        self, completed: Optional[bool] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        return await self._call(self.store.get_todos, completed=completed, limit=limit, cursor=cursor)
+
+    async def iter_todos(
+        self,
+        completed: Optional[bool] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Todo]:
+        """逐批读取，每批之间释放锁，长时间的流式响应不会阻塞写操作"""
+        from database import encode_cursor
+
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            page = await self._call(self.store._list, completed=completed, search=search, limit=size, cursor=cursor)
+            for todo in page:
+                yield todo
+            if len(page) < size:
+                return
+            cursor = encode_cursor(page[-1])
+            if remaining is not None:
+                remaining -= len(page)
+
+    async def get_todos_due(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        completed: Optional[bool] = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Todo]:
+        return await self._call(
+            self.store.get_todos_due, start=start, end=end, completed=completed, limit=limit, cursor=cursor
+        )
+
+    async def get_overdue_todos(
+        self, today: Optional[date] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[Todo]:
+        return await self._call(self.store.get_overdue_todos, today=today, limit=limit, cursor=cursor)
+
+    async def get_todo_stats(self, today: Optional[date] = None, weeks: int = 4) -> dict:
+        return await self._call(self.store.get_todo_stats, today=today, weeks=weeks)
+
+    async def get_todo_by_id(self, todo_id: int) -> Optional[Todo]:
+        return await self._call(self.store.get_todo_by_id, todo_id)
+
+    async def update_todo(self, todo_id: int, todo_update: TodoUpdate) -> Optional[Todo]:
+        return await self._call(self.store.update_todo, todo_id, todo_update)
+
+    async def delete_todo(self, todo_id: int) -> bool:
+        return await self._call(self.store.delete_todo, todo_id)
+
+    async def bulk_create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        return await self._call(self.store.bulk_create_todos, todos)
+
+    async def bulk_update_todos(self, updates: List[TodoBulkUpdate]) -> List[Todo]:
+        return await self._call(self.store.bulk_update_todos, updates)
+
+    async def bulk_delete_todos(self, todo_ids: List[int]) -> List[int]:
+        return await self._call(self.store.bulk_delete_todos, todo_ids)
+
+    async def bulk_mark_completed(self, todo_ids: List[int]) -> List[Todo]:
+        return await self._call(self.store.bulk_mark_completed, todo_ids)
+
+    async def search_todos(
+        self, query: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> List[TodoSearchResult]:
+        return await self._call(self.store.search_todos, query, limit=limit, cursor=cursor)
+
+
+def backend_for_url(url: Optional[str]) -> str:
+    """
+    根据URL的scheme选择存储后端：
+
+    - postgresql://... 或 postgres://...：PostgreSQL（DatabaseManager）
+    - sqlite:///todos.db（相对路径）、sqlite:////var/lib/todos.db（绝对路径）：SQLite文件
+    - memory://：进程内存，进程退出后数据丢失
+    """
+    scheme = urlsplit(url or "").scheme.lower()
+    if not scheme:
+        # 未设置或 "host=... dbname=..." 形式的连接串交给libpq处理
+        return BACKEND_POSTGRES
+    backend = _SCHEMES.get(scheme)
+    if backend is None:
+        raise ValueError(f"不支持的DATABASE_URL: {url!r}，可选 postgresql://、sqlite:///文件路径 或 memory://")
+    return backend
+
+
+def sqlite_path(url: str) -> str:
+    """sqlite:///todos.db → todos.db，sqlite:////tmp/todos.db → /tmp/todos.db，sqlite:///:memory: → :memory:"""
+    path = unquote(urlsplit(url).path)
+    return path[1:] if path.startswith("/") else path
+
+
+def create_store(url: Optional[str] = None) -> TodoStore:
+    """按URL创建同步存储后端，url默认取 DATABASE_URL"""
+    url = url or os.getenv("DATABASE_URL")
+    backend = backend_for_url(url)
+    if backend == BACKEND_SQLITE:
+        from sqlite_store import SQLiteDatabaseManager
+        return SQLiteDatabaseManager(sqlite_path(url))
+    if backend == BACKEND_MEMORY:
+        from memory_store import MemoryDatabaseManager
+        return MemoryDatabaseManager()
+    from database import DatabaseManager
+    return DatabaseManager(url)
+
+
+def create_async_store(url: Optional[str] = None):
+    """按URL创建异步存储后端（AsyncDatabaseManager 或包装进程内后端的 AsyncStoreAdapter）"""
+    url = url or os.getenv("DATABASE_URL")
+    backend = backend_for_url(url)
+    if backend == BACKEND_POSTGRES:
+        from database import AsyncDatabaseManager
+        return AsyncDatabaseManager(url)
+    return AsyncStoreAdapter(create_store(url), offload=(backend == BACKEND_SQLITE))
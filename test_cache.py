@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+读缓存测试：写操作失效、变更通知失效，以及监听未连接和事务中绕过缓存
+
+    python -m pytest test_cache.py
+    TEST_DATABASE_URL=postgresql://... python -m pytest test_cache.py   # 包括监听重连
+
+PostgreSQL只用于 ChangeListener 的用例，其余用例使用内存后端。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cache import AsyncCachedDatabaseManager, ChangeListener, MemoryCacheBackend, TodoCache
+from memory_store import MemoryDatabaseManager
+from models import TodoCreate, TodoUpdate
+from storage import AsyncStoreAdapter
+
+# 连接会立即被拒绝的地址
+UNREACHABLE_DSN = "postgresql://todo@127.0.0.1:1/todoapp?connect_timeout=1"
+
+
+def make_db(listener=None):
+    store = MemoryDatabaseManager()
+    cache = TodoCache(MemoryCacheBackend(), ttl=60)
+    db = AsyncCachedDatabaseManager(AsyncStoreAdapter(store, offload=False), cache, listener)
+    return store, cache, db
+
+
+def titles(todos):
+    return [todo.title for todo in todos]
+
+
+def test_write_invalidation():
+    async def scenario():
+        store, cache, db = make_db()
+        todo = await db.create_todo(TodoCreate(title="原标题"))
+        pending = await db.get_todos(completed=False)
+        assert titles(await db.get_todos(completed=False)) == titles(pending)
+        assert (cache.hits, cache.misses) == (1, 1)
+        await db.get_todos(completed=True)
+
+        await db.update_todo(todo.id, TodoUpdate(title="新标题"))
+        assert titles(await db.get_todos(completed=False)) == ["新标题"]
+        # 没有改变完成状态的更新不影响已完成列表
+        hits = cache.hits
+        await db.get_todos(completed=True)
+        assert cache.hits == hits + 1
+
+        assert (await db.get_todo_by_id(todo.id)).title == "新标题"
+        await db.delete_todo(todo.id)
+        assert await db.get_todo_by_id(todo.id) is None
+        assert await db.get_todos() == []
+
+    asyncio.run(scenario())
+
+
+def test_change_notification_invalidation():
+    async def scenario():
+        store, cache, db = make_db()
+        todo = await db.create_todo(TodoCreate(title="原标题"))
+        assert (await db.get_todo_by_id(todo.id)).title == "原标题"
+
+        # 其它进程直接写库：收到通知之前返回缓存，收到之后重新查库
+        store.update_todo(todo.id, TodoUpdate(title="其它进程修改"))
+        assert (await db.get_todo_by_id(todo.id)).title == "原标题"
+        listener = ChangeListener(cache, UNREACHABLE_DSN)
+        listener._apply('{"op": "UPDATE", "ids": [%d], "statuses": [false]}' % todo.id)
+        assert (await db.get_todo_by_id(todo.id)).title == "其它进程修改"
+
+        # 无法解析的通知按整体失效处理
+        await db.get_todos()
+        store.create_todo(TodoCreate(title="另一条"))
+        listener._apply("not json")
+        assert sorted(titles(await db.get_todos())) == ["其它进程修改", "另一条"]
+
+    asyncio.run(scenario())
+
+
+def test_transaction_bypasses_cache():
+    async def scenario():
+        store, cache, db = make_db()
+        todo = await db.create_todo(TodoCreate(title="事务前"))
+        await db.get_todo_by_id(todo.id)
+        with pytest.raises(RuntimeError):
+            async with db.transaction():
+                await db.update_todo(todo.id, TodoUpdate(title="事务内"))
+                assert (await db.get_todo_by_id(todo.id)).title == "事务内"
+                raise RuntimeError("rollback")
+        # 回滚后缓存中没有事务内的数据
+        assert (await db.get_todo_by_id(todo.id)).title == "事务前"
+
+    asyncio.run(scenario())
+
+
+def test_listener_down_bypasses_cache(caplog):
+    async def scenario():
+        listener = ChangeListener(None, UNREACHABLE_DSN, retry_interval=0.01)
+        store, cache, db = make_db(listener)
+        listener.cache = cache
+        listener.start()
+        await asyncio.sleep(0.2)
+        assert not listener.connected
+
+        todo = await db.create_todo(TodoCreate(title="原标题"))
+        await db.get_todo_by_id(todo.id)
+        store.update_todo(todo.id, TodoUpdate(title="其它进程修改"))
+        assert (await db.get_todo_by_id(todo.id)).title == "其它进程修改"
+        assert (cache.hits, cache.misses) == (0, 0)
+        await listener.stop()
+
+    with caplog.at_level(logging.WARNING, logger="cache"):
+        asyncio.run(scenario())
+    failures = [record for record in caplog.records if "缓存失效监听" in record.getMessage()]
+    assert len(failures) > 1
+    # 连续失败只有第一次带完整的异常信息
+    assert failures[0].exc_info and not any(record.exc_info for record in failures[1:])
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="需要 TEST_DATABASE_URL")
+def test_listener_reconnects_and_invalidates():
+    import psycopg
+
+    dsn = os.getenv("TEST_DATABASE_URL")
+
+    async def wait_for(condition, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            assert asyncio.get_running_loop().time() < deadline
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        cache = TodoCache(MemoryCacheBackend(), ttl=60)
+        listener = ChangeListener(cache, dsn, retry_interval=0.05)
+        listener.start()
+        await wait_for(lambda: listener.connected)
+        # 建立监听时整体失效一次
+        assert cache.invalidations == 1
+
+        async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+            todo_id = (await (await conn.execute(
+                "INSERT INTO todos (title) VALUES ('缓存监听测试') RETURNING id"
+            )).fetchone())[0]
+            await wait_for(lambda: cache.notifications == 1)
+
+            # 断开监听连接：重连后再整体失效一次
+            await conn.execute(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE query = 'LISTEN todo_changes' AND pid <> pg_backend_pid()"
+            )
+            await wait_for(lambda: cache.invalidations >= 3 and listener.connected)
+            await conn.execute("DELETE FROM todos WHERE id = %s", (todo_id,))
+            await wait_for(lambda: cache.notifications == 2)
+        await listener.stop()
+
+    asyncio.run(scenario())
@@ -13,6 +13,20 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from ai_agent import AIAgent
 from enhanced_ai_agent import EnhancedAIAgent
 
+# 测试用例（benchmarks/bench_intent_matcher.py 也使用这组输入）
+TEST_CASES = [
+    "创建一个任务：学习Python编程",
+    "显示我的所有任务",
+    "搜索包含'学习'的任务",
+    "标记任务1为已完成",
+    "修改任务2的标题",
+    "删除任务3",
+    "查看未完成的任务",
+    "我要做一个新任务叫'买菜'",
+    "找一下关于项目的任务",
+    "任务5完成了"
+]
+
 async def test_function_selection():
     """测试不同的function选择方法"""
     
@@ -20,24 +34,10 @@ async def test_function_selection():
     original_agent = AIAgent()
     enhanced_agent = EnhancedAIAgent()
     
-    # 测试用例
-    test_cases = [
-        "创建一个任务：学习Python编程",
-        "显示我的所有任务",
-        "搜索包含'学习'的任务",
-        "标记任务1为已完成",
-        "修改任务2的标题",
-        "删除任务3",
-        "查看未完成的任务",
-        "我要做一个新任务叫'买菜'",
-        "找一下关于项目的任务",
-        "任务5完成了"
-    ]
-    
     print("🧪 Function选择机制测试")
     print("=" * 60)
     
-    for i, test_input in enumerate(test_cases, 1):
+    for i, test_input in enumerate(TEST_CASES, 1):
         print(f"\n📝 测试案例 {i}: {test_input}")
         print("-" * 40)
         
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+main.py import / export 命令测试：SQLite后端之间导出再导入，以及COPY输入的记录计数
+
+    python -m pytest test_import_export.py
+"""
+
+import io
+import os
+import sys
+
+import pytest
+from typer.testing import CliRunner
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import _CopyExportWriter, _CopyRowReader
+from main import app
+from models import TodoCreate
+from storage import create_store
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def source_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'source.db'}"
+    store = create_store(url)
+    store.bulk_create_todos([
+        TodoCreate(title="普通任务"),
+        TodoCreate(title='带"引号"和,逗号', content="第一行\n第二行"),
+        TodoCreate(title="有截止日期", content=None, due_date="2030-01-02"),
+    ])
+    store.bulk_mark_completed([1])
+    store.close()
+    return url
+
+
+@pytest.mark.parametrize("filename", ["todos.csv", "todos.ndjson"])
+def test_export_import_round_trip(monkeypatch, tmp_path, source_url, filename):
+    path = str(tmp_path / filename)
+    monkeypatch.setenv("DATABASE_URL", source_url)
+    result = runner.invoke(app, ["export", path])
+    assert result.exit_code == 0, result.output
+    assert "导出完成：3 行" in result.output
+
+    target_url = f"sqlite:///{tmp_path / 'target.db'}"
+    monkeypatch.setenv("DATABASE_URL", target_url)
+    result = runner.invoke(app, ["import", path])
+    assert result.exit_code == 0, result.output
+    assert "导入完成：3 行" in result.output
+
+    source, target = create_store(source_url), create_store(target_url)
+    assert [todo.model_dump() for todo in target.get_todos()] == [todo.model_dump() for todo in source.get_todos()]
+    source.close()
+    target.close()
+
+
+def test_import_rejects_unknown_columns(monkeypatch, tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("title,owner\n任务,张三\n", encoding="utf-8")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'todos.db'}")
+    result = runner.invoke(app, ["import", str(path)])
+    assert result.exit_code == 1
+    assert "不支持导入的列: owner" in result.output
+
+
+def test_copy_progress_counts_records():
+    rows = ['"a","第一行\n', '第二行"\n', '"b","带""引号"""\n', '"c",""\n']
+    reader = _CopyRowReader(rows)
+    while reader.read(8):
+        pass
+    assert reader.rows_read == 3
+
+    writer = _CopyExportWriter(io.BytesIO())
+    data = 'id,title\n1,"a\nb"\n2,"c"""\n3,d\n'.encode("utf-8")
+    for i in range(0, len(data), 5):
+        writer.write(data[i:i + 5])
+    # 表头也算一行，最终导出的行数取自COPY的rowcount
+    assert writer.rows_written == 4
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+本地意图分类器测试：置信度校准、保存的模型与语料一致，以及语料修改后自动重新训练
+
+    python -m pytest test_intent_classifier.py
+"""
+
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from intent_classifier import (
+    DATA_DIR,
+    DEFAULT_CORPUS,
+    DEFAULT_MODEL,
+    IntentClassifier,
+    corpus_digest,
+    evaluate,
+    load_corpus,
+    load_or_train,
+)
+
+EVAL_CORPUS = os.path.join(DATA_DIR, "intent_eval.jsonl")
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier.load(DEFAULT_MODEL)
+
+
+def calibration_error(classifier, examples, bins=10):
+    """按置信度分桶的期望校准误差（ECE）"""
+    predictions = [classifier.predict(text) for text, _ in examples]
+    confidence = np.array([probability for _, probability in predictions])
+    correct = np.array([predicted == intent for (predicted, _), (_, intent) in zip(predictions, examples)])
+    error = 0.0
+    edges = np.linspace(0, 1, bins + 1)
+    for low, high in zip(edges[:-1], edges[1:]):
+        selected = (confidence > low) & (confidence <= high)
+        if selected.any():
+            error += selected.mean() * abs(confidence[selected].mean() - correct[selected].mean())
+    return error
+
+
+def test_saved_model_matches_corpus(classifier):
+    # 修改 data/intent_corpus.jsonl 后需要执行 python main.py train-intent
+    assert classifier.corpus_sha == corpus_digest(DEFAULT_CORPUS)
+
+
+def test_confidence_is_calibrated(classifier):
+    examples = load_corpus(EVAL_CORPUS)
+    probabilities = classifier.predict_proba(examples[0][0])
+    assert sum(probabilities.values()) == pytest.approx(1.0, abs=1e-5)
+
+    uncalibrated = IntentClassifier(
+        classifier.vocabulary,
+        classifier.idf,
+        classifier.weights * classifier.temperature,
+        classifier.bias * classifier.temperature,
+        classifier.labels,
+    )
+    assert calibration_error(classifier, examples) < 0.1
+    assert calibration_error(classifier, examples) < calibration_error(uncalibrated, examples)
+
+    # 默认阈值下直接执行的预测几乎都正确
+    result = evaluate(classifier, examples, threshold=0.9)
+    assert result["confident_accuracy"] >= 0.97
+    assert result["confident_fraction"] >= 0.5
+
+
+def test_save_load_round_trip(classifier, tmp_path):
+    path = str(tmp_path / "model.npz")
+    classifier.save(path)
+    loaded = IntentClassifier.load(path)
+    assert loaded.temperature == pytest.approx(classifier.temperature)
+    for text, _ in load_corpus(EVAL_CORPUS)[:20]:
+        label, confidence = classifier.predict(text)
+        assert loaded.predict(text)[0] == label
+        assert loaded.predict(text)[1] == pytest.approx(confidence, abs=1e-5)
+
+
+def test_retrains_when_corpus_changes(tmp_path):
+    corpus = str(tmp_path / "corpus.jsonl")
+    model = str(tmp_path / "model.npz")
+    shutil.copy(DEFAULT_CORPUS, corpus)
+
+    trained = load_or_train(model, corpus)
+    assert os.path.exists(model)
+    assert trained.corpus_sha == corpus_digest(corpus)
+
+    # 语料未修改：直接加载保存的模型
+    mtime = os.path.getmtime(model)
+    assert load_or_train(model, corpus).corpus_sha == trained.corpus_sha
+    assert os.path.getmtime(model) == mtime
+
+    with open(corpus, "a", encoding="utf-8") as f:
+        f.write('{"text": "列出还没完成的事情", "intent": "get_todos"}\n')
+    retrained = load_or_train(model, corpus)
+    assert retrained.corpus_sha == corpus_digest(corpus) != trained.corpus_sha
+    assert IntentClassifier.load(model).corpus_sha == retrained.corpus_sha
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+AI工具选择缓存测试：只缓存只读工具的选择
+
+    python -m pytest test_llm_cache.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_cache import LLMDecisionCache
+
+
+def tool_call(name, arguments="{}"):
+    return {"id": "call_1", "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def test_caches_read_only_decisions(tmp_path):
+    cache = LLMDecisionCache(sqlite_path=str(tmp_path / "llm_cache.db"))
+    key = cache.make_key("显示未完成的任务", "v1", None)
+    cache.set(key, [tool_call("get_todos", '{"completed": false}'), tool_call("todo_stats")])
+    assert [call["name"] for call in cache.get(key)] == ["get_todos", "todo_stats"]
+    assert cache.disk.count() == 1
+    cache.close()
+
+
+def test_skips_decisions_with_write_tools(tmp_path):
+    cache = LLMDecisionCache(sqlite_path=str(tmp_path / "llm_cache.db"))
+    for text, calls in [
+        ("删除任务3", [tool_call("delete_todo", '{"id": 3}')]),
+        ("添加买菜", [tool_call("create_todo", '{"title": "买菜"}')]),
+        ("查看并完成任务1", [tool_call("get_todos"), tool_call("mark_completed", '{"id": 1}')]),
+    ]:
+        key = cache.make_key(text, "v1", None)
+        cache.set(key, calls)
+        assert cache.get(key) is None
+    assert cache.disk.count() == 0
+    cache.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+MCP服务器请求处理测试，使用内存后端，不需要数据库服务器
+
+    python -m pytest test_mcp_server.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def client():
+    # mcp_server 在导入时根据 DATABASE_URL 创建存储后端
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DATABASE_URL", "memory://")
+        from fastapi.testclient import TestClient
+        import mcp_server
+
+        with TestClient(mcp_server.app) as client:
+            yield client
+
+
+def call(client, method, transaction=None, **params):
+    url = "/mcp?transaction=true" if transaction else "/mcp"
+    return client.post(url, json={"method": method, "params": params}).json()
+
+
+def test_completed_param_coercion(client):
+    done = call(client, "create_todo", title="已完成的任务")["result"]["todo"]
+    call(client, "mark_completed", id=done["id"])
+    pending = call(client, "create_todo", title="未完成的任务")["result"]["todo"]
+
+    for value in (True, "true", "yes", "T", 1, "1"):
+        ids = [todo["id"] for todo in call(client, "get_todos", completed=value)["result"]["todos"]]
+        assert done["id"] in ids and pending["id"] not in ids
+    for value in (False, "false", "no", 0):
+        ids = [todo["id"] for todo in call(client, "get_todos", completed=value)["result"]["todos"]]
+        assert pending["id"] in ids and done["id"] not in ids
+
+    for method, params in [("get_todos", {}), ("get_todos_due", {"period": "week"})]:
+        response = call(client, method, completed="maybe", **params)
+        assert response["error"] == "completed必须是布尔值"
+
+
+def test_single_item_id_validation(client):
+    for method in ("get_todo", "update_todo", "delete_todo", "mark_completed"):
+        assert call(client, method, id="abc")["error"] == "id必须是整数"
+        assert call(client, method, id=True)["error"] == "id必须是整数"
+        assert call(client, method)["error"] == "缺少todo ID"
+    assert call(client, "get_todo", id=10 ** 9)["error"] == "待办事项不存在"
+
+
+def test_batch_requests(client):
+    created = call(client, "create_todo", title="批量请求")["result"]["todo"]
+    responses = client.post("/mcp", json=[
+        {"method": "get_todo", "params": {"id": created["id"]}},
+        {"method": "update_todo", "params": {"id": created["id"], "title": "批量请求（已修改）"}},
+        {"method": "get_todo", "params": {"id": created["id"]}},
+        {"method": "no_such_method", "params": {}},
+    ]).json()
+
+    assert len(responses) == 4
+    assert responses[0]["result"]["todo"]["title"] == "批量请求"
+    # 写请求之后的读请求能看到写入的结果
+    assert responses[2]["result"]["todo"]["title"] == "批量请求（已修改）"
+    assert responses[3]["error"] == "不支持的方法: no_such_method"
+
+
+def test_batch_transaction_rollback(client):
+    kept = call(client, "create_todo", title="事务外")["result"]["todo"]
+    responses = client.post("/mcp?transaction=true", json=[
+        {"method": "create_todo", "params": {"title": "事务内"}},
+        {"method": "update_todo", "params": {"id": kept["id"], "title": "被回滚"}},
+        {"method": "get_todo", "params": {"id": "abc"}},
+        {"method": "delete_todo", "params": {"id": kept["id"]}},
+    ]).json()
+
+    assert [response["error"] for response in responses] == [
+        "事务已回滚：第3项执行失败",
+        "事务已回滚：第3项执行失败",
+        "id必须是整数",
+        "未执行：事务在第3项失败后已回滚",
+    ]
+    assert call(client, "get_todo", id=kept["id"])["result"]["todo"]["title"] == "事务外"
+    titles = [todo["title"] for todo in call(client, "search_todos", query="事务内")["result"]["todos"]]
+    assert titles == []
+
+
+def test_bulk_validation_reports_index(client):
+    cases = [
+        ("bulk_delete_todos", {"ids": [1, "2", 3]}, "ids[1]必须是整数"),
+        ("bulk_mark_completed", {"ids": [1, 2, True]}, "ids[2]必须是整数"),
+        ("bulk_create_todos", {"todos": [{"title": "a"}, "b"]}, "todos[1]必须是对象"),
+        ("bulk_create_todos", {"todos": []}, "缺少todos列表"),
+        ("bulk_delete_todos", {}, "缺少ids列表"),
+    ]
+    for method, params, error in cases:
+        assert call(client, method, **params)["error"] == error
+
+    error = call(client, "bulk_update_todos", todos=[{"id": 1}, {"title": "缺少id"}])["error"]
+    assert error.startswith("todos[1]无效: id")
+    error = call(client, "bulk_create_todos", todos=[{"title": "a"}, {"title": "b", "due_date": "明天"}])["error"]
+    assert error.startswith("todos[1]无效: due_date")
+
+
+def test_bulk_operations(client):
+    todos = call(client, "bulk_create_todos", todos=[{"title": "批量一"}, {"title": "批量二"}])["result"]["todos"]
+    ids = [todo["id"] for todo in todos]
+
+    result = call(client, "bulk_mark_completed", ids=ids + [10 ** 9])["result"]
+    assert result["count"] == 2 and result["not_found_ids"] == [10 ** 9]
+    assert all(todo["completed"] for todo in result["todos"])
+
+    result = call(client, "bulk_delete_todos", ids=ids)["result"]
+    assert sorted(result["deleted_ids"]) == sorted(ids) and result["not_found_ids"] == []
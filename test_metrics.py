@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+指标测试：Prometheus文本格式，以及多进程模式下各工作进程快照的合并
+
+    python -m pytest test_metrics.py
+"""
+
+import multiprocessing
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import MetricsRegistry, clear_multiprocess_dir
+
+
+def define_metrics(registry):
+    return (
+        registry.counter("test_requests_total", "请求数", ["method"]),
+        registry.gauge("test_connections", "连接数"),
+        registry.histogram("test_seconds", "耗时", ["method"], buckets=(0.1, 1.0)),
+    )
+
+
+def worker(directory, requests, ready=None, release=None):
+    """模拟一个工作进程：记录指标并写快照；给了release时保持运行直到被释放"""
+    registry = MetricsRegistry(directory)
+    counter, gauge, histogram = define_metrics(registry)
+    counter.inc(requests, method="get_todos")
+    gauge.set(2)
+    for _ in range(requests):
+        histogram.observe(0.5, method="get_todos")
+    registry.write_snapshot()
+    if release is not None:
+        ready.set()
+        release.wait()
+
+
+def sample(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " ") or line.startswith(name + "{"):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_render_format():
+    registry = MetricsRegistry()
+    counter, gauge, histogram = define_metrics(registry)
+    counter.inc(method='a"b')
+    histogram.observe(0.05, method="x")
+    histogram.observe(5, method="x")
+    text = registry.render()
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{method="a\\"b"} 1' in text
+    assert 'test_seconds_bucket{method="x",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{method="x",le="+Inf"} 2' in text
+    assert 'test_seconds_count{method="x"} 2' in text
+
+
+def test_multiprocess_merge(tmp_path):
+    directory = str(tmp_path)
+    context = multiprocessing.get_context("fork")
+
+    # 已退出的工作进程
+    exited = context.Process(target=worker, args=(directory, 3))
+    exited.start()
+    exited.join()
+
+    # 仍在运行的工作进程
+    ready, release = context.Event(), context.Event()
+    running = context.Process(target=worker, args=(directory, 5, ready, release))
+    running.start()
+    try:
+        assert ready.wait(10)
+        registry = MetricsRegistry(directory)
+        counter, gauge, histogram = define_metrics(registry)
+        counter.inc(method="get_todos")
+        gauge.set(1)
+
+        text = registry.render()
+        # 计数器和直方图对所有进程求和，包括已退出的
+        assert sample(text, "test_requests_total") == 3 + 5 + 1
+        assert 'test_seconds_bucket{method="get_todos",le="1.0"} 8' in text
+        assert sample(text, "test_seconds_sum") == 0.5 * 8
+        # Gauge只合并仍在运行的进程
+        assert sample(text, "test_connections") == 2 + 1
+        # 本进程的快照在抓取时写入
+        assert os.path.exists(os.path.join(directory, f"metrics_{os.getpid()}.json"))
+    finally:
+        release.set()
+        running.join()
+
+    assert sample(registry.render(), "test_connections") == 1
+
+    clear_multiprocess_dir(directory)
+    assert os.listdir(directory) == []
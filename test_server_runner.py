@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+生产模式参数测试：按总连接预算计算每个工作进程的连接池大小
+
+    python -m pytest test_server_runner.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server_runner import worker_pool_sizes
+
+
+@pytest.mark.parametrize("url, cache_backend, expected", [
+    # PostgreSQL + 进程内缓存：每个工作进程预留一个 LISTEN 连接
+    ("postgresql://localhost/todoapp", "memory", (1, 11)),
+    ("postgresql://localhost/todoapp", "redis", (1, 12)),
+    ("postgresql://localhost/todoapp", "none", (1, 12)),
+    # SQLite和内存后端没有变更监听
+    ("sqlite:///todos.db", "memory", (1, 12)),
+    ("memory://", "memory", (1, 12)),
+])
+def test_worker_pool_sizes(monkeypatch, url, cache_backend, expected):
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.setenv("TODO_CACHE_BACKEND", cache_backend)
+    monkeypatch.setenv("DB_POOL_TOTAL_MAX_SIZE", "50")
+    monkeypatch.setenv("DB_POOL_MIN_SIZE", "1")
+    assert worker_pool_sizes(4) == expected
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+存储后端一致性测试：memory、sqlite 以及（设置了 TEST_DATABASE_URL 时）PostgreSQL 运行同一组用例
+
+    python -m pytest test_storage_conformance.py
+    TEST_DATABASE_URL=postgresql://... python -m pytest test_storage_conformance.py
+
+PostgreSQL库中可能已有数据，用例只检查自己创建的待办事项（标题带唯一标记），结束时删除。
+"""
+
+import asyncio
+import io
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SEARCH_MODE_FULLTEXT, due_period, encode_cursor, encode_due_cursor
+from models import TodoBulkUpdate, TodoCreate, TodoUpdate
+from storage import AsyncStoreAdapter, create_store
+
+BACKENDS = ["memory", "sqlite"] + (["postgres"] if os.getenv("TEST_DATABASE_URL") else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    if request.param == "memory":
+        url = "memory://"
+    elif request.param == "sqlite":
+        url = f"sqlite:///{tmp_path / 'todos.db'}"
+    else:
+        url = os.getenv("TEST_DATABASE_URL")
+    store = create_store(url)
+    created = []
+    store.created = created
+    yield store
+    store.bulk_delete_todos([todo.id for todo in created])
+    store.close()
+
+
+@pytest.fixture
+def marker():
+    return uuid.uuid4().hex[:12]
+
+
+def create(store, title, **fields):
+    todo = store.create_todo(TodoCreate(title=title, **fields))
+    store.created.append(todo)
+    return todo
+
+
+def own(todos, created):
+    ids = {todo.id for todo in created}
+    return [todo.id for todo in todos if todo.id in ids]
+
+
+def test_crud(store, marker):
+    todo = create(store, f"写周报 {marker}", content="本周进展", due_date=date(2030, 1, 31))
+    assert todo.completed is False
+    assert todo.due_date == date(2030, 1, 31)
+    assert store.get_todo_by_id(todo.id) == todo
+
+    updated = store.update_todo(todo.id, TodoUpdate(completed=True))
+    assert updated.completed is True
+    # 值为None的字段保持不变
+    assert (updated.title, updated.content, updated.due_date) == (todo.title, todo.content, todo.due_date)
+    assert updated.updated_at >= todo.updated_at
+    assert store.update_todo(todo.id, TodoUpdate()) == updated
+
+    assert store.delete_todo(todo.id) is True
+    assert store.get_todo_by_id(todo.id) is None
+    assert store.delete_todo(todo.id) is False
+    assert store.update_todo(todo.id, TodoUpdate(title="x")) is None
+
+
+def test_bulk_operations(store, marker):
+    todos = store.bulk_create_todos([TodoCreate(title=f"批量 {marker} {i}") for i in range(5)])
+    store.created.extend(todos)
+    assert [todo.title for todo in todos] == [f"批量 {marker} {i}" for i in range(5)]
+    assert store.bulk_create_todos([]) == []
+
+    missing = max(todo.id for todo in todos) + 1000
+    updated = store.bulk_update_todos([
+        TodoBulkUpdate(id=todos[0].id, content="新内容"),
+        TodoBulkUpdate(id=missing, title="不存在"),
+    ])
+    assert [(todo.id, todo.title, todo.content) for todo in updated] == [(todos[0].id, todos[0].title, "新内容")]
+
+    completed = store.bulk_mark_completed([todos[1].id, todos[2].id, missing])
+    assert sorted(todo.id for todo in completed) == sorted([todos[1].id, todos[2].id])
+    assert all(todo.completed for todo in completed)
+
+    deleted = store.bulk_delete_todos([todos[3].id, todos[4].id, missing])
+    assert sorted(deleted) == sorted([todos[3].id, todos[4].id])
+    assert store.get_todo_by_id(todos[3].id) is None
+
+
+def test_pagination(store, marker):
+    todos = [create(store, f"分页 {marker} {i}") for i in range(7)]
+    newest_first = [todo.id for todo in reversed(todos)]
+
+    seen = []
+    cursor = None
+    while True:
+        page = store.get_todos(limit=3, cursor=cursor)
+        seen.extend(own(page, todos))
+        if len(page) < 3 or len(seen) == len(todos):
+            break
+        cursor = encode_cursor(page[-1])
+    assert seen == newest_first
+
+    store.bulk_mark_completed([todos[0].id, todos[3].id])
+    assert own(store.get_todos(completed=True), todos) == [todos[3].id, todos[0].id]
+    assert todos[0].id not in own(store.get_todos(completed=False), todos)
+
+    streamed = own(store.iter_todos(batch_size=2), todos)
+    assert streamed == newest_first
+
+
+def test_search(store, marker):
+    python = create(store, f"学习Python编程 {marker}", content="每天练习")
+    other = create(store, f"买菜 {marker}", content="python 入门书")
+    create(store, f"健身 {marker}")
+
+    # PostgreSQL未迁移时首次搜索后退回ilike，多个词作为一个子串匹配，查询只用单个词
+    assert len(own(store.search_todos(marker), store.created)) == 3
+    if store.search_mode == SEARCH_MODE_FULLTEXT:
+        query = lambda word: f"{word} {marker}"
+    else:
+        query = lambda word: word
+
+    results = store.search_todos(query("python"))
+    assert sorted(own(results, store.created)) == sorted([python.id, other.id])
+    assert own(store.search_todos(query("编程")), store.created) == [python.id]
+
+    first = store.search_todos(query("python"), limit=1)
+    assert len(first) == 1
+    rest = store.search_todos(query("python"), cursor=encode_cursor(first[0]))
+    assert sorted(own(first + rest, store.created)) == sorted([python.id, other.id])
+
+    assert own(store.iter_todos(search=query("买菜")), store.created) == [other.id]
+
+
+def test_due_dates(store, marker):
+    # 日期远离当前日期，避免与库中已有数据混在一起时受 limit 影响
+    base = date(2091, 3, 5)  # 周一
+    todos = [create(store, f"到期 {marker} {i}", due_date=base + timedelta(days=i)) for i in range(7)]
+    create(store, f"无截止日期 {marker}")
+    store.update_todo(todos[2].id, TodoUpdate(completed=True))
+
+    in_range = store.get_todos_due(start=base + timedelta(days=1), end=base + timedelta(days=4))
+    assert own(in_range, todos) == [todos[1].id, todos[3].id, todos[4].id]
+    assert own(store.get_todos_due(start=base, end=base + timedelta(days=2), completed=None), todos) == [
+        todo.id for todo in todos[:3]
+    ]
+    assert own(store.get_todos_due(start=base, end=base + timedelta(days=6), completed=True), todos) == [todos[2].id]
+
+    start, end = due_period("this_week", base + timedelta(days=3))
+    assert (start, end) == (base, base + timedelta(days=6))
+    week = store.get_todos_due(start=start, end=end)
+    assert own(week, todos) == [todo.id for i, todo in enumerate(todos) if i != 2]
+
+    # 同一天的事项按id排序，游标翻页不重复不遗漏
+    same_day = [create(store, f"同一天 {marker} {i}", due_date=base + timedelta(days=30)) for i in range(3)]
+    seen = []
+    cursor = None
+    while True:
+        page = store.get_todos_due(start=base, end=base + timedelta(days=30), limit=2, cursor=cursor)
+        seen.extend(own(page, store.created))
+        if len(page) < 2:
+            break
+        cursor = encode_due_cursor(page[-1])
+    assert seen == [todo.id for i, todo in enumerate(todos) if i != 2] + [todo.id for todo in same_day]
+
+    overdue = store.get_overdue_todos(today=base + timedelta(days=3))
+    assert own(overdue, todos) == [todos[0].id, todos[1].id]
+    store.update_todo(todos[0].id, TodoUpdate(completed=True))
+    assert own(store.get_overdue_todos(today=base + timedelta(days=3)), todos) == [todos[1].id]
+
+
+def test_stats(store, marker):
+    # 库中可能已有数据，比较创建前后的差值
+    today = date(2091, 3, 7)  # 周三
+    before = store.get_todo_stats(today=today, weeks=2)
+    assert [week["week_start"] for week in before["due_by_week"]] == [today, date(2091, 3, 12)]
+
+    due_dates = [
+        today - timedelta(days=1),   # 逾期
+        today,                       # 今天到期，本周
+        today + timedelta(days=4),   # 周日，本周
+        today + timedelta(days=5),   # 下周一
+        today + timedelta(days=12),  # 两周之后
+        None,
+    ]
+    for i, due_date in enumerate(due_dates):
+        create(store, f"统计 {marker} {i}", due_date=due_date)
+    create(store, f"统计 {marker} 已完成", due_date=today - timedelta(days=3))
+    store.update_todo(store.created[-1].id, TodoUpdate(completed=True))
+
+    after = store.get_todo_stats(today=today, weeks=2)
+    delta = {key: after[key] - before[key] for key in ("total", "completed", "pending", "overdue", "due_today", "no_due_date", "due_later")}
+    assert delta == {"total": 7, "completed": 1, "pending": 6, "overdue": 1, "due_today": 1, "no_due_date": 1, "due_later": 1}
+    assert [a["count"] - b["count"] for a, b in zip(after["due_by_week"], before["due_by_week"])] == [2, 1]
+
+
+def test_export_import_round_trip(store, marker):
+    todos = [
+        create(store, f"导出 {marker} a", content='带"引号",逗号', due_date=date(2030, 6, 1)),
+        create(store, f"导出 {marker} b"),
+    ]
+    store.update_todo(todos[1].id, TodoUpdate(completed=True))
+
+    for fmt in ("csv", "ndjson"):
+        buffer = io.BytesIO()
+        assert store.export_todos(buffer, fmt=fmt) >= 2
+
+        target = create_store("memory://")
+        imported = target.import_todos(io.StringIO(buffer.getvalue().decode("utf-8")), fmt=fmt)
+        assert imported >= 2
+        for todo in todos:
+            original = store.get_todo_by_id(todo.id)
+            copy = target.get_todo_by_id(todo.id)
+            assert copy.model_dump() == original.model_dump()
+
+
+def test_adapter_transaction_rollback(store, marker):
+    if not hasattr(store, "begin"):
+        pytest.skip("PostgreSQL的事务由 AsyncDatabaseManager.transaction() 提供")
+
+    async def scenario():
+        db = AsyncStoreAdapter(store, offload=True)
+        await db.open()
+        kept = await db.create_todo(TodoCreate(title=f"事务外 {marker}"))
+        store.created.append(kept)
+        with pytest.raises(RuntimeError):
+            async with db.transaction():
+                await db.create_todo(TodoCreate(title=f"事务内 {marker}"))
+                await db.update_todo(kept.id, TodoUpdate(title="被回滚"))
+                raise RuntimeError("rollback")
+        titles = [todo.title async for todo in db.iter_todos(search=marker)]
+        await db.close()
+        return kept, titles
+
+    kept, titles = asyncio.run(scenario())
+    assert titles == [kept.title]
+    assert store.get_todo_by_id(kept.id).title == kept.title
+
+
+def test_backends_implement_interface():
+    from database import DatabaseManager
+    from memory_store import MemoryDatabaseManager
+    from sqlite_store import SQLiteDatabaseManager
+    from storage import TodoStore
+
+    for cls in (DatabaseManager, SQLiteDatabaseManager, MemoryDatabaseManager):
+        assert not cls.__abstractmethods__, f"{cls.__name__} 未实现: {sorted(cls.__abstractmethods__)}"
+
+    class Incomplete(TodoStore):
+        def ping(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()